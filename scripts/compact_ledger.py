@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+compact_ledger.py — Upgrade an existing ledger (runs table) in place.
+
+Opening the ledger already applies the schema migration (adds runs.ctx_codec,
+drops idx_runs_text). This script also rewrites rows stored before that as
+compressed ctx_json with retrieval texts replaced by doc-id refs, then
+optionally VACUUMs to give the space back.
+
+Usage:
+  LEDGER_DB=/path/mirror-v4.db ./scripts/compact_ledger.py [--vacuum]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from tobyworld_v4.core.v4.dbconn import shared_db  # noqa: E402
+from tobyworld_v4.core.v4.ledger import _DB_PATH, _SQLiteLedger  # noqa: E402
+
+
+def main() -> int:
+    path = _DB_PATH
+    print(f"Using DB: {path}")
+    before = os.path.getsize(path) if os.path.exists(path) else 0
+    n = _SQLiteLedger(path).compact_legacy()
+    print(f"Compacted {n} legacy runs")
+    if "--vacuum" in sys.argv[1:]:
+        con = shared_db(path).conn()
+        con.execute("VACUUM")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # VACUUM lands in the WAL first
+        print(f"Size: {before / 1e6:.1f} MB -> {os.path.getsize(path) / 1e6:.1f} MB")
+    shared_db(path).close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
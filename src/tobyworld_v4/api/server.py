@@ -7,11 +7,12 @@ if hasattr(sys.stdout, "reconfigure"):
 if hasattr(sys.stderr, "reconfigure"):
     sys.stderr.reconfigure(encoding="utf-8")
 
-import os, time, threading, asyncio, json, re, random, io, hashlib
+import os, time, threading, asyncio, json, re, random, io, hashlib, hmac
 from typing import Any, Dict, List
+from contextlib import contextmanager
 from collections import deque, Counter  # cadence telemetry
 
-from fastapi import FastAPI, Query, Request, HTTPException
+from fastapi import FastAPI, Query, Request, HTTPException, Header
 from fastapi.responses import Response, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -101,6 +102,12 @@ from tobyworld_v4.core.v4 import (
     Ledger, Learning, Heartbeat, Rites, RunCtx, config
 )
 import tobyworld_v4.core.v4.retriever as retr
+from tobyworld_v4.core.v4.watcher import ScrollWatcher, WATCH_MODE
+from tobyworld_v4.core.v4.writebehind import WriteBehind, WRITE_BEHIND
+from tobyworld_v4.core.v4.answer_cache import AnswerCache, answer_key, strip_guiding
+from tobyworld_v4.core.v4.admission import llm_gate
+from tobyworld_v4.core.v4.executors import run_in, executor_stats, shutdown_executors
+from tobyworld_v4.core.v4.logsink import sink as log_sink
 from tobyworld_v4.core.v4.renderer import render_reflection
 from tobyworld_v4.core.v4.prompt_manager import PM
 
@@ -109,6 +116,9 @@ from tobyworld_v4.core.v4.memory_identity import (
     parse_user_token, resolve_traveler, merge_travelers, forget_traveler, ensure_tables
 )
 from tobyworld_v4.core.v4.memory import Memory
+from tobyworld_v4.core.v4.dbconn import close_all_dbs, db_stats
+from tobyworld_v4.core.v4.identity_cache import identity_cache
+from tobyworld_v4.core.v4.ledger_archive import LedgerArchiver
 
 # Safeguards
 from tobyworld_v4.core.v4.safeguards import (
@@ -128,14 +138,17 @@ from tobyworld_v4.core.v4.conversation_weaver import ConversationWeaver, convers
 from tobyworld_v4.core.v4.off_ramp import should_exit_gracefully, generate_final_farewell
 
 # LLM client
-from tobyworld_v4.llm.client import LLMClient
-llm = LLMClient()
+from tobyworld_v4.llm.client import AsyncLLMClient
+llm = AsyncLLMClient()  # pooled httpx.AsyncClient; opened on startup, closed on shutdown
+
+# Full-answer cache (ANSWER_CACHE_SIZE / ANSWER_CACHE_TTL); see _answer_generation()
+answer_cache = AnswerCache()
 
 # Prometheus (multiprocess-aware)
 from tobyworld_v4.core.v4.metrics import (
     REG, generate_latest, CONTENT_TYPE_LATEST,
     mv4_llm_fallbacks_total, mv4_reindex_lock_collisions_total,
-    track_request
+    mv4_ask_coalesced_total, mv4_stage_latency_seconds, track_request
 )
 from prometheus_client import Gauge
 from prometheus_client import Counter as PCounter, Histogram as PHistogram
@@ -165,23 +178,22 @@ MAX_SENTENCES   = int(os.getenv("MAX_SENTENCES", "0"))
 MAX_CHARS       = int(os.getenv("MAX_CHARS", "0"))
 LLM_MAX_TOKENS  = int(os.getenv("LLM_MAX_TOKENS", "900"))
 
+# Coalesce identical concurrent /ask requests onto one pipeline run
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1").lower() in ("1", "true", "yes", "on")
+
+# x-token for the answer-cache admin writes (/cache/answers/warm|flush); unset = those endpoints are off
+ANSWER_CACHE_ADMIN_TOKEN = os.getenv("ANSWER_CACHE_ADMIN_TOKEN", "")
+
 # Canon anchors (ids, comma-separated)
 CANON_ANCHORS_WHO   = [s for s in os.getenv("CANON_ANCHORS_WHO","TOBY_L025,TOBY_QA127").split(",") if s]
 CANON_ANCHORS_LEAF  = [s for s in os.getenv("CANON_ANCHORS_LEAF","TOBY_L110,TOBY_L028").split(",") if s]
 CANON_ANCHORS_TABOSHI = [s for s in os.getenv("CANON_ANCHORS_TABOSHI","TOBY_L110,TOBY_L057").split(",") if s]
 
-# ----- tiny JSON logger (updated to also buffer) -----
+# ----- tiny JSON logger (async sink; lines also land in LOG_BUF) -----
+log_sink.taps.append(push_log)
+
 def jlog(evt: str, **fields):
-    payload = {"evt": evt, **fields}
-    try:
-        s = json.dumps(payload, ensure_ascii=False)
-        print(s)
-        push_log(s)
-    except Exception:
-        safe = {k: (str(v)[:512]) for k, v in payload.items()}
-        s = json.dumps(safe, ensure_ascii=False)
-        print(s)
-        push_log(s)
+    log_sink.log(evt, fields)
 
 # =============================================================================
 # Memori (lazy) — SDK shape: record_conversation(user_input, ai_output, model, metadata)
@@ -722,9 +734,12 @@ def _gpu_snapshot():
 
 @app.on_event("startup")
 def startup_event():
-    # Ensure identity-aware memory tables
+    log_sink.start()
+
+    # Ensure identity-aware memory tables (DDL runs here once, not per request)
     try:
         ensure_tables()
+        app.state.memory = Memory(config)
         jlog("memory.ensure_tables.ok")
     except Exception as e:
         jlog("memory.ensure_tables.err", error=str(e))
@@ -761,15 +776,85 @@ def startup_event():
     else:
         jlog("index.startup.skipped")
 
+    # live indexing (SCROLLS_WATCH=auto|inotify|poll)
+    app.state.watcher = None
+    if WATCH_MODE not in ("", "off", "0", "false", "no"):
+        try:
+            w = ScrollWatcher(SCROLLS_DIR, lock=app.state.index_lock)
+            if w.start():
+                app.state.watcher = w
+                jlog("watch.start.ok", backend=w.backend, dir=SCROLLS_DIR)
+        except Exception as e:
+            jlog("watch.start.err", error=str(e))
+
+    try:
+        llm.start()
+    except Exception as e:
+        jlog("llm.pool.err", error=str(e))
+
+    # post-response persistence queue (WRITE_BEHIND=0 keeps writes inline)
+    # memory updates write through the shared connection: a batch of them commits once
+    mem = getattr(app.state, "memory", None)
+    app.state.writer = WriteBehind(db=mem.db if mem is not None else None, tx_jobs=("memory",))
+    if WRITE_BEHIND:
+        app.state.writer.start()
+        jlog("write_behind.start.ok", queue=app.state.writer.stats()["queue_max"])
+
+    # ledger group commit (LEDGER_GROUP_COMMIT=0 keeps one transaction per run)
+    if app.state.ledger.start():
+        jlog("ledger.writer.start.ok", **{k: v for k, v in app.state.ledger.stats().items()
+                                          if k in ("flush_ms", "batch_max", "ctx_codec")})
+
+    # monthly retention: closed months past LEDGER_RETENTION_MONTHS move to archive files
+    app.state.archiver = None
+    if app.state.ledger.backend == "sqlite":
+        try:
+            archiver = LedgerArchiver()
+            if archiver.start():
+                app.state.archiver = archiver
+                jlog("ledger.archive.start.ok", **{k: archiver.stats()[k] for k in ("retention_months", "format", "dir")})
+        except Exception as e:
+            jlog("ledger.archive.start.err", error=str(e))
+
     print(f"[SAFEGUARDS] Circuit breakers/filters ACTIVE")
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
+    archiver = getattr(app.state, "archiver", None)
+    if archiver is not None:
+        await asyncio.to_thread(archiver.stop)  # waits for a pass in progress
+    wb = getattr(app.state, "writer", None)
+    if wb is not None:
+        try:
+            await asyncio.to_thread(wb.stop)  # drains pending writes
+            jlog("write_behind.stop.ok", **{k: wb.stats()[k] for k in ("done", "errors", "queue_depth")})
+        except Exception as e:
+            jlog("write_behind.stop.err", error=str(e))
+    try:
+        await asyncio.to_thread(app.state.ledger.stop)  # commits rows the drain just queued
+        jlog("ledger.writer.stop.ok", **{k: app.state.ledger.stats().get(k) for k in ("rows", "batches", "errors")})
+    except Exception as e:
+        jlog("ledger.writer.stop.err", error=str(e))
+    await asyncio.to_thread(shutdown_executors, True)
+    close_all_dbs()  # after the write-behind drain and any in-flight pool jobs
+    try:
+        await llm.aclose()
+        jlog("llm.pool.close.ok")
+    except Exception as e:
+        jlog("llm.pool.close.err", error=str(e))
+    w = getattr(app.state, "watcher", None)
+    if w is not None:
+        try:
+            w.stop()
+            jlog("watch.stop.ok")
+        except Exception as e:
+            jlog("watch.stop.err", error=str(e))
     try:
         retr.close_db()
         jlog("retriever.close.ok")
     except Exception as e:
         jlog("retriever.close.err", error=str(e))
+    log_sink.stop()  # flush queued log lines last
 
 # ---------- Routes ----------
 
@@ -795,6 +880,10 @@ def metrics():
     finally:
         pass
 
+def _reindex_counts(last: Dict[str, Any] | None) -> Dict[str, int]:
+    last = last or {}
+    return {k: int(last.get(k, 0) or 0) for k in ("added", "updated", "renamed", "deleted")}
+
 @app.post("/reindex")
 def reindex(pattern: str = "**/*", background: bool = False):
     lock = app.state.index_lock
@@ -817,7 +906,7 @@ def reindex(pattern: str = "**/*", background: bool = False):
                         docs_total = retr.index_stats().get("docs", 0)
                         app.state.index_stats = last
                         app.state.scrolls_loaded = docs_total
-                        jlog("reindex.done.bg", added=added, total=docs_total)
+                        jlog("reindex.done.bg", added=added, total=docs_total, **_reindex_counts(last))
                     except Exception as e:
                         jlog("reindex.err.bg", error=str(e))
                     finally:
@@ -843,13 +932,15 @@ def reindex(pattern: str = "**/*", background: bool = False):
             docs_total = retr.index_stats().get("docs", 0)
             app.state.index_stats = last
             app.state.scrolls_loaded = docs_total
-            jlog("reindex.done", added=added, total=docs_total)
+            counts = _reindex_counts(last)
+            jlog("reindex.done", added=added, total=docs_total, **counts)
             return {
                 "ok": True,
                 "dir": SCROLLS_DIR,
                 "pattern": pattern,
                 "added_this_run": added,
                 "docs_total": docs_total,
+                **counts,
                 "stats": last,
             }
             
@@ -866,7 +957,8 @@ def reindex_status():
     with track_request("reindex_status"):
         try:
             busy = app.state.index_lock.locked()
-            return {"ok": True, "indexing": bool(busy)}
+            w = getattr(app.state, "watcher", None)
+            return {"ok": True, "indexing": bool(busy), "watch": w.status() if w else None}
         except Exception as e:
             return {"ok": False, "error": str(e)}
 
@@ -878,7 +970,62 @@ def index_stats():
             return {"ok": True, **stats}
         except Exception as e:
             return {"ok": False, "error": str(e)}
-        
+
+# --- Answer cache admin ---
+class CacheWarmRequest(BaseModel):
+    questions: List[str]
+    user: str = "cache-warm"
+
+def _require_admin_token(token: str | None):
+    # warm runs full LLM pipelines: closed unless a token is configured
+    if not ANSWER_CACHE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="set ANSWER_CACHE_ADMIN_TOKEN to enable")
+    if not hmac.compare_digest((token or "").encode(), ANSWER_CACHE_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="bad token")
+
+@app.get("/cache/answers")
+def answer_cache_status(limit: int = Query(50, ge=0, le=1000)):
+    with track_request("answer_cache"):
+        return {
+            "ok": True,
+            **answer_cache.stats(),
+            "generation": list(_answer_generation()),
+            "single_flight": {"enabled": SINGLE_FLIGHT, "inflight": len(_Flight.inflight),
+                              "coalesced": _Flight.coalesced},
+            "entries": answer_cache.entries(limit),
+        }
+
+@app.post("/cache/answers/warm")
+async def answer_cache_warm(body: CacheWarmRequest, request: Request, x_token: str | None = Header(None)):
+    """
+    Run each question through the full pipeline (sequentially) so its answer
+    gets cached. Nothing is persisted: no identity, memory, ledger or history writes.
+    """
+    _require_admin_token(x_token)
+    with track_request("answer_cache_warm"):
+        out = []
+        for q in body.questions[:100]:
+            before = answer_cache.stats()["stores"]
+            try:
+                res = await _ask_pipeline(AskRequest(user=body.user, question=q), request, persist=False)
+                out.append({
+                    "question": q,
+                    "cached": bool(res.meta.get("cached")),
+                    "stored": answer_cache.stats()["stores"] > before,
+                })
+            except Exception as e:
+                out.append({"question": q, "error": str(e)})
+        jlog("answer_cache.warm", questions=len(out), stored=sum(1 for r in out if r.get("stored")))
+        return {"ok": True, "results": out, **answer_cache.stats()}
+
+@app.post("/cache/answers/flush")
+def answer_cache_flush(x_token: str | None = Header(None)):
+    _require_admin_token(x_token)
+    with track_request("answer_cache_flush"):
+        n = answer_cache.clear()
+        jlog("answer_cache.flush", entries=n)
+        return {"ok": True, "flushed": n}
+
 # --- Off Ramp ---
 def _apply_offramp(user_text: str, out_text: str) -> str:
     """
@@ -925,507 +1072,936 @@ def _apply_offramp(user_text: str, out_text: str) -> str:
     return (text + "\n\n" if text else "") + farewell
 
 # --- Ask endpoint with DI + async bridges ---
-@app.post("/ask", response_model=AskResponse)
-async def ask_v4(req: AskRequest, request: Request):
-    start_ms = now_ms()
+class _Stages(dict):
+    """
+    Per-request stage timings. As a dict: name → ms (summed if a stage runs
+    twice), which is what ctx.metrics.components and `ask.stages` log. `spans`
+    keeps the waterfall (start offset + duration) for TRACE_BUF, and every
+    span is observed in mv4_stage_latency_seconds{stage}.
+    """
 
-    # --- Off-ramp integration (scoped to /ask for live safety) ---
-    import re
-    from tobyworld_v4.core.v4.off_ramp import (
-        should_exit_gracefully,
-        generate_final_farewell,
-    )
+    def __init__(self):
+        super().__init__()
+        self.t0 = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def record(self, name: str, t_start: float, t_end: float | None = None) -> None:
+        t_end = time.perf_counter() if t_end is None else t_end
+        ms = round((t_end - t_start) * 1000, 2)
+        self[name] = round(self.get(name, 0.0) + ms, 2)
+        self.spans.append({"stage": name, "start_ms": round((t_start - self.t0) * 1000, 2), "ms": ms})
+        mv4_stage_latency_seconds.labels(stage=name).observe(t_end - t_start)
+
+    @contextmanager
+    def span(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, t0)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.t0) * 1000, 2)
 
+async def _timed(stages: _Stages, name: str, aw):
+    """Await `aw`, recording it as the `name` span."""
+    t0 = time.perf_counter()
     try:
-        with track_request("ask"):
-            query = (req.question or "").strip()
-            memory = Memory(config)
+        return await aw
+    finally:
+        stages.record(name, t0)
+
+def _trace_ask(stages: _Stages, req: AskRequest, st: Dict[str, Any] | None = None,
+               resp: AskResponse | None = None, error: str | None = None) -> None:
+    """Push the request waterfall to TRACE_BUF (/trace/recent, /trace/stream)."""
+    total_ms = stages.elapsed_ms()
+    mv4_stage_latency_seconds.labels(stage="total").observe(total_ms / 1000)
+    meta = (resp.meta if resp is not None else None) or {}
+    via = next((k for k in ("offramp", "cached", "coalesced") if meta.get(k)), None)
+    ctx = (st or {}).get("ctx")
+    push_trace({
+        "kind": "ask",
+        "user": req.user,
+        "q": (req.question or "")[:160],
+        "via": via or ("error" if error else "pipeline"),
+        "intent": getattr(ctx, "intent", None),
+        "harmony": meta.get("harmony"),
+        "total_ms": total_ms,
+        "stages": sorted(stages.spans, key=lambda s: s["start_ms"]),
+        **({"error": error} if error else {}),
+    })
+    jlog("ask.stages", total_ms=total_ms, **stages)
+
+async def _none():
+    return None
+
+def _reap(task: "asyncio.Task") -> None:
+    """Cancel a side task nobody will await, or mark its exception retrieved."""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+async def _persist(name: str, fn, *args, **kwargs) -> None:
+    """Hand a post-response write to the write-behind queue; run it inline when off or full."""
+    def _job(*a, **kw):
+        # off-request (write-behind) cost still shows up as stage="db_<name>"
+        t0 = time.perf_counter()
+        try:
+            return fn(*a, **kw)
+        finally:
+            mv4_stage_latency_seconds.labels(stage=f"db_{name}").observe(time.perf_counter() - t0)
 
-            # --------- Fast-path: Early off-ramp (skip the entire pipeline) ---------
-            # If the user clearly signals closure, bow immediately and avoid retrieval/LLM cost.
-            try:
-                if should_exit_gracefully(query):
-                    bow = generate_final_farewell(sanitize_text(query))
-                    jlog("offramp.early_bow")
-                    return AskResponse(
-                        answer=bow,
-                        meta={"offramp": True, "provenance": [], "harmony": None, "pins": []},
-                    )
-            except Exception as _oe:
-                jlog("offramp.early_bow.err", error=str(_oe))
-            # ------------------------------------------------------------------------
-
-            # Resolve a real user token (headers/cookies/fingerprint) instead of raw body "user"
-            user_token = infer_user_token(req, request)
-
-            # identity + profile
-            traveler_id, user_profile = memory.resolve_user(user_token)
-            user_data = {
-                "id": traveler_id,
-                "token": user_token,
-                "profile": user_profile if isinstance(user_profile, dict) else {},
-            }
-            jlog("ask.begin", user=req.user, token=user_token, tid=traveler_id, q=query[:160])
+    wb = getattr(app.state, "writer", None)
+    if wb is not None and wb.submit(name, _job, *args, **kwargs):
+        return
+    try:
+        await run_in("db-write", _job, *args, **kwargs)
+    except Exception as e:
+        jlog(f"{name}.persist.err", error=str(e))
 
-            # DI: reuse app.state modules
-            guide = app.state.guide
-            retriever = app.state.retriever
-            synthesis = app.state.synthesis
-            resonance = app.state.resonance
-            lucidity = app.state.lucidity
-            ledger = app.state.ledger
-            learning = app.state.learning
+class _Flight:
+    """
+    Single-flight slot for one /ask run. The first request for a key leads
+    and runs the pipeline; identical requests arriving meanwhile await the
+    leader's shareable answer and only do their own per-traveler writes.
+    Callers must land() in a finally so followers never hang.
+    """
+    inflight: Dict[tuple, "asyncio.Future"] = {}
+    coalesced = 0
+
+    def __init__(self):
+        self.key = None
+        self.fut = None
+
+    def join(self, key: tuple):
+        """None → we lead (registered); otherwise the leader's future to await."""
+        fut = self.inflight.get(key)
+        if fut is not None and not fut.done():
+            return fut
+        self.key, self.fut = key, asyncio.get_running_loop().create_future()
+        self.inflight[key] = self.fut
+        return None
 
-            ctx = RunCtx(user=user_data, query=query)
+    def land(self, entry: Dict[str, Any] | None) -> None:
+        """Publish the answer (None = followers compute their own) and free the key."""
+        if self.fut is None:
+            return
+        if not self.fut.done():
+            self.fut.set_result(entry)
+        if self.inflight.get(self.key) is self.fut:
+            del self.inflight[self.key]
+        self.fut = None
+
+async def _ask_prepare(req: AskRequest, request: Request, stages: _Stages, emit=None,
+                       flight: _Flight | None = None, persist: bool = True) -> Dict[str, Any]:
+    """
+    Everything in /ask before the LLM call: identity, guide, retrieval,
+    enhancements, synthesis, resonance, lucidity, memory/ledger, and the
+    chat messages. Returns the run state for _ask_finalize(); {"early": ...}
+    when the off-ramp answers without the pipeline. Stage spans go into the
+    caller's `stages`. `emit(event, data)` (async) gets retrieval/provenance
+    checkpoints for the streaming endpoint. persist=False (cache warming)
+    skips identity resolution and every memory/ledger/history write.
+    """
+    query = (req.question or "").strip()
+    memory = getattr(app.state, "memory", None) or Memory(config)
 
-            # guide
+    # --------- Fast-path: Early off-ramp (skip the entire pipeline) ---------
+    # If the user clearly signals closure, bow immediately and avoid retrieval/LLM cost.
+    try:
+        if should_exit_gracefully(query):
+            bow = generate_final_farewell(sanitize_text(query))
+            jlog("offramp.early_bow")
+            return {"early": AskResponse(
+                answer=bow,
+                meta={"offramp": True, "provenance": [], "harmony": None, "pins": []},
+            )}
+    except Exception as _oe:
+        jlog("offramp.early_bow.err", error=str(_oe))
+    # ------------------------------------------------------------------------
+
+    # Resolve a real user token (headers/cookies/fingerprint) instead of raw body "user"
+    user_token = infer_user_token(req, request)
+
+    # DI: reuse app.state modules
+    guide = app.state.guide
+    retriever = app.state.retriever
+    synthesis = app.state.synthesis
+    resonance = app.state.resonance
+    lucidity = app.state.lucidity
+    ledger = app.state.ledger
+    learning = app.state.learning
+
+    # Stage graph (wall-clock per stage lands in ctx.metrics.components):
+    #   identity ──> recall (Memori / weaver history) ─┐
+    #   guide ─────> retrieval ────────────────────────┴─> conversation analysis
+    #   temporal ‖ symbol ‖ synthesis                  (all only need cands)
+    t_prep = time.perf_counter()
+    original_query = query
+    weave_on = getattr(config, "CONVERSATION_WEAVE", False)
+
+    # guide.guard only reads the query; user_data is filled in once identity resolves
+    user_data: Dict[str, Any] = {"id": None, "token": user_token, "profile": {}}
+    async def _no_identity():
+        return (req.user or "anon"), {}
+
+    identity_task = asyncio.create_task(
+        _timed(stages, "identity", run_in("db-write", memory.resolve_user, user_token) if persist else _no_identity())
+    )
+
+    async def _recall():
+        traveler_id, _ = await identity_task
+        try:
+            # FIRST: Try to get conversation history from Memori (right brain)
+            mem_eng = get_memori_engine()
+            if mem_eng:
+                # Use Memori for associative memory recall
+                memori_history = await run_in(
+                    "retrieval",
+                    MemoriAdapter(mem_eng).recall, traveler_id, original_query, topk=5
+                )
+                if memori_history:
+                    jlog("memori.recall", items=len(memori_history))
+                    # DEBUG: Log the structure of first Memori item to understand format
+                    jlog("memori.format_sample", sample=json.dumps(memori_history[0], default=str)[:200])
+                    return memori_history, "memori"
+
+            # SECOND: If Memori returned nothing, fall back to standard conversation weaver (left brain)
+            current_conversation_weaver = app.state.conversation_weaver or conversation_weaver
+            history = await run_in("retrieval", current_conversation_weaver.get_conversation_history, traveler_id)
+            jlog("conversation.fallback", source="weaver", items=len(history))
+            return history, "weaver"
+        except Exception as e:
+            jlog("conversation.err", error=str(e))
+            return None, None
+
+    # identity_task is in flight from here: whatever raises before it is consumed
+    # must not leave it running (or its exception unretrieved)
+    try:
+        # guide
+        with stages.span("guide"):
             guard_result = guide.guard(query, user_data)
-            ctx.intent = guard_result["intent"]
-            ctx.refined_query = guard_result["refined_query"]
-            jlog("guide", intent=ctx.intent, refined=ctx.refined_query, hint=guard_result.get("hint"))
 
-            # retrieval (offload sync to thread)
-            retrieval_result = await asyncio.to_thread(
-                retriever.multi_arc, (ctx.refined_query or query), guard_result.get("hint")
-            )
-            cands = retrieval_result or []
-            jlog("retrieval", count=len(cands))
-            jlog("retrieval.preview", top=_summarize_candidates(cands, limit=10))
-            ctx.retriever = cands
+        # full-answer cache: repeated canon questions skip the whole pipeline. Keyed on the
+        # traveler's own wording: anchors and cadence in the stored text follow original_query
+        cache_key = answer_key(
+            _answer_generation(), original_query,
+            guard_result["intent"], _pins_for_query(original_query),
+        )
+        hit = answer_cache.get(cache_key)
+        if hit is not None:
+            traveler_id, _ = await identity_task
+            return {"early": await _ask_from_cache(hit, memory, original_query, traveler_id, guard_result["intent"],
+                                                   persist=persist)}
+
+        # single-flight: identical question + hint already running → wait for its answer
+        if flight is not None and SINGLE_FLIGHT:
+            leader = flight.join((cache_key, json.dumps(guard_result.get("hint") or {}, sort_keys=True, default=str)))
+            if leader is not None:
+                shared = await asyncio.shield(leader)
+                if shared is not None:
+                    _Flight.coalesced += 1
+                    mv4_ask_coalesced_total.inc()
+                    traveler_id, _ = await identity_task
+                    return {"early": await _ask_from_cache(
+                        shared, memory, original_query, traveler_id, guard_result["intent"], via="coalesced",
+                        persist=persist,
+                    )}
+                # leader's answer was traveler-specific (or it failed): run our own pipeline
+
+        # retrieval (offload sync to thread) alongside identity + recall
+        retrieval_result, (traveler_id, user_profile), recalled = await asyncio.gather(
+            _timed(stages, "retrieval", run_in(
+                "retrieval",
+                retriever.multi_arc, (guard_result["refined_query"] or query), guard_result.get("hint")
+            )),
+            identity_task,
+            _timed(stages, "recall", _recall()) if weave_on else _none(),
+        )
+    finally:
+        _reap(identity_task)
 
-            # V4 hooks (safe)
-            try:
-                from tobyworld_v4.core.v4.hooks_resonance import apply_symbol_resonance
-                from tobyworld_v4.core.v4.hooks_connector import apply_scroll_connector
-                if cands:
-                    apply_symbol_resonance(ctx, cands)
-                    apply_scroll_connector(ctx, cands)
-            except Exception as e:
-                jlog("v4_hooks.err", error=str(e))
+    # identity + profile
+    user_data.update(id=traveler_id, profile=user_profile if isinstance(user_profile, dict) else {})
+    jlog("ask.begin", user=req.user, token=user_token, tid=traveler_id, q=query[:160])
 
-            # safeguarded enhancements
-            original_query = query
-            enhanced_modules = {}
+    ctx = RunCtx(user=user_data, query=query)
+    ctx.intent = guard_result["intent"]
+    ctx.refined_query = guard_result["refined_query"]
+    jlog("guide", intent=ctx.intent, refined=ctx.refined_query, hint=guard_result.get("hint"))
 
-            if getattr(config, "TEMPORAL_CONTEXT", False):
-                try:
-                    temporal_ctx = temporal_breaker.execute(
-                        lambda: get_temporal_context().extract_temporal_context(query, cands),
-                        lambda: {"query_temporal": {"epochs": [], "runes": []}, "content_temporal": []},
-                    )
-                    ctx.temporal_context = temporal_ctx
-                    enhanced_modules["temporal"] = True
-                    jlog("temporal", epochs=temporal_ctx["query_temporal"]["epochs"], runes=temporal_ctx["query_temporal"]["runes"])
-                except Exception as e:
-                    jlog("temporal.err", error=str(e))
-                    enhanced_modules["temporal"] = False
+    cands = retrieval_result or []
+    jlog("retrieval", count=len(cands))
+    jlog("retrieval.preview", top=_summarize_candidates(cands, limit=10))
+    if emit:
+        await emit("retrieval", {"count": len(cands), "top": _summarize_candidates(cands, limit=10)})
+    ctx.retriever = cands
 
-            if getattr(config, "SYMBOL_RESONANCE", False):
-                try:
-                    symbol_analysis = symbol_breaker.execute(
-                        lambda: get_symbol_resonance().analyze_symbol_patterns(cands),
-                        lambda: {"symbol_frequency": {}, "dominant_symbols": []},
-                    )
-                    ctx.symbol_analysis = symbol_analysis
-                    enhanced_modules["symbol"] = True
-                    jlog("symbol", top=[s["symbol"] for s in symbol_analysis.get("dominant_symbols", [])[:3]])
-                except Exception as e:
-                    jlog("symbol.err", error=str(e))
-                    enhanced_modules["symbol"] = False
+    # V4 hooks (safe)
+    try:
+        from tobyworld_v4.core.v4.hooks_resonance import apply_symbol_resonance
+        from tobyworld_v4.core.v4.hooks_connector import apply_scroll_connector
+        if cands:
+            apply_symbol_resonance(ctx, cands)
+            apply_scroll_connector(ctx, cands)
+    except Exception as e:
+        jlog("v4_hooks.err", error=str(e))
 
-            if getattr(config, "CONVERSATION_WEAVE", False):
-                try:
-                    # FIRST: Try to get conversation history from Memori (right brain)
-                    mem_eng = get_memori_engine()
-                    history = []
-                    
-                    if mem_eng:
-                        # Use Memori for associative memory recall
-                        memori_history = await asyncio.to_thread(
-                            MemoriAdapter(mem_eng).recall, traveler_id, query, topk=5
-                        )
-                        if memori_history:
-                            jlog("memori.recall", items=len(memori_history))
-                            # DEBUG: Log the structure of first Memori item to understand format
-                            if memori_history and len(memori_history) > 0:
-                                jlog("memori.format_sample", sample=json.dumps(memori_history[0], default=str)[:200])
-                            history = memori_history
-                    
-                    # SECOND: If Memori returned nothing, fall back to standard conversation weaver (left brain)
-                    if not history:
-                        current_conversation_weaver = app.state.conversation_weaver or conversation_weaver
-                        history = current_conversation_weaver.get_conversation_history(traveler_id)
-                        jlog("conversation.fallback", source="weaver", items=len(history))
-
-                    # Use ConversationWeaver for analysis (consistent interface)
-                    current_conversation_weaver = app.state.conversation_weaver or conversation_weaver
-                    conversation_analysis = conversation_breaker.execute(
-                        lambda: current_conversation_weaver.analyze_conversation_flow(query, history),
-                        lambda: {"relevant": False, "confidence": 0.0, "safe_to_use": False},
-                    )
-                    context_validation = confidence_validator.validate_context_usage(query, conversation_analysis)
-                    ctx.context_validation = context_validation
-                    if context_validation["should_use"]:
-                        # Use ConversationWeaver's method to enhance query with context
-                        enhanced_query = current_conversation_weaver.enhance_query_with_context(query, conversation_analysis)
-                        query = enhanced_query
-                        ctx.enhanced_query = enhanced_query
-                        enhanced_modules["conversation"] = True
-                        jlog("conversation.weave", confidence=context_validation["confidence"], source="memori" if mem_eng and memori_history else "weaver")
-                except Exception as e:
-                    jlog("conversation.err", error=str(e))
-                    enhanced_modules["conversation"] = False
-
-            ctx.enhanced_modules = enhanced_modules
-
-            # synthesis (thread offload)
-            draft_text, trace_info = await asyncio.to_thread(synthesis.weave, cands)
-            used = (trace_info or {}).get("used") or []
-            ctx.draft = {"text": draft_text, "trace": trace_info}
-            jlog("synth", draft_len=len(draft_text or ""), used=len(used))
-            jlog("synth.used.preview", used=_summarize_used(used, limit=10))
-
-            # --- RAG miss handling: canon-pinned retry
-            rag_miss = (len(used) == 0)
-            forced_cands: List[Dict[str, Any]] = []
-            pins: List[str] = []
-            if rag_miss:
-                jlog("synth.rag_miss", q=original_query[:160])
-                draft_text, trace_info, used, forced_cands, pins = await asyncio.to_thread(
-                    _canon_resynth, app.state, retriever, synthesis, original_query
-                )
-                ctx.draft = {"text": draft_text, "trace": trace_info}
-                if forced_cands:
-                    jlog("retrieval.forced.preview", pins=pins, top=_summarize_candidates(forced_cands, limit=10))
-                rag_miss = (len(used) == 0)
-                if not rag_miss:
-                    jlog("synth.rag_recovered", used=len(used))
-
-            # provenance
-            provenance = []
-            for c in (used or []):
-                doc = (c.get("doc_id") or c.get("id") or c.get("title") or "").strip()
-                epoch = (c.get("epoch") or "").strip()
-                if doc:
-                    provenance.append(f"{doc}{f' · {epoch}' if epoch else ''}")
-            ctx.provenance = provenance
-            if provenance:
-                jlog("sources", count=len(provenance))
-
-            # resonance
-            harmony_score = resonance.score(draft_text, cands, guard_result.get("hint"))
-            ctx.harmony = harmony_score
-            jlog("resonance", harmony=harmony_score)
-
-            # Skip poetic resynth for identity "who created toby" (fact-lock)
-            if (harmony_score < config.HARMONY_THRESHOLD) and (not _IDENTITY_TOBY_CREATOR_RX.search(query)):
-                jlog("resonance.resynth", threshold=config.HARMONY_THRESHOLD)
-                draft_text, trace_info = await asyncio.to_thread(synthesis.weave, (cands or [])[:5])
-                used = (trace_info or {}).get("used") or []
-                ctx.draft = {"text": draft_text, "trace": trace_info}
-                ctx.harmony = resonance.score(draft_text, (cands or [])[:5], guard_result.get("hint"))
-                jlog("resonance.resynth.done", harmony=ctx.harmony)
-                jlog("synth.used.preview.resynth", used=_summarize_used(used, limit=10))
-
-            # lucidity → sanitize for any downstream ASCII-only processors
-            lucidity_result = lucidity.distill(draft_text)
-            lucidity_result = sanitize_payload(lucidity_result)
-            ctx.final = lucidity_result
-
-            # memory update (ASCII-safe to avoid codec errors downstream)
-            try:
-                safe_query = sanitize_text(query).encode("ascii", "ignore").decode("ascii")
-                safe_sage = sanitize_text(lucidity_result.get("sage", "")).encode("ascii", "ignore").decode("ascii")
-                await asyncio.to_thread(
-                    memory.update_after_run, traveler_id, safe_query, safe_sage, float(ctx.harmony or 0.0)
-                )
+    # safeguarded enhancements
+    enhanced_modules = {}
+
+    async def _temporal():
+        try:
+            temporal_ctx = await run_in(
+                "cpu", temporal_breaker.execute,
+                lambda: get_temporal_context().extract_temporal_context(original_query, cands),
+                lambda: {"query_temporal": {"epochs": [], "runes": []}, "content_temporal": []},
+            )
+            ctx.temporal_context = temporal_ctx
+            enhanced_modules["temporal"] = True
+            jlog("temporal", epochs=temporal_ctx["query_temporal"]["epochs"], runes=temporal_ctx["query_temporal"]["runes"])
+        except Exception as e:
+            jlog("temporal.err", error=str(e))
+            enhanced_modules["temporal"] = False
+
+    async def _symbol():
+        try:
+            symbol_analysis = await run_in(
+                "cpu", symbol_breaker.execute,
+                lambda: get_symbol_resonance().analyze_symbol_patterns(cands),
+                lambda: {"symbol_frequency": {}, "dominant_symbols": []},
+            )
+            ctx.symbol_analysis = symbol_analysis
+            enhanced_modules["symbol"] = True
+            jlog("symbol", top=[s["symbol"] for s in symbol_analysis.get("dominant_symbols", [])[:3]])
+        except Exception as e:
+            jlog("symbol.err", error=str(e))
+            enhanced_modules["symbol"] = False
+
+    # synthesis (thread offload) alongside temporal/symbol analysis
+    (draft_text, trace_info), _, _ = await asyncio.gather(
+        _timed(stages, "synthesis", run_in("cpu", synthesis.weave, cands)),
+        _timed(stages, "temporal", _temporal()) if getattr(config, "TEMPORAL_CONTEXT", False) else _none(),
+        _timed(stages, "symbol", _symbol()) if getattr(config, "SYMBOL_RESONANCE", False) else _none(),
+    )
+
+    history, source = recalled if weave_on else (None, None)
+    if weave_on and history is None:
+        enhanced_modules["conversation"] = False
+    elif weave_on:
+        t_conv = time.perf_counter()
+        try:
+            # Use ConversationWeaver for analysis (consistent interface)
+            current_conversation_weaver = app.state.conversation_weaver or conversation_weaver
+            conversation_analysis = conversation_breaker.execute(
+                lambda: current_conversation_weaver.analyze_conversation_flow(query, history),
+                lambda: {"relevant": False, "confidence": 0.0, "safe_to_use": False},
+            )
+            context_validation = confidence_validator.validate_context_usage(query, conversation_analysis)
+            ctx.context_validation = context_validation
+            if context_validation["should_use"]:
+                # Use ConversationWeaver's method to enhance query with context
+                enhanced_query = current_conversation_weaver.enhance_query_with_context(query, conversation_analysis)
+                query = enhanced_query
+                ctx.enhanced_query = enhanced_query
+                enhanced_modules["conversation"] = True
+                jlog("conversation.weave", confidence=context_validation["confidence"], source=source)
+        except Exception as e:
+            jlog("conversation.err", error=str(e))
+            enhanced_modules["conversation"] = False
+        stages.record("conversation", t_conv)
+
+    ctx.enhanced_modules = enhanced_modules
+    used = (trace_info or {}).get("used") or []
+    ctx.draft = {"text": draft_text, "trace": trace_info}
+    jlog("synth", draft_len=len(draft_text or ""), used=len(used))
+    jlog("synth.used.preview", used=_summarize_used(used, limit=10))
+
+    # --- RAG miss handling: canon-pinned retry
+    rag_miss = (len(used) == 0)
+    forced_cands: List[Dict[str, Any]] = []
+    pins: List[str] = []
+    if rag_miss:
+        jlog("synth.rag_miss", q=original_query[:160])
+        draft_text, trace_info, used, forced_cands, pins = await _timed(stages, "canon_resynth", run_in(
+            "retrieval",
+            _canon_resynth, app.state, retriever, synthesis, original_query
+        ))
+        ctx.draft = {"text": draft_text, "trace": trace_info}
+        if forced_cands:
+            jlog("retrieval.forced.preview", pins=pins, top=_summarize_candidates(forced_cands, limit=10))
+        rag_miss = (len(used) == 0)
+        if not rag_miss:
+            jlog("synth.rag_recovered", used=len(used))
+
+    # provenance
+    provenance = []
+    for c in (used or []):
+        doc = (c.get("doc_id") or c.get("id") or c.get("title") or "").strip()
+        epoch = (c.get("epoch") or "").strip()
+        if doc:
+            provenance.append(f"{doc}{f' · {epoch}' if epoch else ''}")
+    ctx.provenance = provenance
+    if provenance:
+        jlog("sources", count=len(provenance))
+    if emit:
+        await emit("provenance", {"provenance": provenance, "pins": pins, "rag_miss": rag_miss})
+
+    # resonance
+    with stages.span("resonance"):
+        harmony_score = resonance.score(draft_text, cands, guard_result.get("hint"))
+    ctx.harmony = harmony_score
+    jlog("resonance", harmony=harmony_score)
+
+    # Skip poetic resynth for identity "who created toby" (fact-lock)
+    if (harmony_score < config.HARMONY_THRESHOLD) and (not _IDENTITY_TOBY_CREATOR_RX.search(query)):
+        jlog("resonance.resynth", threshold=config.HARMONY_THRESHOLD)
+        t_resynth = time.perf_counter()
+        draft_text, trace_info = await run_in("cpu", synthesis.weave, (cands or [])[:5])
+        used = (trace_info or {}).get("used") or []
+        ctx.draft = {"text": draft_text, "trace": trace_info}
+        ctx.harmony = resonance.score(draft_text, (cands or [])[:5], guard_result.get("hint"))
+        stages.record("resynth", t_resynth)
+        jlog("resonance.resynth.done", harmony=ctx.harmony)
+        jlog("synth.used.preview.resynth", used=_summarize_used(used, limit=10))
+
+    # lucidity → sanitize for any downstream ASCII-only processors
+    with stages.span("lucidity"):
+        lucidity_result = lucidity.distill(draft_text)
+        lucidity_result = sanitize_payload(lucidity_result)
+    ctx.final = lucidity_result
+
+    # memory update (ASCII-safe to avoid codec errors downstream) — write-behind
+    t_persist = time.perf_counter()
+    if persist:
+        try:
+            safe_query = sanitize_text(query).encode("ascii", "ignore").decode("ascii")
+            safe_sage = sanitize_text(lucidity_result.get("sage", "")).encode("ascii", "ignore").decode("ascii")
+            harmony = float(ctx.harmony or 0.0)
+
+            def _memory_job():
+                memory.update_after_run(traveler_id, safe_query, safe_sage, harmony)
                 jlog("memory.update.ok", tid=traveler_id)
-            except Exception as _me:
-                jlog("memory.update.err", error=str(_me))
 
-            # ledger + learning (use fully-sanitized ctx)
-            safe_ctx = sanitize_payload(ctx.dict())
-            run_id = await asyncio.to_thread(ledger.log, safe_ctx)
-            jlog("ledger.log", run_id=run_id)
+            await _persist("memory", _memory_job)
+        except Exception as _me:
+            jlog("memory.update.err", error=str(_me))
+
+    stages.record("persist", t_persist)
+
+    # ledger + learning (use fully-sanitized ctx) — write-behind, learning needs the run id
+    stages.record("prepare", t_prep)
+    ctx.metrics = {"components": dict(stages)}
+    ctx_snapshot = ctx.dict()
+
+    def _ledger_job():
+        safe_ctx = sanitize_payload(ctx_snapshot)
+
+        def _learn(run_id):
             try:
-                await asyncio.to_thread(learning.commit, safe_ctx, run_id=run_id)
+                learning.commit(safe_ctx, run_id=run_id)
                 jlog("learning.commit.ok")
             except Exception as e:
                 jlog("learning.commit.err", error=str(e))
 
-            # --- LLM blend (guarded) ---
-            llm_text = None
-            allow_llm = True
-            if REQUIRE_CITATION and (len(used) == 0):
-                allow_llm = (LLM_FALLBACK_MODE.lower() == "loose")
-                jlog("llm.blocked_no_citation", mode=LLM_FALLBACK_MODE)
-
-            # Detect identity/origin intents
-            _q = (query or "").lower()
-            _is_toby_identity = any(p in _q for p in [
-                "who is toby", "what is toby", "who created toby", "creation of toby",
-                "origin of toby", "why was toby created", "who made toby",
-            ])
-            _is_toadgod_identity = any(p in _q for p in [
-                "who is toadgod", "what is toadgod", "who is toad god", "what is toad god",
-            ])
-
-            # --- Pin canonical creator scroll when relevant (env-controlled ids) ---
-            if _is_toby_identity and _IDENTITY_TOBY_CREATOR_RX.search(_q):
-                extra_pins = _pins_for_query(original_query)
-                if extra_pins:
-                    pins = list(set((pins or []) + extra_pins))
-                    jlog("pins.added", pins=pins)
-
-            # Base rules (fallback if file missing)
-            sys_rules = PM.get(
-                "mirror_system_rules.txt",
-                default=(
-                    "You are the Mirror (Lore Guardian). Answer clearly, humanly, and precisely.\n"
-                    "RULES:\n"
-                    "1) Use ONLY the information in (notes). If something is unclear or missing, state what is uncertain, "
-                    "but still answer with what IS known from the notes. Do not refuse.\n"
-                    "2) 4–8 lines, concise prose. No source lists. No invented founders, dates, or places beyond what appears in the notes.\n"
-                    "3) If the user asks 'what is Toby?', do NOT present Toby as a person.\n"
-                ),
-            )
+        def _committed(run_id):
+            # on the ledger writer thread: hand learning back to the write-behind queue
+            jlog("ledger.log", run_id=run_id)
+            wb = getattr(app.state, "writer", None)
+            if wb is None or not wb.submit("learning", _learn, run_id):
+                _learn(run_id)
+
+        ledger.submit(safe_ctx, then=_committed)
+
+    if persist:
+        with stages.span("persist"):
+            await _persist("ledger", _ledger_job)
+
+    # --- LLM blend (guarded) ---
+    allow_llm = True
+    if REQUIRE_CITATION and (len(used) == 0):
+        allow_llm = (LLM_FALLBACK_MODE.lower() == "loose")
+        jlog("llm.blocked_no_citation", mode=LLM_FALLBACK_MODE)
+
+    # Detect identity/origin intents
+    _q = (query or "").lower()
+    _is_toby_identity = any(p in _q for p in [
+        "who is toby", "what is toby", "who created toby", "creation of toby",
+        "origin of toby", "why was toby created", "who made toby",
+    ])
+    _is_toadgod_identity = any(p in _q for p in [
+        "who is toadgod", "what is toadgod", "who is toad god", "what is toad god",
+    ])
 
-            # Toby identity/origin → soften non-person rule; allow origin/intent answers
-            if _is_toby_identity:
-                replaced = False
-                for needle in [
-                    "Never present Toby as a person.",
-                    "If the user asks 'what is Toby?', do NOT present Toby as a person.",
-                ]:
-                    if needle in sys_rules:
-                        sys_rules = sys_rules.replace(
-                            needle,
-                            (
-                                "For questions about what/who/creation/origin of Toby: do NOT portray Toby as a biological human. "
-                                "You MAY describe Toby as a protocol/entity/lore construct per the scrolls and answer origin/intent directly."
-                            ),
-                        )
-                        replaced = True
-                sys_rules += (
-                    "\n[ORIGIN_OVERRIDES]\n"
-                    "For origin/creation/identity of Toby: do NOT portray Toby as a biological human, "
-                    "but DO answer origin/creator and purpose directly from the notes. If the notes disagree or are silent, say so plainly.\n"
-                )
-                jlog("rules.applied", which="toby_identity", replaced=replaced)
-
-            # Toadgod identity → explicitly allow personhood + flamekeeper role
-            if _is_toadgod_identity:
-                sys_rules += (
-                    "\n[TOADGOD_OVERRIDES]\n"
-                    "For questions about who Toadgod is: you MAY describe Toadgod as a person (poet/builder) and flamekeeper "
-                    "who authored the early $TOBY lore. Balance personhood with his symbolic role in the scrolls.\n"
+    # --- Pin canonical creator scroll when relevant (env-controlled ids) ---
+    if _is_toby_identity and _IDENTITY_TOBY_CREATOR_RX.search(_q):
+        extra_pins = _pins_for_query(original_query)
+        if extra_pins:
+            pins = list(set((pins or []) + extra_pins))
+            jlog("pins.added", pins=pins)
+
+    # Base rules (fallback if file missing)
+    sys_rules = PM.get(
+        "mirror_system_rules.txt",
+        default=(
+            "You are the Mirror (Lore Guardian). Answer clearly, humanly, and precisely.\n"
+            "RULES:\n"
+            "1) Use ONLY the information in (notes). If something is unclear or missing, state what is uncertain, "
+            "but still answer with what IS known from the notes. Do not refuse.\n"
+            "2) 4–8 lines, concise prose. No source lists. No invented founders, dates, or places beyond what appears in the notes.\n"
+            "3) If the user asks 'what is Toby?', do NOT present Toby as a person.\n"
+        ),
+    )
+
+    # Toby identity/origin → soften non-person rule; allow origin/intent answers
+    if _is_toby_identity:
+        replaced = False
+        for needle in [
+            "Never present Toby as a person.",
+            "If the user asks 'what is Toby?', do NOT present Toby as a person.",
+        ]:
+            if needle in sys_rules:
+                sys_rules = sys_rules.replace(
+                    needle,
+                    (
+                        "For questions about what/who/creation/origin of Toby: do NOT portray Toby as a biological human. "
+                        "You MAY describe Toby as a protocol/entity/lore construct per the scrolls and answer origin/intent directly."
+                    ),
                 )
-                jlog("rules.applied", which="toadgod_identity")
+                replaced = True
+        sys_rules += (
+            "\n[ORIGIN_OVERRIDES]\n"
+            "For origin/creation/identity of Toby: do NOT portray Toby as a biological human, "
+            "but DO answer origin/creator and purpose directly from the notes. If the notes disagree or are silent, say so plainly.\n"
+        )
+        jlog("rules.applied", which="toby_identity", replaced=replaced)
+
+    # Toadgod identity → explicitly allow personhood + flamekeeper role
+    if _is_toadgod_identity:
+        sys_rules += (
+            "\n[TOADGOD_OVERRIDES]\n"
+            "For questions about who Toadgod is: you MAY describe Toadgod as a person (poet/builder) and flamekeeper "
+            "who authored the early $TOBY lore. Balance personhood with his symbolic role in the scrolls.\n"
+        )
+        jlog("rules.applied", which="toadgod_identity")
 
-            # ---- Build messages (sanitize everything for punctuation; keep Unicode for model quality) ----
-            sys_rules_s = sanitize_text(sys_rules)
-            draft_text_s = sanitize_text(draft_text or "")
+    # ---- Build messages (sanitize everything for punctuation; keep Unicode for model quality) ----
+    sys_rules_s = sanitize_text(sys_rules)
+    draft_text_s = sanitize_text(draft_text or "")
 
-            # Strip Guiding Question lines from notes so models don't mirror them back (EN-only)
-            _NOTE_GQ_RX = re.compile(r'(?i)^\s*(?:\*\*\s*)?guiding\s*question\s*[:：].*$', re.M)
-            draft_text_s = _NOTE_GQ_RX.sub('', draft_text_s).strip()
+    # Strip Guiding Question lines from notes so models don't mirror them back (EN-only)
+    _NOTE_GQ_RX = re.compile(r'(?i)^\s*(?:\*\*\s*)?guiding\s*question\s*[:：].*$', re.M)
+    draft_text_s = _NOTE_GQ_RX.sub('', draft_text_s).strip()
 
-            query_s = sanitize_text(query)
+    query_s = sanitize_text(query)
 
-            messages = [
-                {"role": "system", "content": sys_rules_s},
-                {"role": "assistant", "content": f"(notes)\n{draft_text_s}\n(end notes)"},
-                {"role": "user", "content": query_s},
-            ]
+    messages = [
+        {"role": "system", "content": sys_rules_s},
+        {"role": "assistant", "content": f"(notes)\n{draft_text_s}\n(end notes)"},
+        {"role": "user", "content": query_s},
+    ]
 
-            if allow_llm:
-                try:
-                    llm_text = await asyncio.to_thread(
-                        llm.chat, messages, temperature=0.2, top_p=0.9, max_tokens=LLM_MAX_TOKENS
-                    )
-                    jlog("llm.ok", len=len(llm_text or ""))
-                except Exception as e:
-                    jlog("llm.err", error=str(e))
-                    llm_text = None
-            else:
-                llm_text = None
-
-            MIN_OK_CHARS = int(os.getenv("LLM_MIN_OK_CHARS", "80"))
-            BAD_SNIPPETS = [
-                "i cannot provide information",
-                "i don't have that in the scrolls",
-                "not in the notes",
-                "i don't have enough information",
-            ]
-
-            def _weak_output(text: str) -> bool:
-                if not text or len(text.strip()) < MIN_OK_CHARS:
-                    return True
-                low = text.lower()
-                return any(bad in low for bad in BAD_SNIPPETS)
-
-            # identity guard on raw LLM result (if any)
-            if llm_text:
-                llm_text = _apply_identity_guard(original_query, llm_text, draft_text)
-
-            if llm_text and not _weak_output(llm_text):
-                final_text = llm_text.strip()
-                jlog("final.llm")
-                fallback_totals["llm"] += 1
-            else:
-                if REQUIRE_CITATION and (len(used) == 0):
-                    pin_ids = _pins_for_query(original_query)
-                    pin_str = ", ".join(pin_ids) if pin_ids else "canon anchors"
-                    final_text = f"🪞 The scrolls are quiet on this phrasing. Drawing from {pin_str}.\n\n" + (draft_text or "")
-                    jlog("final.canon_notice")
-                else:
-                    # Renderer consumes ctx + distilled result (already sanitized)
-                    final_text = render_reflection(ctx.dict(), lucidity_result)
-                    jlog("final.renderer")
-                fallback_totals["renderer"] += 1
+    return {
+        "early": None, "query": query, "original_query": original_query, "stages": stages,
+        "cache_key": cache_key, "flight": flight, "persist": persist,
+        "memory": memory, "traveler_id": traveler_id, "ctx": ctx,
+        "cands": cands, "used": used, "forced_cands": forced_cands, "pins": pins,
+        "draft_text": draft_text, "provenance": provenance,
+        "lucidity_result": lucidity_result, "messages": messages, "allow_llm": allow_llm,
+    }
 
-            # --- Compact & cadence (UPDATED order with new brevity & dedupe) ---
-            try:
-                final_text = _strip_numeric_refs(final_text)
-                final_text = _dedupe_guiding(final_text)                 # first pass (clean inputs)
-                final_text = _ensure_brevity(final_text, MAX_SENTENCES, MAX_CHARS)
-
-                # guard again on the final text (belt & suspenders)
-                final_text = _apply_identity_guard(original_query, final_text, draft_text)
-
-                final_text = _apply_thematic_anchors(original_query, final_text)
-                final_text = _ensure_mirror_cadence(final_text, original_query, ctx.dict())
-
-                # 👇 NEW: Off-ramp after cadence so we remove any GQ and bow out cleanly
-                final_text = _apply_offramp(user_text=original_query, out_text=final_text)
-
-                final_text = _dedupe_guiding(final_text)                 # second pass (collapse any late additions)
-
-                had_traveler = final_text.strip().startswith("Traveler,")
-                has_guiding = bool(re.search(r'(?im)guiding\s*question', final_text))
-                has_syms = any(s in final_text for s in ["🪞", "🌊", "🍃", "🌀"])
-                sym_hits = [s for s in ["🪞", "🌊", "🍃", "🌀"] if s in final_text]
-                for s in sym_hits:
-                    symbol_totals[s] += 1
-
-                hit_anchors = []
-                if "The Lotus teaches: patience is not idle" in final_text:
-                    hit_anchors.append("lotus")
-                if "In the Ledger, resonance is not ink but echo" in final_text:
-                    hit_anchors.append("ledger")
-                if "The strongest signal is the still one" in final_text:
-                    hit_anchors.append("pond")
-                if "A promise binds another; a vow binds the still water within" in final_text:
-                    hit_anchors.append("vow")
-                if "Its fruit is the yield of loyalty and quiet strength" in final_text:
-                    hit_anchors.append("golden_tree")
-                for a in hit_anchors:
-                    anchor_totals[a] += 1
-
-                cadence_events.append({
-                    "ts": time.time(),
-                    "had_traveler": had_traveler,
-                    "has_guiding": has_guiding,
-                    "has_syms": has_syms,
-                    "sym_count": len(sym_hits),
-                    "anchors": hit_anchors,
-                    "intent": ctx.intent,
-                    "harmony": ctx.harmony,
-                })
-                cadence_totals["answers"] += 1
-                cadence_totals["traveler_ok"] += int(had_traveler)
-                cadence_totals["guiding_ok"] += int(has_guiding)
-                cadence_totals["symbols_ok"] += int(has_syms)
-
-                # --- RAG summary line ---
-                cand_ids = {(d.get("doc_id") or d.get("id") or "") for d in (cands or []) if (d.get("doc_id") or d.get("id"))}
-                used_ids = {(d.get("doc_id") or d.get("id") or "") for d in (used or []) if (d.get("doc_id") or d.get("id"))}
-                forced_ids = {(d.get("doc_id") or d.get("id") or "") for d in (forced_cands or []) if (d.get("doc_id") or d.get("id"))}
-                combined_ids = set().union(cand_ids, used_ids, forced_ids)
-
-                jlog(
-                    "rag.summary",
-                    rag_candidates=len(cands or []),
-                    used_sources=len(used or []),
-                    forced_candidates=len(forced_cands or []),
-                    combined=len(combined_ids),
-                    pins=pins,
-                )
+def _outbound(final_text: str) -> str:
+    # --- ASCII-safe outbound (kill-switch for downstream ASCII-only parsers) ---
+    force_ascii = os.getenv("FORCE_ASCII_RESPONSE", "0").lower() in ("1", "true", "yes", "on")
+    answer_out = sanitize_text(final_text)  # normalize punctuation
+    if force_ascii:
+        answer_out = answer_out.encode("ascii", "replace").decode("ascii")
+    return answer_out.strip()
+
+async def _persist_turn(traveler_id: str, original_query: str, final_text: str, intent: str | None,
+                        harmony: float | None, temporal_context: Any = None, symbol_analysis: Any = None) -> None:
+    """Per-traveler writes for one answered turn (Memori + conversation history), write-behind."""
+    # --- Persist to Memori (if enabled) ---------------------------------
+    try:
+        mem_eng = get_memori_engine()
+        if mem_eng:
+            san_q = sanitize_text(original_query or "")
+            san_a = sanitize_text(final_text or "")
+            await _persist(
+                "memori", MemoriAdapter(mem_eng, topk=8).save,
+                traveler_id,
+                san_q,
+                san_a,
+                meta={"intent": intent, "harmony": float(harmony or 0.0)},
+            )
+    except Exception as e:
+        jlog("memori.adapter.err", error=str(e))
 
-                jlog(
-                    "cadence.guard.ok",
-                    had_traveler=had_traveler,
-                    has_guiding=has_guiding,
-                    has_syms=has_syms,
-                    sym_hits="".join(sym_hits),
-                    anchors=",".join(hit_anchors),
+    # privacy-aware convo save
+    if getattr(config, "CONVERSATION_WEAVE", False):
+        try:
+            if privacy_filter.should_store_conversation(traveler_id, original_query, final_text):
+                sanitized_q = privacy_filter.sanitize_text(original_query)
+                sanitized_a = privacy_filter.sanitize_text(final_text)
+                current_conversation_weaver = app.state.conversation_weaver or conversation_weaver
+                await _persist(
+                    "conversation", current_conversation_weaver.save_conversation,
+                    traveler_id, sanitized_q, sanitized_a, {
+                        "intent": intent,
+                        "harmony_score": float(harmony or 0.0),
+                        "temporal_context": temporal_context or {},
+                        "symbol_analysis": symbol_analysis or {},
+                    }
                 )
-            except Exception as _e:
-                jlog("cadence.guard.err", error=str(_e))
+                jlog("conversation.saved", sanitized=sanitized_q != original_query)
+        except Exception as e:
+            jlog("conversation.save.err", error=str(e))
 
-            # --- Persist to Memori (if enabled) --------------------------------
-            try:
-                mem_eng = get_memori_engine()
-                if mem_eng:
-                    q_src = original_query or query or ""
-                    a_src = final_text or ""
-                    san_q = sanitize_text(q_src)
-                    san_a = sanitize_text(a_src)
-                    MemoriAdapter(mem_eng, topk=8).save(
-                        traveler_id,
-                        san_q,
-                        san_a,
-                        meta={"intent": ctx.intent, "harmony": float(ctx.harmony or 0.0)},
-                    )
-            except Exception as e:
-                jlog("memori.adapter.err", error=str(e))
+def _answer_generation() -> tuple:
+    """Everything besides the question that shapes an answer; part of every answer-cache key."""
+    return (retr.index_generation(), PM.generation(), llm.model if llm.enabled else "", MAX_SENTENCES, MAX_CHARS)
 
-            # privacy-aware convo save
-            if getattr(config, "CONVERSATION_WEAVE", False):
-                try:
-                    if privacy_filter.should_store_conversation(traveler_id, original_query, final_text):
-                        sanitized_q = privacy_filter.sanitize_text(original_query)
-                        sanitized_a = privacy_filter.sanitize_text(final_text)
-                        current_conversation_weaver = app.state.conversation_weaver or conversation_weaver
-                        await asyncio.to_thread(
-                            current_conversation_weaver.save_conversation, 
-                            traveler_id, sanitized_q, sanitized_a, {
-                                "intent": ctx.intent,
-                                "harmony_score": float(ctx.harmony or 0.0),
-                                "temporal_context": getattr(ctx, 'temporal_context', {}),
-                                "symbol_analysis": getattr(ctx, 'symbol_analysis', {})
-                            }
-                        )
-                        jlog("conversation.saved", sanitized=sanitized_q != original_query)
-                except Exception as e:
-                    jlog("conversation.save.err", error=str(e))
-
-            # module health gauges
-            MODULE_HEALTH.labels(module="temporal").set(HEALTH_STATUS["healthy" if temporal_breaker.state == "CLOSED" else "degraded"])
-            MODULE_HEALTH.labels(module="symbol").set(HEALTH_STATUS["healthy" if symbol_breaker.state == "CLOSED" else "degraded"])
-            MODULE_HEALTH.labels(module="conversation").set(HEALTH_STATUS["healthy" if conversation_breaker.state == "CLOSED" else "degraded"])
-
-            # --- ASCII-safe outbound (kill-switch for downstream ASCII-only parsers) ---
-            force_ascii = os.getenv("FORCE_ASCII_RESPONSE", "0").lower() in ("1", "true", "yes", "on")
-            answer_out = sanitize_text(final_text)  # normalize punctuation
-            if force_ascii:
-                answer_out = answer_out.encode("ascii", "replace").decode("ascii")
-            answer_out = answer_out.strip()
-
-            jlog("final.preview", snippet=(answer_out or "")[:160], enh=[k for k, v in (ctx.enhanced_modules or {}).items() if v])
-
-            return AskResponse(
-                answer=answer_out,
-                meta={
-                    "provenance": provenance,
-                    "harmony": ctx.harmony,
-                    "pins": pins,
-                },
+async def _ask_from_cache(hit: Dict[str, Any], memory: Memory, original_query: str,
+                          traveler_id: str, intent: str | None, via: str = "cached",
+                          persist: bool = True) -> AskResponse:
+    """
+    Serve a cached (or coalesced, via="coalesced") answer: fresh cadence /
+    Guiding Question, per-traveler persistence (unless persist=False).
+    """
+    final_text = _ensure_mirror_cadence(hit["text"], original_query, {})
+    final_text = _dedupe_guiding(final_text)
+    cadence_totals["answers"] += 1
+    fallback_totals[via] += 1
+
+    if persist:
+        try:
+            safe_query = sanitize_text(original_query).encode("ascii", "ignore").decode("ascii")
+            # the leader's lucidity distillate, as its own memory update recorded
+            safe_answer = sanitize_text(hit.get("sage") or hit["text"]).encode("ascii", "ignore").decode("ascii")
+            await _persist("memory", memory.update_after_run,
+                           traveler_id, safe_query, safe_answer, float(hit.get("harmony") or 0.0))
+        except Exception as _me:
+            jlog("memory.update.err", error=str(_me))
+        await _persist_turn(traveler_id, original_query, final_text, intent, hit.get("harmony"))
+
+    answer_out = _outbound(final_text)
+    jlog("answer_cache.hit" if via == "cached" else "ask.coalesced", tid=traveler_id,
+         hits=hit.get("hits", 0), snippet=answer_out[:80])
+    return AskResponse(
+        answer=answer_out,
+        meta={
+            "provenance": hit["provenance"],
+            "harmony": hit["harmony"],
+            "pins": hit["pins"],
+            via: True,
+        },
+    )
+
+async def _ask_finalize(st: Dict[str, Any], llm_text: str | None, llm_complete: bool = True) -> AskResponse:
+    """
+    Post-LLM half of /ask: weak-output fallback, cadence/dedupe/off-ramp, persistence, response.
+    `llm_complete=False` marks a stream that broke mid-answer: it is still served, never shared.
+    """
+    query, original_query = st["query"], st["original_query"]
+    traveler_id, ctx = st["traveler_id"], st["ctx"]
+    cands, used, forced_cands, pins = st["cands"], st["used"], st["forced_cands"], st["pins"]
+    draft_text, provenance, lucidity_result = st["draft_text"], st["provenance"], st["lucidity_result"]
+
+    MIN_OK_CHARS = int(os.getenv("LLM_MIN_OK_CHARS", "80"))
+    BAD_SNIPPETS = [
+        "i cannot provide information",
+        "i don't have that in the scrolls",
+        "not in the notes",
+        "i don't have enough information",
+    ]
+
+    def _weak_output(text: str) -> bool:
+        if not text or len(text.strip()) < MIN_OK_CHARS:
+            return True
+        low = text.lower()
+        return any(bad in low for bad in BAD_SNIPPETS)
+
+    # identity guard on raw LLM result (if any)
+    if llm_text:
+        llm_text = _apply_identity_guard(original_query, llm_text, draft_text)
+
+    # deterministic answers (LLM ok, or LLM not in play) are safe to cache or hand to
+    # coalesced followers; a renderer fallback after an LLM failure is neither
+    llm_ok = not (st["allow_llm"] and llm.enabled)
+    if llm_text and not _weak_output(llm_text):
+        final_text = llm_text.strip()
+        llm_ok = llm_complete
+        jlog("final.llm", complete=llm_complete)
+        fallback_totals["llm"] += 1
+    else:
+        if REQUIRE_CITATION and (len(used) == 0):
+            pin_ids = _pins_for_query(original_query)
+            pin_str = ", ".join(pin_ids) if pin_ids else "canon anchors"
+            final_text = f"🪞 The scrolls are quiet on this phrasing. Drawing from {pin_str}.\n\n" + (draft_text or "")
+            jlog("final.canon_notice")
+        else:
+            # Renderer consumes ctx + distilled result (already sanitized)
+            final_text = render_reflection(ctx.dict(), lucidity_result)
+            jlog("final.renderer")
+        fallback_totals["renderer"] += 1
+
+    # --- Compact & cadence (UPDATED order with new brevity & dedupe) ---
+    try:
+        final_text = _strip_numeric_refs(final_text)
+        final_text = _dedupe_guiding(final_text)                 # first pass (clean inputs)
+        final_text = _ensure_brevity(final_text, MAX_SENTENCES, MAX_CHARS)
+
+        # guard again on the final text (belt & suspenders)
+        final_text = _apply_identity_guard(original_query, final_text, draft_text)
+
+        final_text = _apply_thematic_anchors(original_query, final_text)
+        final_text = _ensure_mirror_cadence(final_text, original_query, ctx.dict())
+
+        # 👇 NEW: Off-ramp after cadence so we remove any GQ and bow out cleanly
+        pre_offramp = final_text
+        final_text = _apply_offramp(user_text=original_query, out_text=final_text)
+        shareable = llm_ok and final_text == pre_offramp and not getattr(ctx, "enhanced_query", None)
+
+        final_text = _dedupe_guiding(final_text)                 # second pass (collapse any late additions)
+
+        had_traveler = final_text.strip().startswith("Traveler,")
+        has_guiding = bool(re.search(r'(?im)guiding\s*question', final_text))
+        has_syms = any(s in final_text for s in ["🪞", "🌊", "🍃", "🌀"])
+        sym_hits = [s for s in ["🪞", "🌊", "🍃", "🌀"] if s in final_text]
+        for s in sym_hits:
+            symbol_totals[s] += 1
+
+        hit_anchors = []
+        if "The Lotus teaches: patience is not idle" in final_text:
+            hit_anchors.append("lotus")
+        if "In the Ledger, resonance is not ink but echo" in final_text:
+            hit_anchors.append("ledger")
+        if "The strongest signal is the still one" in final_text:
+            hit_anchors.append("pond")
+        if "A promise binds another; a vow binds the still water within" in final_text:
+            hit_anchors.append("vow")
+        if "Its fruit is the yield of loyalty and quiet strength" in final_text:
+            hit_anchors.append("golden_tree")
+        for a in hit_anchors:
+            anchor_totals[a] += 1
+
+        cadence_events.append({
+            "ts": time.time(),
+            "had_traveler": had_traveler,
+            "has_guiding": has_guiding,
+            "has_syms": has_syms,
+            "sym_count": len(sym_hits),
+            "anchors": hit_anchors,
+            "intent": ctx.intent,
+            "harmony": ctx.harmony,
+        })
+        cadence_totals["answers"] += 1
+        cadence_totals["traveler_ok"] += int(had_traveler)
+        cadence_totals["guiding_ok"] += int(has_guiding)
+        cadence_totals["symbols_ok"] += int(has_syms)
+
+        # --- RAG summary line ---
+        cand_ids = {(d.get("doc_id") or d.get("id") or "") for d in (cands or []) if (d.get("doc_id") or d.get("id"))}
+        used_ids = {(d.get("doc_id") or d.get("id") or "") for d in (used or []) if (d.get("doc_id") or d.get("id"))}
+        forced_ids = {(d.get("doc_id") or d.get("id") or "") for d in (forced_cands or []) if (d.get("doc_id") or d.get("id"))}
+        combined_ids = set().union(cand_ids, used_ids, forced_ids)
+
+        jlog(
+            "rag.summary",
+            rag_candidates=len(cands or []),
+            used_sources=len(used or []),
+            forced_candidates=len(forced_cands or []),
+            combined=len(combined_ids),
+            pins=pins,
+        )
+
+        jlog(
+            "cadence.guard.ok",
+            had_traveler=had_traveler,
+            has_guiding=has_guiding,
+            has_syms=has_syms,
+            sym_hits="".join(sym_hits),
+            anchors=",".join(hit_anchors),
+        )
+    except Exception as _e:
+        shareable = False
+        jlog("cadence.guard.err", error=str(_e))
+
+    sage = (lucidity_result or {}).get("sage", "")
+    if shareable:
+        answer_cache.put(st["cache_key"], strip_guiding(final_text), provenance, pins, ctx.harmony,
+                         original_query, sage=sage)
+    if st.get("flight") is not None:
+        # followers get it now, before our own persistence; None = they run their own pipeline
+        st["flight"].land({
+            "text": strip_guiding(final_text), "sage": sage, "provenance": provenance, "pins": pins,
+            "harmony": ctx.harmony, "hits": 0,
+        } if shareable else None)
+
+    if st.get("persist", True):
+        with st["stages"].span("persist"):
+            await _persist_turn(
+                traveler_id, original_query or query, final_text, ctx.intent, ctx.harmony,
+                getattr(ctx, 'temporal_context', {}), getattr(ctx, 'symbol_analysis', {}),
             )
 
+    # module health gauges
+    MODULE_HEALTH.labels(module="temporal").set(HEALTH_STATUS["healthy" if temporal_breaker.state == "CLOSED" else "degraded"])
+    MODULE_HEALTH.labels(module="symbol").set(HEALTH_STATUS["healthy" if symbol_breaker.state == "CLOSED" else "degraded"])
+    MODULE_HEALTH.labels(module="conversation").set(HEALTH_STATUS["healthy" if conversation_breaker.state == "CLOSED" else "degraded"])
+
+    answer_out = _outbound(final_text)
+
+    jlog("final.preview", snippet=(answer_out or "")[:160], enh=[k for k, v in (ctx.enhanced_modules or {}).items() if v])
+
+    return AskResponse(
+        answer=answer_out,
+        meta={
+            "provenance": provenance,
+            "harmony": ctx.harmony,
+            "pins": pins,
+        },
+    )
+
+async def _ask_pipeline(req: AskRequest, request: Request, persist: bool = True) -> AskResponse:
+    """prepare → LLM → finalize (shared by /ask and answer-cache warming, persist=False)."""
+    flight = _Flight()
+    stages = _Stages()
+    st = resp = error = None
+    try:
+        st = await _ask_prepare(req, request, stages, flight=flight, persist=persist)
+        if st["early"] is not None:
+            resp = st["early"]
+            return resp
+        messages, allow_llm = st["messages"], st["allow_llm"]
+
+        llm_text = None
+        if allow_llm:
+            t_queue = time.perf_counter()
+            async with llm_gate.slot() as admitted:
+                stages.record("llm_queue", t_queue)
+                if not admitted:
+                    # shed: finalize falls back to the renderer / canon notice
+                    jlog("llm.shed", **{k: v for k, v in llm_gate.stats().items() if k in ("inflight", "queue_depth")})
+                else:
+                    try:
+                        llm_text = await _timed(st["stages"], "llm", llm.chat(
+                            messages, temperature=0.2, top_p=0.9, max_tokens=LLM_MAX_TOKENS
+                        ))
+                        jlog("llm.ok", len=len(llm_text or ""))
+                    except Exception as e:
+                        jlog("llm.err", error=str(e))
+                        llm_text = None
+
+        resp = await _timed(stages, "finalize", _ask_finalize(st, llm_text))
+        return resp
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        flight.land(None)  # no-op once finalize published the answer
+        _trace_ask(stages, req, st, resp, error)
+
+@app.post("/ask", response_model=AskResponse)
+async def ask_v4(req: AskRequest, request: Request):
+    start_ms = now_ms()
+
+    try:
+        with track_request("ask"):
+            return await _ask_pipeline(req, request)
+
     finally:
         REQS["ask"] += 1
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest, request: Request):
+    """
+    SSE variant of /ask. Events, in order:
+      retrieval   {count, top}                 as soon as multi_arc returns
+      provenance  {provenance, pins, rag_miss} after synthesis
+      delta       {text}                       raw LLM tokens (stream=true)
+      final       {answer, meta}               post-processed answer (cadence,
+                                               dedupe, off-ramp); replaces the deltas
+      error       {error}
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event: str, data: Any) -> None:
+        await queue.put(_sse(event, data))
+
+    async def run() -> None:
+        flight = _Flight()
+        stages = _Stages()
+        st = resp = error = None
+        try:
+            with track_request("ask_stream"):
+                st = await _ask_prepare(req, request, stages, emit=emit, flight=flight)
+                if st["early"] is not None:
+                    resp = st["early"]
+                    await emit("final", resp.dict())
+                    return
+                llm_text, llm_complete = None, True
+                if st["allow_llm"]:
+                    t_queue = time.perf_counter()
+                    async with llm_gate.slot() as admitted:
+                        stages.record("llm_queue", t_queue)
+                        if not admitted:
+                            jlog("llm.shed", stream=True)
+                        else:
+                            t0 = time.perf_counter()
+                            parts: List[str] = []
+                            ttft = None
+                            try:
+                                async for delta in llm.chat_stream(
+                                    st["messages"], temperature=0.2, top_p=0.9, max_tokens=LLM_MAX_TOKENS
+                                ):
+                                    if ttft is None:
+                                        ttft = time.perf_counter() - t0
+                                    parts.append(delta)
+                                    await emit("delta", {"text": delta})
+                                llm_text = "".join(parts) or None
+                                stages.record("llm", t0)
+                                jlog("llm.stream.ok", len=len(llm_text or ""), chunks=len(parts),
+                                     ttft_ms=round((ttft or 0.0) * 1000, 1))
+                            except Exception as e:
+                                # whatever streamed is served, but not cached or handed to followers
+                                jlog("llm.stream.err", error=str(e), chunks=len(parts))
+                                llm_text, llm_complete = "".join(parts) or None, False
+                resp = await _timed(stages, "finalize", _ask_finalize(st, llm_text, llm_complete))
+                await emit("final", resp.dict())
+        except Exception as e:
+            error = str(e)
+            jlog("ask.stream.err", error=error)
+            await emit("error", {"error": error})
+        finally:
+            flight.land(None)
+            _trace_ask(stages, req, st, resp, error)
+            REQS["ask"] += 1
+            await queue.put(None)
+
+    async def gen():
+        task = asyncio.create_task(run())
+        try:
+            yield ": stream open\n\n"  # flush headers right away
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            if not task.done():
+                task.cancel()  # client went away
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/health.html")
 def health_html():
     return RedirectResponse(url="/web/health.html")
@@ -1450,9 +2026,29 @@ def rites_run(m: str = Query("all", description="Module: all|guide|retriever|syn
         REQS["rites"] += 1
 
 @app.get("/ledger/summary")
-def ledger_summary():
+def ledger_summary(
+    since: float | None = Query(None, description="unix seconds, inclusive"),
+    until: float | None = Query(None, description="unix seconds, exclusive"),
+):
+    """Live runs plus archived months (see LEDGER_RETENTION_MONTHS)."""
     with track_request("ledger_summary"):
-        return app.state.ledger.summary()
+        return app.state.ledger.summary(since, until)
+
+@app.get("/ledger/search")
+def ledger_search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    since: float | None = Query(None, description="unix seconds, inclusive"),
+    until: float | None = Query(None, description="unix seconds, exclusive"),
+):
+    """BM25-ranked full-text search over past runs (answer + refined query)."""
+    with track_request("ledger_search"):
+        items = app.state.ledger.query_semantic(q, limit=limit, offset=offset, since=since, until=until)
+        return {
+            "q": q, "items": items, "offset": offset, "limit": limit,
+            "next_offset": offset + limit if len(items) == limit else None,
+        }
 
 @app.get("/learning/summary")
 def learning_summary(limit: int = 50):
@@ -1666,6 +2262,14 @@ def status():
                     "conversation": conversation_breaker.get_status(),
                 },
                 "requests": REQS,
+                "write_behind": app.state.writer.stats() if getattr(app.state, "writer", None) else None,
+                "llm_gate": llm_gate.stats(),
+                "executors": executor_stats(),
+                "log": log_sink.stats(),
+                "sqlite": db_stats(),
+                "ledger_writer": app.state.ledger.stats(),
+                "ledger_archive": app.state.archiver.stats() if getattr(app.state, "archiver", None) else None,
+                "identity_cache": identity_cache.stats(),
                 "gpu": gpu,        # <--- NEW
                 "host": host,      # <--- NEW
                 "env": {
@@ -0,0 +1,135 @@
+from __future__ import annotations
+# Admission control in front of the LLM.
+#
+# At most LLM_MAX_CONCURRENCY completions run at once; up to LLM_MAX_QUEUE
+# more wait (FIFO) for at most LLM_QUEUE_TIMEOUT_SECS. Anything beyond that is
+# shed: the caller skips the LLM and answers from the renderer path, so a burst
+# degrades answer style instead of stalling every request.
+#
+# Single event loop only (the server's); slots are handed directly from
+# release() to the next waiter, so a late arrival can't jump the queue.
+#
+# Env:
+#   LLM_MAX_CONCURRENCY=4
+#   LLM_MAX_QUEUE=32
+#   LLM_QUEUE_TIMEOUT_SECS=5
+
+import os, time, asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+
+try:
+    from .metrics import (
+        mv4_llm_admission_total, mv4_llm_queue_depth, mv4_llm_inflight, mv4_llm_queue_wait_seconds,
+    )
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+        def set(self, *a, **k): pass
+        def observe(self, *a, **k): pass
+    mv4_llm_admission_total = mv4_llm_queue_depth = mv4_llm_inflight = mv4_llm_queue_wait_seconds = _DummyMetric()
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT_SECS", "5"))
+
+
+class AdmissionGate:
+    """Counting semaphore with a bounded FIFO queue and a max queue wait."""
+
+    def __init__(self, limit: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 max_wait: float = LLM_QUEUE_TIMEOUT):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max(0.0, max_wait)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.counts = {"admitted": 0, "queued": 0, "timeout": 0, "rejected": 0}
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _count(self, result: str) -> None:
+        self.counts[result] += 1
+        mv4_llm_admission_total.labels(result=result).inc()
+
+    def _gauges(self) -> None:
+        mv4_llm_queue_depth.set(len(self._waiters))
+        mv4_llm_inflight.set(self.active)
+
+    async def acquire(self) -> bool:
+        """True once a slot is held; False when the queue is full or the wait timed out."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._count("admitted")
+            self._gauges()
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self._count("rejected")
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._count("queued")
+        self._gauges()
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait({fut}, timeout=self.max_wait)
+        except BaseException:
+            # cancelled while queued: give back a slot we were handed meanwhile
+            if fut.done() and not fut.cancelled():
+                self.release()
+            else:
+                fut.cancel()
+                self._discard(fut)
+            raise
+        finally:
+            mv4_llm_queue_wait_seconds.observe(time.perf_counter() - t0)
+        if fut.done():
+            self._count("admitted")
+            return True
+        fut.cancel()
+        self._discard(fut)
+        self._count("timeout")
+        return False
+
+    def _discard(self, fut: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+        self._gauges()
+
+    def release(self) -> None:
+        # hand the slot straight to the next live waiter (active stays the same)
+        while self._waiters:
+            w = self._waiters.popleft()
+            if not w.done():
+                w.set_result(True)
+                self._gauges()
+                return
+        self.active = max(0, self.active - 1)
+        self._gauges()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[bool]:
+        ok = await self.acquire()
+        try:
+            yield ok
+        finally:
+            if ok:
+                self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit, "max_queue": self.max_queue, "max_wait_sec": self.max_wait,
+            "inflight": self.active, "queue_depth": len(self._waiters), **self.counts,
+        }
+
+
+llm_gate = AdmissionGate()
+
+__all__ = ["AdmissionGate", "llm_gate"]
@@ -0,0 +1,152 @@
+from __future__ import annotations
+# Full-answer cache for /ask.
+#
+# Canon questions repeat a lot (Telegram groups), and each miss pays for
+# retrieval, synthesis, resonance and an LLM completion. Entries hold the
+# finished answer *without* its Guiding Question plus provenance/pins/harmony
+# and the lucidity "sage" line that per-traveler memory records;
+# the server re-applies cadence on every hit so travelers still get a fresh,
+# randomized question.
+#
+# Keys: (generation, normalized question, intent, pins). The question is the
+# traveler's own wording, not the guide's refined query, since the stored
+# text was anchored and cadenced for it. The generation tuple carries the
+# retriever index generation, the prompt-file generation and the LLM model,
+# so a reindex, a prompt edit or a model swap can never serve a stale answer
+# (old keys just age out of the LRU).
+#
+# Env:
+#   ANSWER_CACHE_SIZE=1024   (0 disables)
+#   ANSWER_CACHE_TTL=3600    (seconds; 0 = no expiry)
+
+import os, re, time, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from .metrics import mv4_answer_cache_total, mv4_answer_cache_entries
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+        def set(self, *a, **k): pass
+    mv4_answer_cache_total = mv4_answer_cache_entries = _DummyMetric()
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_GQ_LINE = re.compile(r"(?im)^[^\n]*?(?:\*\*\s*)?guiding\s*question\s*[:：][^\n]*\n?")
+
+
+def normalize_query(q: str) -> str:
+    """Case/punctuation/whitespace-insensitive form of a question."""
+    return " ".join(_WORD.findall((q or "").lower()))
+
+
+def strip_guiding(text: str) -> str:
+    """Drop Guiding Question lines so a cached answer can get a fresh one per hit."""
+    return _GQ_LINE.sub("", text or "").rstrip()
+
+
+def answer_key(generation: tuple, query: str, intent: Optional[str],
+               pins: Sequence[str] = ()) -> tuple:
+    return (tuple(generation), normalize_query(query), intent or "", tuple(pins or ()))
+
+
+class AnswerCache:
+    """Bounded LRU + TTL map of finished answers (thread-safe)."""
+
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = self.stores = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        if not self.maxsize:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl > 0 and time.monotonic() - item["_at"] > self.ttl:
+                del self._data[key]
+                self.expired += 1
+                mv4_answer_cache_total.labels(result="expire").inc()
+                item = None
+            if item is None:
+                self.misses += 1
+                mv4_answer_cache_total.labels(result="miss").inc()
+                mv4_answer_cache_entries.set(len(self._data))
+                return None
+            self._data.move_to_end(key)
+            item["hits"] += 1
+            self.hits += 1
+            out = {k: v for k, v in item.items() if not k.startswith("_")}
+        mv4_answer_cache_total.labels(result="hit").inc()
+        return out
+
+    def put(self, key: tuple, text: str, provenance: List[str], pins: List[str],
+            harmony: Optional[float], question: str = "", sage: str = "") -> None:
+        if not self.maxsize or not (text or "").strip():
+            return
+        entry = {
+            "text": text,
+            "sage": sage or "",  # the run's lucidity distillate (what memory stores), if known
+            "provenance": list(provenance or []),
+            "pins": list(pins or []),
+            "harmony": harmony,
+            "question": (question or "")[:200],
+            "stored_ts": time.time(),
+            "hits": 0,
+            "_at": time.monotonic(),
+        }
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            self.stores += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+                mv4_answer_cache_total.labels(result="evict").inc()
+            mv4_answer_cache_entries.set(len(self._data))
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+        mv4_answer_cache_entries.set(0)
+        return n
+
+    def entries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently used first, without the answer bodies."""
+        if limit <= 0:
+            return []  # a [-0:] slice would return every entry
+        with self._lock:
+            items: List[Tuple[tuple, Dict[str, Any]]] = list(self._data.items())[-limit:][::-1]
+            now = time.monotonic()
+            return [{
+                "query": k[1], "intent": k[2], "pins": list(k[3]),
+                "question": v["question"], "hits": v["hits"],
+                "age_sec": round(now - v["_at"], 1), "chars": len(v["text"]),
+                "provenance": v["provenance"][:5],
+            } for k, v in items]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "size": size, "maxsize": self.maxsize, "ttl_sec": self.ttl,
+            "hits": self.hits, "misses": self.misses, "stores": self.stores,
+            "evictions": self.evictions, "expired": self.expired,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+__all__ = ["AnswerCache", "answer_key", "normalize_query", "strip_guiding",
+           "ANSWER_CACHE_SIZE", "ANSWER_CACHE_TTL"]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+# Long-lived, thread-local SQLite connections (memory, identity, Memori status).
+#
+# Those modules used to sqlite3.connect() per call — 6-10 opens per /ask, each
+# re-reading the schema and discarding sqlite3's per-connection statement
+# cache. Here every thread (db-write pool, write-behind worker, request
+# threads) keeps one WAL-tuned connection per database file for the life of
+# the process, so prepared statements are reused across calls.
+#
+# Connections run in autocommit (isolation_level=None); group statements with
+#   with shared_db(path).transaction(immediate=True) as con: ...
+# Nested transaction() blocks join the outer one. Use immediate=True when the
+# block reads then writes, so two writers can't both hold a stale snapshot.
+#
+# Env:
+#   SQLITE_BUSY_TIMEOUT_MS=5000
+#   SQLITE_CACHE_KB=8192       (page cache per connection)
+#   SQLITE_STMT_CACHE=256      (prepared statements kept per connection)
+
+import os, sqlite3, threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "8192"))
+SQLITE_STMT_CACHE = int(os.getenv("SQLITE_STMT_CACHE", "256"))
+
+
+class SharedDB:
+    """One SQLite file; one persistent connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+        self._ensured: set = set()
+        self.opened = 0
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0, isolation_level=None,
+            check_same_thread=False, cached_statements=SQLITE_STMT_CACHE,
+        )
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.execute("PRAGMA synchronous=NORMAL;")
+        con.execute("PRAGMA temp_store=MEMORY;")
+        con.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB};")
+        with self._lock:
+            self._all.append(con)
+            self.opened += 1
+        return con
+
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection (opened on first use)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = self._open()
+        return con
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        con = self.conn()
+        if con.in_transaction:  # nested: the outer block commits
+            yield con
+            return
+        con.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
+
+    def ensure(self, name: str, fn: Callable[[sqlite3.Connection], None]) -> None:
+        """Run schema setup `fn` once per process for this file."""
+        if name in self._ensured:
+            return
+        con = self.conn()  # outside the lock: opening a connection takes it too
+        with self._lock:
+            if name in self._ensured:
+                return
+            fn(con)
+            self._ensured.add(name)
+
+    def close_all(self) -> None:
+        with self._lock:
+            cons, self._all = self._all, []
+            self._ensured.clear()
+        for con in cons:
+            try:
+                con.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"path": self.path, "connections": len(self._all), "opened": self.opened}
+
+
+_DBS: Dict[str, SharedDB] = {}
+_DBS_LOCK = threading.Lock()
+
+
+def shared_db(path: str) -> SharedDB:
+    """The process-wide SharedDB for `path` (keyed by absolute path)."""
+    key = os.path.abspath(path)
+    db = _DBS.get(key)
+    if db is None:
+        with _DBS_LOCK:
+            db = _DBS.get(key)
+            if db is None:
+                db = _DBS[key] = SharedDB(path)
+    return db
+
+
+def close_all_dbs() -> None:
+    with _DBS_LOCK:
+        dbs = list(_DBS.values())
+    for db in dbs:
+        db.close_all()
+
+
+def db_stats() -> List[Dict[str, object]]:
+    with _DBS_LOCK:
+        return [db.stats() for db in _DBS.values()]
+
+
+__all__ = ["SharedDB", "shared_db", "close_all_dbs", "db_stats"]
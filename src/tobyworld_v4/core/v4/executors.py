@@ -0,0 +1,123 @@
+from __future__ import annotations
+# Named, bounded thread pools per pipeline stage.
+#
+# asyncio.to_thread() shares one default executor across everything, so a
+# burst of slow SQLite writes can starve retrieval threads (and vice versa).
+# Each stage gets its own pool instead, sized independently and exported as
+# mv4_executor_{queue_depth,active_threads}{pool} plus a queue-wait histogram.
+#
+#   retrieval  multi_arc, canon re-pins, Memori recall, conversation history
+#   db-write   identity resolution (creates rows), inline persistence fallback
+#   cpu        synthesis, temporal/symbol analysis
+#
+# LLM completions don't need a pool: AsyncLLMClient is natively async and
+# bounded by the admission gate (LLM_MAX_CONCURRENCY).
+#
+# Env:
+#   EXEC_RETRIEVAL_WORKERS=8
+#   EXEC_DB_WRITE_WORKERS=4
+#   EXEC_CPU_WORKERS=min(8, cpu_count)
+
+import os, time, asyncio, threading, contextvars, functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+try:
+    from .metrics import mv4_executor_queue_depth, mv4_executor_active_threads, mv4_executor_wait_seconds
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def set(self, *a, **k): pass
+        def observe(self, *a, **k): pass
+    mv4_executor_queue_depth = mv4_executor_active_threads = mv4_executor_wait_seconds = _DummyMetric()
+
+POOL_SIZES: Dict[str, int] = {
+    "retrieval": int(os.getenv("EXEC_RETRIEVAL_WORKERS", "8")),
+    "db-write": int(os.getenv("EXEC_DB_WRITE_WORKERS", "4")),
+    "cpu": int(os.getenv("EXEC_CPU_WORKERS", str(min(8, os.cpu_count() or 1)))),
+}
+
+
+class StageExecutor:
+    """ThreadPoolExecutor wrapper that tracks queued vs running work."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"mv4-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+
+    def _gauges(self) -> None:
+        mv4_executor_queue_depth.labels(pool=self.name).set(self.queued)
+        mv4_executor_active_threads.labels(pool=self.name).set(self.active)
+
+    def _call(self, fn: Callable[[], Any], t_sub: float) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        self._gauges()
+        mv4_executor_wait_seconds.labels(pool=self.name).observe(time.perf_counter() - t_sub)
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._gauges()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Like asyncio.to_thread (contextvars included), but on this stage's pool."""
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        with self._lock:
+            self.queued += 1
+        self._gauges()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._call, call, time.perf_counter())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"workers": self.workers, "queue_depth": self.queued,
+                    "active": self.active, "completed": self.completed}
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_POOLS: Dict[str, StageExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def executor(name: str) -> StageExecutor:
+    """The named stage pool (created on first use)."""
+    ex = _POOLS.get(name)
+    if ex is None:
+        with _POOLS_LOCK:
+            ex = _POOLS.get(name)
+            if ex is None:
+                if name not in POOL_SIZES:
+                    raise KeyError(f"unknown executor {name!r}")
+                ex = _POOLS[name] = StageExecutor(name, POOL_SIZES[name])
+    return ex
+
+
+async def run_in(name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    return await executor(name).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: ex.stats() for name, ex in list(_POOLS.items())}
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for ex in pools:
+        ex.shutdown(wait=wait)
+
+
+__all__ = ["StageExecutor", "POOL_SIZES", "executor", "run_in", "executor_stats", "shutdown_executors"]
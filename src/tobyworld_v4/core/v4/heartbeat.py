@@ -5,6 +5,7 @@ from .config import config
 from . import retriever as retr
 from .ledger import Ledger
 from .learning import Learning
+from .admission import llm_gate
 
 class Heartbeat:
     """
@@ -22,9 +23,9 @@ class Heartbeat:
         now = time.time()
         uptime = now - self.start_ts
 
-        # synthetic latency / queue for now (stub until async queue added)
+        # synthetic latency for now; queue depth = requests waiting for an LLM slot
         lat_ms = round(2.0 + random.random() * 3.0, 3)
-        queue_depth = 0
+        queue_depth = llm_gate.waiting
 
         # ledger + learning stats
         ledger_summary = {}
@@ -46,6 +47,7 @@ class Heartbeat:
             "uptime_sec": round(uptime, 2),
             "lat_ms": lat_ms,
             "queue_depth": queue_depth,
+            "llm_inflight": llm_gate.active,
             "scrolls_loaded": scrolls_loaded,
             "ledger": ledger_summary,
             "learning": learning_summary,
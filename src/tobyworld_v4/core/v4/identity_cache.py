@@ -0,0 +1,151 @@
+from __future__ import annotations
+# In-process cache for Memory.resolve_user: user token → (traveler_id, profile).
+#
+# The same Telegram user sends several messages a minute; each one used to
+# hit SQLite just to map "tg:123" to a traveler id and profile. Entries are
+# kept current by write-through from Memory (_bump_learning /
+# set_preferences) and dropped by merge_travelers / forget_traveler.
+#
+# A miss takes mark() before reading SQLite and only stores its result if
+# that traveler saw no write-through or invalidation since, so a slow read
+# can't overwrite a fresher profile. Other uvicorn workers
+# don't see these writes; the TTL bounds that staleness.
+#
+# Env:
+#   IDENTITY_CACHE_SIZE=4096   (0 disables)
+#   IDENTITY_CACHE_TTL=60      (seconds; 0 = no expiry)
+
+import os, time, threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+try:
+    from .metrics import mv4_identity_cache_total, mv4_identity_cache_entries
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+        def set(self, *a, **k): pass
+    mv4_identity_cache_total = mv4_identity_cache_entries = _DummyMetric()
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "4096"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+
+
+class IdentityCache:
+    """Bounded LRU + TTL of token → (traveler_id, profile), indexed by traveler (thread-safe)."""
+
+    def __init__(self, maxsize: int = IDENTITY_CACHE_SIZE, ttl: float = IDENTITY_CACHE_TTL):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Tuple[str, Dict[str, Any], float]]" = OrderedDict()
+        self._by_tid: Dict[str, Set[tuple]] = {}
+        self._touched: Dict[str, int] = {}  # traveler_id → write seq of its last change
+        self._seq = 0
+        self._floor = 0  # puts older than this are refused (after _touched is pruned)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _drop(self, key: tuple) -> None:
+        tid, _, _ = self._data.pop(key)
+        keys = self._by_tid.get(tid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_tid[tid]
+
+    def get(self, key: tuple) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if not self.maxsize:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl > 0 and time.monotonic() - item[2] > self.ttl:
+                self._drop(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                mv4_identity_cache_total.labels(result="miss").inc()
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            tid, prof = item[0], dict(item[1])
+        mv4_identity_cache_total.labels(result="hit").inc()
+        return tid, prof
+
+    def mark(self) -> int:
+        """Write sequence to pass to put() when the read that follows finishes."""
+        with self._lock:
+            return self._seq
+
+    def _touch(self, traveler_id: str) -> None:
+        self._seq += 1
+        if len(self._touched) >= 4 * max(self.maxsize, 256):
+            self._touched.clear()
+            self._floor = self._seq
+        self._touched[traveler_id] = self._seq
+
+    def put(self, key: tuple, traveler_id: str, profile: Dict[str, Any], since: Optional[int] = None) -> None:
+        """Store a resolved identity; skipped if `traveler_id` changed after mark() returned `since`."""
+        if not self.maxsize or not traveler_id:
+            return
+        with self._lock:
+            if since is not None and (since < self._floor or self._touched.get(traveler_id, 0) > since):
+                return
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (traveler_id, dict(profile or {}), time.monotonic())
+            self._by_tid.setdefault(traveler_id, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+                mv4_identity_cache_total.labels(result="evict").inc()
+            mv4_identity_cache_entries.set(len(self._data))
+
+    def update_profile(self, traveler_id: str, **fields) -> None:
+        """Write-through: patch the cached profile of every token mapped to `traveler_id`."""
+        with self._lock:
+            self._touch(traveler_id)
+            for key in self._by_tid.get(traveler_id, ()):
+                tid, prof, at = self._data[key]
+                self._data[key] = (tid, {**prof, **fields}, at)
+
+    def invalidate_traveler(self, *traveler_ids: str) -> int:
+        n = 0
+        with self._lock:
+            for traveler_id in traveler_ids:
+                self._touch(traveler_id)
+                for key in list(self._by_tid.get(traveler_id, ())):
+                    self._drop(key)
+                    n += 1
+            self.invalidations += n
+            mv4_identity_cache_entries.set(len(self._data))
+        if n:
+            mv4_identity_cache_total.labels(result="invalidate").inc(n)
+        return n
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            self._by_tid.clear()
+            self._touched.clear()
+            self._seq += 1
+            self._floor = self._seq
+        mv4_identity_cache_entries.set(0)
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "size": size, "maxsize": self.maxsize, "ttl_sec": self.ttl,
+            "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+identity_cache = IdentityCache()
+
+__all__ = ["IdentityCache", "identity_cache", "IDENTITY_CACHE_SIZE", "IDENTITY_CACHE_TTL"]
@@ -1,12 +1,54 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Optional
-import os, time, json, sqlite3, threading
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+import os, re, math, time, json, zlib, queue, sqlite3, threading, logging
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from .config import config
+from .dbconn import SharedDB, shared_db
+from .learning import STOP as _STOPWORDS
+
+try:
+    import zstandard as _zstd  # optional: smaller + faster than zlib
+except Exception:  # pragma: no cover
+    _zstd = None
+
+try:
+    from .metrics import (
+        mv4_ledger_rows_total, mv4_ledger_queue_depth,
+        mv4_ledger_batch_size, mv4_ledger_commit_seconds,
+    )
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+        def set(self, *a, **k): pass
+        def observe(self, *a, **k): pass
+    mv4_ledger_rows_total = mv4_ledger_queue_depth = _DummyMetric()
+    mv4_ledger_batch_size = mv4_ledger_commit_seconds = _DummyMetric()
+
+log = logging.getLogger(__name__)
 
 # LEDGER_DB can be set to an absolute path or a filename under the CWD.
 # Default: mirror-v4.db in the project root.
 _DB_PATH = os.getenv("LEDGER_DB", "mirror-v4.db")
 
+# Group commit: rows from concurrent requests are inserted by one writer
+# thread, one transaction per LEDGER_FLUSH_MS window (or LEDGER_BATCH rows),
+# instead of one commit per /ask under a global lock. Only fire-and-forget
+# submit() rows wait for the window; a blocking log() flushes at once, taking
+# whatever else is queued with it.
+#   LEDGER_GROUP_COMMIT=1   (0 = insert + commit on the caller's thread)
+#   LEDGER_FLUSH_MS=10
+#   LEDGER_BATCH=256
+#   LEDGER_QUEUE=10000      (full → the caller writes its row inline)
+#   LEDGER_LOG_TIMEOUT_SEC=30  (a blocking log() still queued after this writes inline)
+#   LEDGER_CTX_CODEC=auto   (auto = zstd if installed, else zlib | zlib | json)
+LEDGER_GROUP_COMMIT = os.getenv("LEDGER_GROUP_COMMIT", "1").strip().lower() not in ("0", "false", "no", "off")
+LEDGER_FLUSH_MS = float(os.getenv("LEDGER_FLUSH_MS", "10"))
+LEDGER_BATCH = int(os.getenv("LEDGER_BATCH", "256"))
+LEDGER_QUEUE = int(os.getenv("LEDGER_QUEUE", "10000"))
+LEDGER_LOG_TIMEOUT_SEC = float(os.getenv("LEDGER_LOG_TIMEOUT_SEC", "30"))
+LEDGER_CTX_CODEC = os.getenv("LEDGER_CTX_CODEC", "auto").strip().lower()
+
 _SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS runs (
     id              INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -18,95 +60,464 @@ CREATE TABLE IF NOT EXISTS runs (
     answer          TEXT,
     retrieval_count INTEGER,
     final_json      TEXT,
-    ctx_json        TEXT
+    ctx_json        TEXT,
+    ctx_codec       TEXT
 );
 CREATE INDEX IF NOT EXISTS idx_runs_ts ON runs(ts DESC);
 CREATE INDEX IF NOT EXISTS idx_runs_user ON runs(user_id);
-CREATE INDEX IF NOT EXISTS idx_runs_text ON runs(answer);
 """
 
+# Full-text search over runs: contentless FTS5 (no second copy of the text),
+# rowid = runs.id, maintained by triggers so every insert path (group commit,
+# inline, scripts) stays in sync. Created + backfilled once by _migrate().
+_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+        refined_query, answer,
+        content = '', tokenize = 'porter'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS runs_fts_ai AFTER INSERT ON runs BEGIN
+        INSERT INTO runs_fts(rowid, refined_query, answer) VALUES (new.id, new.refined_query, new.answer);
+    END""",
+    # contentless tables delete by replaying the indexed values
+    """CREATE TRIGGER IF NOT EXISTS runs_fts_ad AFTER DELETE ON runs BEGIN
+        INSERT INTO runs_fts(runs_fts, rowid, refined_query, answer)
+        VALUES ('delete', old.id, old.refined_query, old.answer);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS runs_fts_au AFTER UPDATE OF refined_query, answer ON runs BEGIN
+        INSERT INTO runs_fts(runs_fts, rowid, refined_query, answer)
+        VALUES ('delete', old.id, old.refined_query, old.answer);
+        INSERT INTO runs_fts(rowid, refined_query, answer) VALUES (new.id, new.refined_query, new.answer);
+    END""",
+]
+
+def _fts_supported() -> bool:
+    try:
+        con = sqlite3.connect(":memory:")
+        con.execute("CREATE VIRTUAL TABLE t USING fts5(a);")
+        con.close()
+        return True
+    except Exception:
+        return False
+
+_SUPPORTS_FTS = _fts_supported()
+
+_INSERT_SQL = """
+INSERT INTO runs (ts, user_id, intent, refined_query, harmony, answer,
+                  retrieval_count, final_json, ctx_json, ctx_codec)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_Row = Tuple[Any, ...]
+
+# ---------- search terms ----------
+_TERM = re.compile(r"[^\W_]+", re.U)
+
+def _terms(q: str, limit: int = 16) -> List[str]:
+    """Query terms: lowercase words minus stopwords (all words if that leaves none)."""
+    words = [w.lower() for w in _TERM.findall(q or "")]
+    kept = [w for w in words if w not in _STOPWORDS] or words
+    return list(dict.fromkeys(kept))[:limit]
+
+def _match_expr(terms: List[str]) -> str:
+    # "lotus" OR "pond": bm25 ranks runs matching more (and rarer) terms first
+    return " OR ".join(f'"{t}"' for t in terms)
+
+def _ts_range(since: Optional[float], until: Optional[float]) -> Tuple[float, float]:
+    return (float(since) if since is not None else float("-inf"),
+            float(until) if until is not None else float("inf"))
+
+# ---------- compact ctx storage ----------
+def _codec() -> str:
+    if LEDGER_CTX_CODEC in ("zstd", "auto") and _zstd is not None:
+        return "zstd"
+    if LEDGER_CTX_CODEC == "json":
+        return "json"
+    return "zlib"
+
+def _ref_chunks(items: Any) -> Any:
+    """Retrieved chunks keep doc_id + span (enough to re-read the scroll); the text goes."""
+    if not isinstance(items, list):
+        return items
+    out = []
+    for c in items:
+        if isinstance(c, dict) and "text" in c and (c.get("doc_id") or c.get("id")):
+            text = c.get("text") or ""
+            c = {k: v for k, v in c.items() if k != "text"}
+            c["chars"] = len(text)
+        out.append(c)
+    return out
+
+def compact_ctx(run_ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What goes into ctx_json: the run without `final` (already in final_json)
+    and with retrieval texts replaced by doc-id references.
+    """
+    ctx = {k: v for k, v in run_ctx.items() if k != "final"}
+    for key in ("retrieval", "retriever"):
+        if key in ctx:
+            ctx[key] = _ref_chunks(ctx[key])
+    draft = ctx.get("draft")
+    trace = draft.get("trace") if isinstance(draft, dict) else None
+    if isinstance(trace, dict) and "used" in trace:
+        ctx["draft"] = {**draft, "trace": {**trace, "used": _ref_chunks(trace["used"])}}
+    return ctx
+
+def encode_ctx(ctx: Dict[str, Any], codec: Optional[str] = None) -> Tuple[Any, str]:
+    codec = codec or _codec()
+    raw = json.dumps(ctx, ensure_ascii=False, separators=(",", ":"))
+    if codec == "json":
+        return raw, codec
+    data = raw.encode("utf-8")
+    if codec == "zstd":
+        return _zstd.ZstdCompressor(level=3).compress(data), codec
+    return zlib.compress(data, 3), "zlib"
+
+def decode_ctx(data: Any, codec: Optional[str]) -> Dict[str, Any]:
+    if data is None:
+        return {}
+    if not codec or codec == "json":  # rows written before ctx_codec existed
+        return json.loads(data)
+    if codec == "zlib":
+        return json.loads(zlib.decompress(data))
+    if codec == "zstd":
+        if _zstd is None:
+            raise RuntimeError("ledger row is zstd-compressed but zstandard is not installed")
+        return json.loads(_zstd.ZstdDecompressor().decompress(data))
+    raise ValueError(f"unknown ledger ctx codec {codec!r}")
+
+def _row(run_ctx: Dict[str, Any]) -> _Row:
+    """Serialize one run (on the caller's thread, so the writer only inserts)."""
+    ts = float(time.time())
+    user_id = ""
+    try:
+        u = run_ctx.get("user") or {}
+        if isinstance(u, dict):
+            user_id = str(u.get("id", ""))[:200]
+        else:
+            user_id = str(u)[:200]
+    except Exception:
+        user_id = ""
+
+    intent = str(run_ctx.get("intent") or "")[:100]
+    refined_query = str(run_ctx.get("refined_query") or "")[:2000]
+    harmony = float(run_ctx.get("harmony") or 0.0)
+
+    final = run_ctx.get("final") or {}
+    # keep answer reasonably bounded to avoid bloating the DB
+    answer = str(final.get("sage") or final.get("novice") or "")[:4000]
+
+    # /ask stores candidates as ctx.retriever
+    retrieval = run_ctx.get("retrieval") or run_ctx.get("retriever") or []
+    retrieval_count = int(len(retrieval))
+
+    final_json = json.dumps(final, ensure_ascii=False)
+    ctx_data, codec = encode_ctx(compact_ctx(run_ctx))
+    return (ts, user_id, intent, refined_query, harmony, answer,
+            retrieval_count, final_json, ctx_data, codec)
+
+# ---------- group commit ----------
+_STOP = object()
+
+class _GroupCommit:
+    """One thread; queued rows from many requests share one transaction."""
+
+    def __init__(self, db: SharedDB, flush_ms: float = LEDGER_FLUSH_MS,
+                 batch: int = LEDGER_BATCH, maxsize: int = LEDGER_QUEUE):
+        self.db = db
+        self.linger = max(0.0, flush_ms) / 1000.0
+        self.batch = max(1, batch)
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._lock = threading.Lock()
+        self.rows = self.batches = self.errors = 0
+
+    def start(self) -> bool:
+        if self._thread is not None:
+            return False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="mv4-ledger", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Commit everything queued, then stop."""
+        t = self._thread
+        if t is None:
+            return
+        self._closing = True  # rows submitted from here on are written inline by their callers
+        self._q.put(_STOP)
+        t.join(timeout)
+        self._thread = None
+        if t.is_alive():
+            log.warning("[LEDGER] writer stop timed out with %d rows queued", self._q.qsize())
+            return
+        # rows that slipped in behind the sentinel (submit raced the _closing flag)
+        items = []
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                items.append(item)
+        if items:
+            self._flush(items)
+        mv4_ledger_queue_depth.set(self._q.qsize())
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, row: _Row, then: Optional[Callable[[int], None]] = None,
+               urgent: bool = False) -> Optional[Future]:
+        """Queue a row (urgent = a caller is blocked on it); None if stopping, stopped or full (caller writes it inline)."""
+        if self._closing or not self.running:
+            return None
+        fut: Future = Future()
+        try:
+            self._q.put_nowait((row, fut, then, urgent))
+        except queue.Full:
+            return None
+        mv4_ledger_queue_depth.set(self._q.qsize())
+        return fut
+
+    def _take(self) -> Tuple[list, bool]:
+        # rows whose blocked log() caller gave up (cancelled its future) were written inline; skip them
+        first = self._q.get()
+        if first is _STOP:
+            return [], True
+        items = [first] if first[1].set_running_or_notify_cancel() else []
+        deadline = time.perf_counter() + (0.0 if first[3] else self.linger)
+        while len(items) < self.batch:
+            wait = deadline - time.perf_counter()
+            try:
+                item = self._q.get(timeout=wait) if wait > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return items, True
+            if item[1].set_running_or_notify_cancel():
+                items.append(item)
+            if item[3]:
+                deadline = 0.0  # someone is waiting: take what's queued, don't linger
+        return items, False
+
+    def _write(self, rows: List[_Row]) -> List[int]:
+        with self.db.transaction(immediate=True) as con:
+            return [int(con.execute(_INSERT_SQL, r).lastrowid) for r in rows]
+
+    def _flush(self, items: list) -> None:
+        t0 = time.perf_counter()
+        try:
+            results: List[Any] = self._write([r for r, _, _, _ in items])
+        except Exception as e:
+            # one bad row must not take the batch down: retry each on its own
+            log.warning("[LEDGER] batch of %d failed (%s); retrying row by row", len(items), e)
+            results = []
+            for r, _, _, _ in items:
+                try:
+                    results.append(self._write([r])[0])
+                except Exception as e1:
+                    results.append(e1)
+        mv4_ledger_commit_seconds.observe(time.perf_counter() - t0)
+        mv4_ledger_batch_size.observe(len(items))
+        errors = 0
+        for (_, fut, then, _), res in zip(items, results):
+            if isinstance(res, Exception):
+                errors += 1
+                fut.set_exception(res)
+                continue
+            fut.set_result(res)
+            if then is not None:
+                try:
+                    then(res)
+                except Exception as e:
+                    log.exception("[LEDGER] post-commit callback failed: %s", e)
+        with self._lock:
+            self.rows += len(items) - errors
+            self.errors += errors
+            self.batches += 1
+        mv4_ledger_rows_total.labels(result="ok").inc(len(items) - errors)
+        if errors:
+            mv4_ledger_rows_total.labels(result="error").inc(errors)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            items, stop = self._take()
+            if items:
+                self._flush(items)
+            mv4_ledger_queue_depth.set(self._q.qsize())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows, batches, errors = self.rows, self.batches, self.errors
+        return {
+            "running": self.running, "queue_depth": self._q.qsize(), "queue_max": self._q.maxsize,
+            "flush_ms": self.linger * 1000.0, "batch_max": self.batch,
+            "rows": rows, "batches": batches, "errors": errors,
+            "avg_batch": round(rows / batches, 2) if batches else 0.0,
+        }
+
 class _SQLiteLedger:
     def __init__(self, db_path: str):
-        # check_same_thread=False so FastAPI workers can share; guard with a lock.
+        # per-thread connections (dbconn); inserts go through the group-commit writer once started
         self.db_path = db_path
-        self._lock = threading.Lock()
-        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self._conn.execute("PRAGMA journal_mode=WAL;")
-        self._conn.execute("PRAGMA synchronous=NORMAL;")
-        self._conn.executescript(_SCHEMA_SQL)
-        self._conn.commit()
+        self._db = shared_db(db_path)
+        self._db.ensure("ledger", self._ensure)
+        self._writer = _GroupCommit(self._db)
 
-    def close(self):
+    @staticmethod
+    def _ensure(con: sqlite3.Connection) -> None:
+        con.executescript(_SCHEMA_SQL)
+        _SQLiteLedger._migrate(con)
+
+    @staticmethod
+    def _migrate(con: sqlite3.Connection) -> None:
+        """
+        One-shot upgrades for older ledgers:
+          - add runs.ctx_codec (NULL = plain JSON ctx, as older rows were written)
+          - drop idx_runs_text: an index on the full answer text that nothing
+            queries (LIKE '%q%' can't use it) but every insert paid for
+          - create runs_fts and index the existing runs
+        Older rows keep their plain ctx_json; compact_legacy() rewrites them.
+        """
+        cols = {r[1] for r in con.execute("PRAGMA table_info(runs)")}
+        if "ctx_codec" not in cols:
+            con.execute("ALTER TABLE runs ADD COLUMN ctx_codec TEXT")
+        con.execute("DROP INDEX IF EXISTS idx_runs_text")
+        if _SUPPORTS_FTS:
+            _SQLiteLedger._migrate_fts(con)
+
+    @staticmethod
+    def _migrate_fts(con: sqlite3.Connection) -> None:
+        """Create runs_fts + triggers and index existing runs, atomically (other workers may race)."""
+        con.execute("BEGIN IMMEDIATE")
         try:
-            self._conn.close()
-        except Exception:
-            pass
+            if not con.execute("SELECT 1 FROM sqlite_master WHERE name='runs_fts'").fetchone():
+                for stmt in _FTS_DDL:
+                    con.execute(stmt)
+                n = con.execute(
+                    "INSERT INTO runs_fts(rowid, refined_query, answer) SELECT id, refined_query, answer FROM runs"
+                ).rowcount
+                log.info("[LEDGER][MIGRATE] indexed %d runs for full-text search", n)
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
+
+    def start(self) -> bool:
+        return self._writer.start()
+
+    def close(self):
+        self._writer.stop()
+
+    def _log_inline(self, row: _Row) -> int:
+        with self._db.transaction(immediate=True) as con:
+            run_id = int(con.execute(_INSERT_SQL, row).lastrowid)
+        mv4_ledger_rows_total.labels(result="inline").inc()
+        return run_id
 
     def log(self, run_ctx: Dict[str, Any]) -> int:
         """
-        Store a single run. Returns row id.
+        Store a single run. Returns row id (waits for the group commit when the writer runs).
         """
-        ts = float(time.time())
-        user_id = ""
+        row = _row(run_ctx)
+        fut = self._writer.submit(row, urgent=True)
+        if fut is None:
+            return self._log_inline(row)
         try:
-            u = run_ctx.get("user") or {}
-            if isinstance(u, dict):
-                user_id = str(u.get("id", ""))[:200]
-            else:
-                user_id = str(u)[:200]
-        except Exception:
-            user_id = ""
-
-        intent = str(run_ctx.get("intent") or "")[:100]
-        refined_query = str(run_ctx.get("refined_query") or "")[:2000]
-        harmony = float(run_ctx.get("harmony") or 0.0)
-
-        final = run_ctx.get("final") or {}
-        # keep answer reasonably bounded to avoid bloating the DB
-        answer = str(final.get("sage") or final.get("novice") or "")[:4000]
+            return fut.result(timeout=LEDGER_LOG_TIMEOUT_SEC)
+        except FutureTimeout:
+            if not fut.cancel():
+                raise  # the writer is committing it right now; don't insert it twice
+            log.warning("[LEDGER] group commit stalled for %.0fs; writing run inline", LEDGER_LOG_TIMEOUT_SEC)
+            return self._log_inline(row)
 
-        retrieval = run_ctx.get("retrieval") or []
-        retrieval_count = int(len(retrieval))
+    def submit(self, run_ctx: Dict[str, Any], then: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Store a run without waiting; `then(run_id)` runs after its batch commits
+        (on the writer thread — keep it short, or hand it off).
+        """
+        row = _row(run_ctx)
+        if self._writer.submit(row, then) is None:
+            run_id = self._log_inline(row)
+            if then is not None:
+                then(run_id)
 
-        final_json = json.dumps(final, ensure_ascii=False)
-        ctx_json = json.dumps(run_ctx, ensure_ascii=False)
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """The stored (compacted) ctx of one run, with `final` restored."""
+        r = self._db.conn().execute(
+            "SELECT final_json, ctx_json, ctx_codec FROM runs WHERE id=?", (int(run_id),)
+        ).fetchone()
+        if r is None:
+            return None
+        ctx = decode_ctx(r["ctx_json"], r["ctx_codec"])
+        ctx["final"] = json.loads(r["final_json"] or "{}")
+        return ctx
 
-        with self._lock:
-            cur = self._conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO runs (ts, user_id, intent, refined_query, harmony, answer,
-                                  retrieval_count, final_json, ctx_json)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (ts, user_id, intent, refined_query, harmony, answer,
-                 retrieval_count, final_json, ctx_json),
-            )
-            self._conn.commit()
-            return int(cur.lastrowid)
+    def compact_legacy(self, batch: int = 500) -> int:
+        """Rewrite plain-JSON ctx rows (written before compaction) in place; returns rows rewritten."""
+        done = 0
+        while True:
+            rows = self._db.conn().execute(
+                "SELECT id, ctx_json FROM runs WHERE ctx_codec IS NULL AND ctx_json IS NOT NULL LIMIT ?",
+                (int(batch),),
+            ).fetchall()
+            if not rows:
+                return done
+            updates = []
+            for r in rows:
+                try:
+                    ctx = json.loads(r["ctx_json"])
+                except Exception:
+                    ctx = {}
+                data, codec = encode_ctx(compact_ctx(ctx if isinstance(ctx, dict) else {}))
+                updates.append((data, codec, r["id"]))
+            with self._db.transaction(immediate=True) as con:
+                con.executemany("UPDATE runs SET ctx_json=?, ctx_codec=? WHERE id=?", updates)
+            done += len(updates)
 
-    def query_semantic(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+    def query_semantic(self, q: str, limit: int = 20, offset: int = 0,
+                       since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
         """
-        Very light LIKE-based search over answer/refined_query.
+        Search answer/refined_query: BM25-ranked over runs_fts (newest first on
+        ties), optionally within [since, until) unix time; `offset` pages.
+        Without FTS5 this is the old LIKE scan, newest first.
         """
-        q = (q or "").strip()
-        if not q:
-            return []
-        like = f"%{q}%"
-        with self._lock:
-            cur = self._conn.cursor()
-            cur.execute(
+        lo, hi = _ts_range(since, until)
+        if _SUPPORTS_FTS:
+            terms = _terms(q)
+            if not terms:
+                return []
+            rows = self._db.conn().execute(
+                """
+                SELECT r.id, r.ts, r.user_id, r.intent, r.harmony,
+                       substr(r.answer, 1, 240) AS snippet, f.rank
+                FROM runs_fts f JOIN runs r ON r.id = f.rowid
+                WHERE runs_fts MATCH ? AND r.ts >= ? AND r.ts < ?
+                ORDER BY f.rank, r.ts DESC
+                LIMIT ? OFFSET ?
+                """,
+                (_match_expr(terms), lo, hi, int(limit), int(offset)),
+            ).fetchall()
+        else:
+            q = (q or "").strip()
+            if not q:
+                return []
+            like = f"%{q}%"
+            rows = self._db.conn().execute(
                 """
                 SELECT id, ts, user_id, intent, harmony,
-                       substr(answer, 1, 240) AS snippet
+                       substr(answer, 1, 240) AS snippet, 0.0
                 FROM runs
-                WHERE answer LIKE ? OR refined_query LIKE ?
+                WHERE (answer LIKE ? OR refined_query LIKE ?) AND ts >= ? AND ts < ?
                 ORDER BY ts DESC
-                LIMIT ?
+                LIMIT ? OFFSET ?
                 """,
-                (like, like, limit),
-            )
-            rows = cur.fetchall()
+                (like, like, lo, hi, int(limit), int(offset)),
+            ).fetchall()
         out = []
         for r in rows:
             out.append({
@@ -116,14 +527,20 @@ class _SQLiteLedger:
                 "intent": r[3],
                 "harmony": r[4],
                 "snippet": r[5],
+                "score": round(-float(r[6] or 0.0), 6),
             })
         return out
 
-    def summary(self) -> Dict[str, Any]:
-        with self._lock:
-            cur = self._conn.cursor()
-            cur.execute("SELECT COUNT(*), AVG(harmony), MAX(ts) FROM runs")
-            cnt, avg_h, max_ts = cur.fetchone()
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None,
+                exclude: Sequence[Tuple[float, float]] = ()) -> Dict[str, Any]:
+        """`exclude`: [lo, hi) ts ranges to leave out (months already counted from the archive)."""
+        where, args = "ts >= ? AND ts < ?", list(_ts_range(since, until))
+        for lo, hi in exclude:
+            where += " AND NOT (ts >= ? AND ts < ?)"
+            args += [lo, hi]
+        cnt, avg_h, max_ts = self._db.conn().execute(
+            f"SELECT COUNT(*), AVG(harmony), MAX(ts) FROM runs WHERE {where}", args
+        ).fetchone()
         return {
             "count": int(cnt or 0),
             "harmony_avg": float(avg_h or 0.0),
@@ -131,54 +548,122 @@ class _SQLiteLedger:
             "db_path": self.db_path,
         }
 
+    def stats(self) -> Dict[str, Any]:
+        return {**self._writer.stats(), "ctx_codec": _codec()}
+
+_BM25_K1, _BM25_B = 1.2, 0.75  # FTS5 bm25() defaults
+
+class _RunIndex:
+    """
+    Inverted index over refined_query + answer for _MemoryLedger: postings
+    term → {run id: tf}, scored with the same BM25 as runs_fts (no stemming).
+    Runs are only ever appended, so it is maintained incrementally in log().
+    """
+
+    def __init__(self):
+        self.post: Dict[str, Dict[int, int]] = {}
+        self.lens: Dict[int, int] = {}
+        self.total = 0
+
+    def add(self, run_id: int, text: str) -> None:
+        toks = [w.lower() for w in _TERM.findall(text or "")]
+        self.lens[run_id] = len(toks)
+        self.total += len(toks)
+        for t in toks:
+            hits = self.post.setdefault(t, {})
+            hits[run_id] = hits.get(run_id, 0) + 1
+
+    def scores(self, terms: List[str]) -> Dict[int, float]:
+        n = len(self.lens)
+        avgdl = (self.total / n) if n else 1.0
+        k1, b = _BM25_K1, _BM25_B
+        acc: Dict[int, float] = {}
+        for t in terms:
+            hits = self.post.get(t)
+            if not hits:
+                continue
+            idf = math.log((n - len(hits) + 0.5) / (len(hits) + 0.5))
+            idf = idf if idf > 0.0 else 1e-6
+            for rid, tf in hits.items():
+                w = tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * self.lens[rid] / avgdl))
+                acc[rid] = acc.get(rid, 0.0) + idf * w
+        return acc
+
 class _MemoryLedger:
     """
     Fallback ledger if sqlite is unavailable (keeps data in RAM).
     """
     def __init__(self):
         self._rows: List[Dict[str, Any]] = []
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._index = _RunIndex()
         self._id = 0
         self._lock = threading.Lock()
 
+    def start(self) -> bool:
+        return False
+
     def close(self):
         pass
 
     def log(self, run_ctx: Dict[str, Any]) -> int:
+        final = run_ctx.get("final") or {}
+        text = f"{run_ctx.get('refined_query') or ''} {final.get('sage') or final.get('novice') or ''}"
         with self._lock:
             self._id += 1
-            self._rows.append({"id": self._id, "ctx": run_ctx, "ts": time.time()})
+            row = {"id": self._id, "ctx": run_ctx, "ts": time.time()}
+            self._rows.append(row)
+            self._by_id[self._id] = row
+            self._index.add(self._id, text)
             return self._id
 
-    def query_semantic(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
-        q = (q or "").lower()
-        if not q:
+    def submit(self, run_ctx: Dict[str, Any], then: Optional[Callable[[int], None]] = None) -> None:
+        run_id = self.log(run_ctx)
+        if then is not None:
+            then(run_id)
+
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            r = self._by_id.get(int(run_id))
+        return r["ctx"] if r is not None else None
+
+    def query_semantic(self, q: str, limit: int = 20, offset: int = 0,
+                       since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+        terms = _terms(q)
+        if not terms:
             return []
-        out = []
+        lo, hi = _ts_range(since, until)
         with self._lock:
-            for r in reversed(self._rows):
-                ctx = r.get("ctx") or {}
-                text = json.dumps(ctx, ensure_ascii=False).lower()
-                if q in text:
-                    out.append({
-                        "id": r["id"],
-                        "ts": r["ts"],
-                        "user_id": (ctx.get("user") or {}).get("id"),
-                        "intent": ctx.get("intent"),
-                        "harmony": ctx.get("harmony"),
-                        "snippet": (ctx.get("final") or {}).get("sage","")[:240],
-                    })
-                    if len(out) >= limit:
-                        break
+            scored = [(sc, self._by_id[rid]) for rid, sc in self._index.scores(terms).items()]
+        scored = [(sc, r) for sc, r in scored if lo <= r["ts"] < hi]
+        scored.sort(key=lambda x: (-x[0], -x[1]["ts"]))
+        out = []
+        for sc, r in scored[int(offset):int(offset) + int(limit)]:
+            ctx = r.get("ctx") or {}
+            out.append({
+                "id": r["id"],
+                "ts": r["ts"],
+                "user_id": (ctx.get("user") or {}).get("id"),
+                "intent": ctx.get("intent"),
+                "harmony": ctx.get("harmony"),
+                "snippet": (ctx.get("final") or {}).get("sage","")[:240],
+                "score": round(sc, 6),
+            })
         return out
 
-    def summary(self) -> Dict[str, Any]:
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        lo, hi = _ts_range(since, until)
         with self._lock:
-            cnt = len(self._rows)
-            if cnt == 0:
-                return {"count": 0, "harmony_avg": 0.0, "last_ts": 0.0, "db_path": ":memory:"}
-            avg = sum((r.get("ctx") or {}).get("harmony") or 0.0 for r in self._rows) / max(cnt, 1)
-            last_ts = max(r["ts"] for r in self._rows)
-            return {"count": cnt, "harmony_avg": float(avg), "last_ts": float(last_ts), "db_path": ":memory:"}
+            rows = [r for r in self._rows if lo <= r["ts"] < hi]
+        cnt = len(rows)
+        if cnt == 0:
+            return {"count": 0, "harmony_avg": 0.0, "last_ts": 0.0, "db_path": ":memory:"}
+        avg = sum((r.get("ctx") or {}).get("harmony") or 0.0 for r in rows) / max(cnt, 1)
+        last_ts = max(r["ts"] for r in rows)
+        return {"count": cnt, "harmony_avg": float(avg), "last_ts": float(last_ts), "db_path": ":memory:"}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": False}
 
 class Ledger:
     """
@@ -194,13 +679,49 @@ class Ledger:
             self._impl = _MemoryLedger()
             self.backend = "memory"
 
+    def start(self) -> bool:
+        """Start the group-commit writer (LEDGER_GROUP_COMMIT=0 keeps inserts inline)."""
+        return LEDGER_GROUP_COMMIT and self._impl.start()
+
+    def stop(self) -> None:
+        """Commit queued rows and stop the writer."""
+        self._impl.close()
+
     def log(self, run_ctx: Dict[str, Any]) -> int:
         return self._impl.log(run_ctx)
 
-    def query_semantic(self, q: str, limit: int = 20) -> List[Dict[str, Any]]:
-        return self._impl.query_semantic(q, limit=limit)
+    def submit(self, run_ctx: Dict[str, Any], then: Optional[Callable[[int], None]] = None) -> None:
+        self._impl.submit(run_ctx, then)
+
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        return self._impl.get_run(run_id)
+
+    def query_semantic(self, q: str, limit: int = 20, offset: int = 0,
+                       since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """BM25-ranked search over past runs; `since`/`until` are unix seconds."""
+        return self._impl.query_semantic(q, limit=limit, offset=offset, since=since, until=until)
 
-    def summary(self) -> Dict[str, Any]:
-        base = self._impl.summary()
+    def summary(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """Run count / harmony / last run, live rows plus months moved out by the archiver."""
+        if self.backend != "sqlite":
+            return {**self._impl.summary(since, until), "backend": self.backend}
+        from .ledger_archive import archived_summary, month_bounds  # imports this module
+        try:
+            arch = archived_summary(since, until)
+        except Exception as e:
+            return {**self._impl.summary(since, until), "backend": self.backend, "archive_error": str(e)}
+        # months in the manifest are counted from the archive only, even while their deletes are pending
+        base = self._impl.summary(since, until, exclude=[month_bounds(m) for m in arch["months"]])
         base["backend"] = self.backend
+        live = base["count"]
+        total = live + arch["count"]
+        if total:
+            base["harmony_avg"] = (base["harmony_avg"] * live + arch["harmony_sum"]) / total
+        base.update({
+            "count": total, "live_count": live, "archived_count": arch["count"],
+            "archived_months": arch["months"], "last_ts": max(base["last_ts"], arch["last_ts"]),
+        })
         return base
+
+    def stats(self) -> Dict[str, Any]:
+        return self._impl.stats()
@@ -0,0 +1,422 @@
+from __future__ import annotations
+# Monthly retention for the ledger tables (runs, learnings) in mirror-v4.db.
+#
+# Both tables used to grow forever next to the identity tables, so every
+# backup and WAL checkpoint got slower. Partitions are calendar months (UTC)
+# of `ts`, selected through idx_runs_ts / idx_learnings_ts: the current month
+# and the LEDGER_RETENTION_MONTHS-1 before it stay in SQLite. Each older month
+# is streamed to LEDGER_ARCHIVE_DIR as runs-YYYY-MM / learnings-YYYY-MM files
+# (Parquet + zstd when pyarrow is installed, gzip JSONL otherwise), recorded
+# with its aggregates and the highest archived id per table in manifest.json,
+# and only then deleted from SQLite (the runs_fts triggers clean the search
+# index). A pass that dies after the manifest write only has the deletes left
+# to finish next time, bounded by that id so rows that landed in the month
+# since are never dropped unarchived. Ledger.summary() skips live rows of
+# manifest months, so a half-finished delete isn't counted twice.
+#
+# Archived ctx_json is stored decoded (plain JSON), so archives don't depend
+# on the ledger's codec. archived_summary() / iter_archived() are the read
+# path; Ledger.summary() folds the archive in.
+#
+# Env:
+#   LEDGER_RETENTION_MONTHS=6        (0 = keep everything in SQLite; archiver off)
+#   LEDGER_ARCHIVE_DIR=ledger-archive
+#   LEDGER_ARCHIVE_FORMAT=auto       (auto = parquet if pyarrow is installed | parquet | jsonl)
+#   LEDGER_ARCHIVE_KEEP_MONTHS=0     (archives older than this are deleted; 0 = forever)
+#   LEDGER_ARCHIVE_INTERVAL_SEC=3600
+
+import os, gzip, json, time, calendar, threading, logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl  # one archiver per archive dir across uvicorn workers
+except Exception:  # pragma: no cover
+    fcntl = None
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except Exception:  # pragma: no cover
+    pa = pq = None
+
+from .dbconn import shared_db
+from .ledger import _DB_PATH, decode_ctx
+
+try:
+    from .metrics import mv4_ledger_archived_rows_total, mv4_ledger_archive_runs_total
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+    mv4_ledger_archived_rows_total = mv4_ledger_archive_runs_total = _DummyMetric()
+
+log = logging.getLogger(__name__)
+
+LEDGER_RETENTION_MONTHS = int(os.getenv("LEDGER_RETENTION_MONTHS", "6"))
+LEDGER_ARCHIVE_DIR = os.getenv("LEDGER_ARCHIVE_DIR", "ledger-archive")
+LEDGER_ARCHIVE_FORMAT = os.getenv("LEDGER_ARCHIVE_FORMAT", "auto").strip().lower()
+LEDGER_ARCHIVE_KEEP_MONTHS = int(os.getenv("LEDGER_ARCHIVE_KEEP_MONTHS", "0"))
+LEDGER_ARCHIVE_INTERVAL_SEC = float(os.getenv("LEDGER_ARCHIVE_INTERVAL_SEC", "3600"))
+
+_CHUNK = 5000          # rows per read / file write
+_DELETE_CHUNK = 1000   # rows per delete transaction (runs_fts triggers make deletes the slow part)
+_EXT = {"parquet": ".parquet", "jsonl": ".jsonl.gz"}
+
+# archived columns per table (also the Parquet schema)
+_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    "runs": [
+        ("id", "int64"), ("ts", "float64"), ("user_id", "string"), ("intent", "string"),
+        ("refined_query", "string"), ("harmony", "float64"), ("answer", "string"),
+        ("retrieval_count", "int64"), ("final_json", "string"), ("ctx_json", "string"),
+    ],
+    "learnings": [
+        ("id", "int64"), ("ts", "float64"), ("run_id", "int64"), ("user_id", "string"),
+        ("intent", "string"), ("harmony", "float64"), ("answer_len", "int64"),
+        ("retrieval_count", "int64"), ("tags_json", "string"), ("memo_json", "string"),
+    ],
+}
+
+# ---------- months ----------
+def month_of(ts: float) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+def shift_month(month: str, n: int) -> str:
+    """`month` moved `n` months back (negative = forward)."""
+    y, m = map(int, month.split("-"))
+    i = y * 12 + (m - 1) - n
+    return f"{i // 12:04d}-{i % 12 + 1:02d}"
+
+def month_bounds(month: str) -> Tuple[float, float]:
+    """[start, end) of a UTC calendar month as unix seconds."""
+    y, m = map(int, month.split("-"))
+    y2, m2 = map(int, shift_month(month, -1).split("-"))
+    return float(calendar.timegm((y, m, 1, 0, 0, 0))), float(calendar.timegm((y2, m2, 1, 0, 0, 0)))
+
+def _format() -> str:
+    if LEDGER_ARCHIVE_FORMAT in ("auto", "parquet") and pq is not None:
+        return "parquet"
+    return "jsonl"
+
+# ---------- archive files ----------
+def _write_rows(path: str, table: str, chunks: Iterator[List[Dict[str, Any]]], fmt: str) -> int:
+    """Stream row chunks to `path` (via a temp file + rename); returns rows written."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    n = 0
+    try:
+        if fmt == "parquet":
+            schema = pa.schema([(name, getattr(pa, typ)()) for name, typ in _COLUMNS[table]])
+            with pq.ParquetWriter(tmp, schema, compression="zstd") as w:
+                for chunk in chunks:
+                    w.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                    n += len(chunk)
+        else:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk)
+                    n += len(chunk)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n
+
+def _read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError(f"{path} needs pyarrow to read")
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# ---------- manifest ----------
+_MANIFEST_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+def _manifest_path(archive_dir: str) -> str:
+    return os.path.join(archive_dir, "manifest.json")
+
+def load_manifest(archive_dir: str = LEDGER_ARCHIVE_DIR) -> Dict[str, Any]:
+    """{"months": {"YYYY-MM": {...aggregates, files}}} (cached until the file changes)."""
+    path = _manifest_path(archive_dir)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {"months": {}}
+    hit = _MANIFEST_CACHE.get(path)
+    if hit is None or hit[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            hit = _MANIFEST_CACHE[path] = (mtime, json.load(f))
+    return hit[1]
+
+def _save_manifest(archive_dir: str, manifest: Dict[str, Any]) -> None:
+    path = _manifest_path(archive_dir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _MANIFEST_CACHE[path] = (os.path.getmtime(path), manifest)
+
+# ---------- read path ----------
+def iter_archived(table: str = "runs", since: Optional[float] = None, until: Optional[float] = None,
+                  archive_dir: str = LEDGER_ARCHIVE_DIR) -> Iterator[Dict[str, Any]]:
+    """Archived rows of `table` with since <= ts < until, oldest month first."""
+    lo = float("-inf") if since is None else float(since)
+    hi = float("inf") if until is None else float(until)
+    for month, meta in sorted(load_manifest(archive_dir).get("months", {}).items()):
+        m_lo, m_hi = month_bounds(month)
+        name = (meta.get("files") or {}).get(table)
+        if not name or m_hi <= lo or m_lo >= hi:
+            continue
+        for r in _read_rows(os.path.join(archive_dir, name)):
+            if lo <= float(r.get("ts") or 0.0) < hi:
+                yield r
+
+def archived_summary(since: Optional[float] = None, until: Optional[float] = None,
+                     archive_dir: str = LEDGER_ARCHIVE_DIR) -> Dict[str, Any]:
+    """
+    Ledger-summary aggregates over archived runs. Months fully inside the
+    range come from the manifest; edge months are scanned from their files.
+    """
+    lo = float("-inf") if since is None else float(since)
+    hi = float("inf") if until is None else float(until)
+    count, h_sum, last_ts, months = 0, 0.0, 0.0, []
+    for month, meta in sorted(load_manifest(archive_dir).get("months", {}).items()):
+        m_lo, m_hi = month_bounds(month)
+        if m_hi <= lo or m_lo >= hi:
+            continue
+        months.append(month)
+        if lo <= m_lo and m_hi <= hi:
+            count += int(meta.get("runs") or 0)
+            h_sum += float(meta.get("harmony_sum") or 0.0)
+            last_ts = max(last_ts, float(meta.get("last_ts") or 0.0))
+            continue
+        for r in iter_archived("runs", max(lo, m_lo), min(hi, m_hi), archive_dir):
+            count += 1
+            h_sum += float(r.get("harmony") or 0.0)
+            last_ts = max(last_ts, float(r.get("ts") or 0.0))
+    return {"count": count, "harmony_sum": h_sum, "last_ts": last_ts, "months": months}
+
+# ---------- archiver ----------
+class LedgerArchiver:
+    """Moves closed months past the retention window from SQLite into archive files."""
+
+    def __init__(self, db_path: str = _DB_PATH, archive_dir: str = LEDGER_ARCHIVE_DIR,
+                 retention_months: int = LEDGER_RETENTION_MONTHS, keep_months: int = LEDGER_ARCHIVE_KEEP_MONTHS,
+                 interval_sec: float = LEDGER_ARCHIVE_INTERVAL_SEC, fmt: Optional[str] = None):
+        self.db = shared_db(db_path)
+        self.archive_dir = archive_dir
+        self.retention_months = retention_months
+        self.keep_months = keep_months
+        self.interval = max(1.0, interval_sec)
+        self.fmt = fmt or _format()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.passes = self.errors = 0
+        self.archived: Dict[str, int] = {"runs": 0, "learnings": 0}
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    # ---- lifecycle ----
+    def start(self) -> bool:
+        if self.retention_months <= 0 or self._thread is not None:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mv4-ledger-archive", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 30.0) -> None:
+        t = self._thread
+        if t is None:
+            return
+        self._stop.set()
+        t.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass  # counted + logged in run_once
+            self._stop.wait(self.interval)
+
+    # ---- one pass ----
+    def _tables(self) -> List[str]:
+        con = self.db.conn()
+        return [t for t in ("runs", "learnings")
+                if con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (t,)).fetchone()]
+
+    def due_months(self, now: Optional[float] = None) -> List[str]:
+        """Months with rows in SQLite that fall outside the retention window, oldest first."""
+        if self.retention_months <= 0:
+            return []
+        cutoff = shift_month(month_of(time.time() if now is None else now), self.retention_months - 1)
+        con = self.db.conn()
+        tables = self._tables()
+        oldest = None
+        for t in tables:
+            ts = con.execute(f"SELECT MIN(ts) FROM {t}").fetchone()[0]
+            if ts is not None and (oldest is None or ts < oldest):
+                oldest = ts
+        if oldest is None:
+            return []
+        out, m = [], month_of(oldest)
+        while m < cutoff:
+            lo, hi = month_bounds(m)
+            if any(con.execute(f"SELECT 1 FROM {t} WHERE ts >= ? AND ts < ? LIMIT 1", (lo, hi)).fetchone()
+                   for t in tables):  # skip empty months (index probe)
+                out.append(m)
+            m = shift_month(m, -1)
+        return out
+
+    def run_once(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Archive every due month, then expire old archives. Skips if another process holds the lock."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        lock_f = open(os.path.join(self.archive_dir, ".lock"), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return {"skipped": "locked"}
+            done = {}
+            for month in self.due_months(now):
+                done[month] = self.archive_month(month)
+            expired = self.expire(now)
+            with self._lock:
+                self.passes += 1
+                self.last_run = time.time()
+            mv4_ledger_archive_runs_total.labels(result="ok").inc()
+            return {"archived": done, "expired": expired}
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self.last_error = str(e)
+            mv4_ledger_archive_runs_total.labels(result="error").inc()
+            log.exception("[LEDGER][ARCHIVE] pass failed: %s", e)
+            raise
+        finally:
+            lock_f.close()  # releases the flock
+
+    def _chunks(self, table: str, lo: float, hi: float, agg: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        cols = [c for c, _ in _COLUMNS[table]]
+        select = ", ".join(cols + (["ctx_codec"] if table == "runs" else []))
+        cur = self.db.conn().execute(
+            f"SELECT {select} FROM {table} WHERE ts >= ? AND ts < ? ORDER BY ts, id", (lo, hi)
+        )
+        while True:
+            rows = cur.fetchmany(_CHUNK)
+            if not rows:
+                return
+            out = []
+            for r in rows:
+                d = {c: r[c] for c in cols}
+                if table == "runs":
+                    d["ctx_json"] = json.dumps(decode_ctx(r["ctx_json"], r["ctx_codec"]), ensure_ascii=False)
+                    agg["harmony_sum"] += float(d["harmony"] or 0.0)
+                    agg["first_ts"] = min(agg["first_ts"], d["ts"])
+                    agg["last_ts"] = max(agg["last_ts"], d["ts"])
+                    intent = d["intent"] or ""
+                    agg["intents"][intent] = agg["intents"].get(intent, 0) + 1
+                agg["max_id"][table] = max(agg["max_id"].get(table, 0), d["id"])
+                out.append(d)
+            yield out
+
+    def archive_month(self, month: str) -> Dict[str, int]:
+        """Write one month's rows to archive files, record them, then delete them from SQLite."""
+        lo, hi = month_bounds(month)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        manifest = load_manifest(self.archive_dir)
+        meta = manifest.get("months", {}).get(month)
+        tables = self._tables()
+        if meta is None:  # not archived yet (otherwise only the deletes are left)
+            meta = {"format": self.fmt, "files": {}, "archived_at": time.time(),
+                    "harmony_sum": 0.0, "first_ts": hi, "last_ts": 0.0, "intents": {}, "max_id": {}}
+            for table in tables:
+                name = f"{table}-{month}{_EXT[self.fmt]}"
+                meta[table] = _write_rows(os.path.join(self.archive_dir, name), table,
+                                          self._chunks(table, lo, hi, meta), self.fmt)
+                meta["files"][table] = name
+            if not meta.get("runs"):
+                meta["first_ts"] = lo
+            manifest = {**manifest, "months": {**manifest.get("months", {}), month: meta}}
+            _save_manifest(self.archive_dir, manifest)
+        deleted = {}
+        for table in tables:
+            if table not in meta.get("files", {}):
+                continue  # table appeared after this month was archived; leave its rows alone
+            deleted[table] = self._delete(table, lo, hi, self._max_id(meta, table))
+            mv4_ledger_archived_rows_total.labels(table=table).inc(deleted[table])
+            with self._lock:
+                self.archived[table] = self.archived.get(table, 0) + deleted[table]
+        self.db.conn().execute("PRAGMA wal_checkpoint(PASSIVE)")
+        log.info("[LEDGER][ARCHIVE] %s → %s (%s)", month, self.archive_dir, deleted)
+        return deleted
+
+    def _max_id(self, meta: Dict[str, Any], table: str) -> int:
+        """Highest id archived for `table` (read back from the file for manifests predating max_id)."""
+        known = (meta.get("max_id") or {}).get(table)
+        if known is not None:
+            return int(known)
+        path = os.path.join(self.archive_dir, meta["files"][table])
+        return max((int(r["id"]) for r in _read_rows(path)), default=0)
+
+    def _delete(self, table: str, lo: float, hi: float, max_id: int) -> int:
+        # short transactions so the group-commit writer isn't blocked for long
+        n = 0
+        while True:
+            with self.db.transaction(immediate=True) as con:
+                k = con.execute(
+                    f"DELETE FROM {table} WHERE id IN "
+                    f"(SELECT id FROM {table} WHERE ts >= ? AND ts < ? AND id <= ? LIMIT ?)",
+                    (lo, hi, max_id, _DELETE_CHUNK)
+                ).rowcount
+            n += k
+            if k < _DELETE_CHUNK:
+                return n
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Delete archive files older than keep_months (0 keeps them forever)."""
+        if self.keep_months <= 0:
+            return []
+        cutoff = shift_month(month_of(time.time() if now is None else now), self.keep_months - 1)
+        manifest = load_manifest(self.archive_dir)
+        months = dict(manifest.get("months", {}))
+        gone = [m for m in sorted(months) if m < cutoff]
+        if not gone:
+            return []
+        for m in gone:
+            meta = months.pop(m)
+            for name in (meta.get("files") or {}).values():
+                try:
+                    os.remove(os.path.join(self.archive_dir, name))
+                except FileNotFoundError:
+                    pass
+        _save_manifest(self.archive_dir, {**manifest, "months": months})
+        return gone
+
+    def stats(self) -> Dict[str, Any]:
+        months = sorted(load_manifest(self.archive_dir).get("months", {}))
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "retention_months": self.retention_months, "keep_months": self.keep_months,
+                "format": self.fmt, "dir": self.archive_dir,
+                "archived_months": len(months), "oldest_month": months[0] if months else None,
+                "passes": self.passes, "errors": self.errors, "archived_rows": dict(self.archived),
+                "last_run": self.last_run, "last_error": self.last_error,
+            }
+
+
+__all__ = [
+    "LedgerArchiver", "archived_summary", "iter_archived", "load_manifest",
+    "month_of", "month_bounds", "shift_month",
+    "LEDGER_RETENTION_MONTHS", "LEDGER_ARCHIVE_DIR",
+]
@@ -0,0 +1,239 @@
+from __future__ import annotations
+# Non-blocking sink for jlog events.
+#
+# jlog used to json.dumps + print() on the request path; under systemd/docker
+# stdout is a pipe, so a slow reader stalled every /ask (20+ events each).
+# Now the caller decides whether the event is wanted (family level +
+# sampling) and serializes it (orjson when installed), so later mutation of
+# ctx/lists it passed can't change or break the line; one daemon thread
+# writes to stdout in batches and feeds the taps (the server's /logs/tail
+# buffer). A full queue drops the event (counted) instead of blocking.
+#
+# Levels are derived from the event name: *.err / *.error → error,
+# *.warn → warning, *.debug / *.preview / *.format_sample → debug, else info.
+# LOG_LEVELS sets a minimum per family (longest dotted prefix wins), e.g.
+#   LOG_LEVELS=*=debug,retriever=info,memori=warning
+# LOG_SAMPLE keeps a fraction of chatty events (prefix match as above), e.g.
+#   LOG_SAMPLE=retrieval.preview=0.1,synth.used.preview=0.1
+#
+# Env:
+#   LOG_ASYNC=1            (0 = write on the caller's thread, as before)
+#   LOG_QUEUE=10000
+#   LOG_JSON=auto          (auto | orjson | json)
+#   LOG_LEVELS=*=debug
+#   LOG_SAMPLE=retrieval.preview=0.1,synth.used.preview=0.1,retriever.debug=0.1
+
+import os, sys, json, queue, random, threading, atexit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson  # type: ignore
+    _HAS_ORJSON = True
+except Exception:  # pragma: no cover
+    orjson = None
+    _HAS_ORJSON = False
+
+try:
+    from .metrics import mv4_log_events_total, mv4_log_queue_depth
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+        def set(self, *a, **k): pass
+    mv4_log_events_total = mv4_log_queue_depth = _DummyMetric()
+
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1").strip().lower() not in ("0", "false", "no", "off")
+LOG_QUEUE = int(os.getenv("LOG_QUEUE", "10000"))
+LOG_JSON = os.getenv("LOG_JSON", "auto").strip().lower()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "*=debug")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "retrieval.preview=0.1,synth.used.preview=0.1,retriever.debug=0.1")
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "off": 100}
+_STOP = object()
+
+
+def _parse_map(spec: str, conv: Callable[[str], Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        k, v = part.split("=", 1)
+        try:
+            out[k.strip()] = conv(v.strip().lower())
+        except (KeyError, ValueError):
+            continue
+    return out
+
+
+def event_level(evt: str) -> int:
+    tail = evt.rsplit(".", 1)[-1]
+    if tail in ("err", "error"):
+        return LEVELS["error"]
+    if tail in ("warn", "warning"):
+        return LEVELS["warning"]
+    if tail in ("debug", "preview", "format_sample") or evt.startswith("retriever.debug"):
+        return LEVELS["debug"]
+    return LEVELS["info"]
+
+
+def _lookup(table: Dict[str, Any], evt: str, default: Any) -> Any:
+    """Longest dotted prefix of `evt` present in `table` ('*' = fallback)."""
+    parts = evt.split(".")
+    for i in range(len(parts), 0, -1):
+        hit = table.get(".".join(parts[:i]))
+        if hit is not None:
+            return hit
+    return table.get("*", default)
+
+
+class LogSink:
+    """Filter, sample and serialize on the caller; write on a background thread."""
+
+    def __init__(self, levels: str = LOG_LEVELS, sample: str = LOG_SAMPLE, maxsize: int = LOG_QUEUE,
+                 use_async: bool = LOG_ASYNC, encoder: str = LOG_JSON):
+        self.levels: Dict[str, int] = _parse_map(levels, lambda v: LEVELS[v])
+        self.sample: Dict[str, float] = _parse_map(sample, float)
+        self.use_async = use_async
+        self.use_orjson = _HAS_ORJSON and encoder in ("auto", "orjson")
+        self.taps: List[Callable[[str], None]] = []
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self.counts = {"written": 0, "filtered": 0, "sampled": 0, "dropped": 0}
+        self._cache: Dict[str, Tuple[int, float]] = {}
+
+    # ---- caller side ----
+    def _rule(self, evt: str) -> Tuple[int, float]:
+        rule = self._cache.get(evt)
+        if rule is None:
+            rule = (_lookup(self.levels, evt, LEVELS["debug"]), _lookup(self.sample, evt, 1.0))
+            if len(self._cache) < 4096:
+                self._cache[evt] = rule
+        return rule
+
+    def _count(self, result: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[result] += n
+        mv4_log_events_total.labels(result=result).inc(n)
+
+    def wants(self, evt: str) -> bool:
+        """Level + sampling decision; check before building expensive fields."""
+        min_level, rate = self._rule(evt)
+        if event_level(evt) < min_level:
+            self._count("filtered")
+            return False
+        if rate < 1.0 and self._rng.random() >= rate:
+            self._count("sampled")
+            return False
+        return True
+
+    def write(self, evt: str, fields: Dict[str, Any]) -> None:
+        """Emit an event already accepted by wants() (serialized now, written later)."""
+        line = self._line(evt, fields)
+        if not self.running:
+            self._emit([line])
+            return
+        try:
+            self._q.put_nowait(line)
+        except queue.Full:
+            self._count("dropped")
+
+    def log(self, evt: str, fields: Dict[str, Any]) -> None:
+        if self.wants(evt):
+            self.write(evt, fields)
+
+    # ---- serialization / output ----
+    def dumps(self, payload: Dict[str, Any]) -> str:
+        if self.use_orjson:
+            try:
+                return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+            except TypeError:
+                pass
+        try:
+            return json.dumps(payload, ensure_ascii=False, default=str)
+        except Exception:
+            return json.dumps({k: str(v)[:512] for k, v in payload.items()}, ensure_ascii=False)
+
+    def _line(self, evt: str, fields: Dict[str, Any]) -> str:
+        try:
+            return self.dumps({"evt": evt, **fields})
+        except Exception:
+            return json.dumps({"evt": evt, "log_error": "unserializable"})
+
+    def _emit(self, lines: List[str]) -> None:
+        try:
+            out = sys.stdout
+            out.write("\n".join(lines) + "\n")
+            out.flush()
+        except Exception:
+            pass
+        for line in lines:
+            for tap in self.taps:
+                try:
+                    tap(line)
+                except Exception:
+                    pass
+        self._count("written", len(lines))
+
+    # ---- lifecycle ----
+    def start(self) -> bool:
+        if not self.use_async or self._thread is not None:
+            return False
+        self._thread = threading.Thread(target=self._run, name="mv4-log", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush everything queued, then stop the writer."""
+        t = self._thread
+        if t is None:
+            return
+        self._q.put(_STOP)
+        t.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            batch, stop = [], item is _STOP
+            if not stop:
+                batch.append(item)
+                while len(batch) < 256:
+                    try:
+                        item = self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            if batch:
+                self._emit(batch)
+            mv4_log_queue_depth.set(self._q.qsize())
+            if stop:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            "async": self.running, "queue_depth": self._q.qsize(), "queue_max": self._q.maxsize,
+            "encoder": "orjson" if self.use_orjson else "json",
+            "levels": self.levels, "sample": self.sample, **counts,
+        }
+
+
+sink = LogSink()
+atexit.register(sink.stop)  # flush whatever is still queued at interpreter exit
+
+
+def jlog(evt: str, **fields) -> None:
+    sink.log(evt, fields)
+
+
+__all__ = ["LogSink", "sink", "jlog", "event_level", "LEVELS"]
@@ -1,8 +1,11 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Optional, Tuple
-import os, time, json, sqlite3, threading, re, uuid
+import os, time, json, sqlite3, re, uuid
 import unicodedata  # NEW: for ASCII-safe normalization
 
+from .dbconn import shared_db
+from .identity_cache import identity_cache
+
 # Reuse the same DB as ledger/learning
 _DB_PATH = os.getenv("LEDGER_DB", "mirror-v4.db")
 
@@ -80,25 +83,42 @@ CREATE TABLE IF NOT EXISTS profiles (
 );
 """
 
+def _utc_now() -> str:
+    # same shape as SQLite's CURRENT_TIMESTAMP
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
 class _SQLiteMemory:
+    """
+    Identity + profile store on the shared per-thread connection (dbconn).
+    Schema is created once per process; each public operation is a single
+    transaction.
+    """
     def __init__(self, path: str):
         self._path = path
-        self._lock = threading.Lock()
-        self._ensure()
+        self._db = shared_db(path)
+        self._db.ensure("memory", self._ensure)
 
     # ----------- low-level helpers -----------
     def _connect(self) -> sqlite3.Connection:
-        con = sqlite3.connect(self._path)
-        con.row_factory = sqlite3.Row
-        return con
-
-    def _ensure(self):
-        with self._connect() as conn:
-            conn.execute(_USER_MEMORY_SQL)
-            conn.execute(_TRAVELERS_SQL)
-            conn.execute(_IDENTITIES_SQL)
-            conn.execute(_PROFILES_SQL)
-            conn.commit()
+        return self._db.conn()
+
+    @staticmethod
+    def _ensure(conn: sqlite3.Connection):
+        conn.execute(_USER_MEMORY_SQL)
+        conn.execute(_TRAVELERS_SQL)
+        conn.execute(_IDENTITIES_SQL)
+        conn.execute(_PROFILES_SQL)
+
+    @staticmethod
+    def _profile_dict(r) -> dict:
+        return {
+            "tone": r["tone"] or "",
+            "language_pref": r["language_pref"] or "",
+            "interactions": int(r["interactions"] or 0),
+            "lucidity_avg": float(r["lucidity_avg"] or 0.0),
+            "last_q": r["last_q"] or "",
+            "updated_at": r["updated_at"],
+        }
 
     # ----------- identity resolution -----------
     def resolve_user(self, raw: str) -> Tuple[str, dict]:
@@ -111,47 +131,47 @@ class _SQLiteMemory:
 
         Returns (traveler_id, profile_dict)
         Creates traveler/identity/profile rows if missing.
+
+        Known travelers cost one read (none when cached); first sight is one
+        write transaction.
         """
         raw = (raw or "").strip()
-        # UUID short-circuit
-        try:
-            _ = uuid.UUID(raw)
-            prof = self._get_profile(raw) or {}
-            if not prof:
-                # ensure skeleton profile exists
-                with self._connect() as con:
-                    con.execute("INSERT OR IGNORE INTO travelers(id) VALUES (?)", (raw,))
-                    con.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (raw,))
-                    con.commit()
-                prof = self._get_profile(raw) or {}
-            return raw, prof
-        except Exception:
-            pass
-
+        if not raw:
+            return self._resolve_user(raw)
+        key = (self._path, raw)
+        hit = identity_cache.get(key)
+        if hit is not None:
+            return hit
+        since = identity_cache.mark()
+        tid, prof = self._resolve_user(raw)
+        identity_cache.put(key, tid, prof, since)
+        return tid, prof
+
+    def _resolve_user(self, raw: str) -> Tuple[str, dict]:
         m = re.match(r"^(x|tg):\s*(.+)$", raw, flags=re.I)
         if not m:
-            # treat as traveler id literal; ensure rows exist
+            # UUID or traveler id literal; ensure rows exist
             tid = raw if raw else str(uuid.uuid4())
-            with self._connect() as con:
+            prof = self._get_profile(tid)
+            if prof:
+                return tid, prof
+            with self._db.transaction(immediate=True) as con:
                 con.execute("INSERT OR IGNORE INTO travelers(id) VALUES (?)", (tid,))
                 con.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (tid,))
-                con.commit()
-            return tid, (self._get_profile(tid) or {})
+                return tid, self._get_profile(tid)
 
         provider, ext = m.group(1).lower(), m.group(2).strip()
         provider = "x" if provider == "x" else "telegram"
         external_id = ext.lstrip("@")
 
-        with self._connect() as con:
-            cur = con.execute(
-                "SELECT traveler_id FROM identities WHERE provider=? AND external_id=?",
-                (provider, external_id),
-            )
-            row = cur.fetchone()
-            if row:
-                tid = row["traveler_id"]
-                return tid, (self._get_profile(tid) or {})
+        found = self._lookup_identity(provider, external_id)
+        if found is not None:
+            return found
 
+        with self._db.transaction(immediate=True) as con:
+            found = self._lookup_identity(provider, external_id)  # lost a race to another writer
+            if found is not None:
+                return found
             # create traveler + identity + profile
             tid = str(uuid.uuid4())
             con.execute("INSERT OR IGNORE INTO travelers(id) VALUES (?)", (tid,))
@@ -161,35 +181,36 @@ class _SQLiteMemory:
                 (str(uuid.uuid4()), tid, provider, external_id, external_id),
             )
             con.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (tid,))
-            con.commit()
-            return tid, (self._get_profile(tid) or {})
+            return tid, self._get_profile(tid)
+
+    def _lookup_identity(self, provider: str, external_id: str) -> Optional[Tuple[str, dict]]:
+        """(traveler_id, profile) for a known identity, in one query; None if unknown."""
+        r = self._connect().execute(
+            "SELECT i.traveler_id, p.traveler_id AS has_profile, p.tone, p.language_pref, p.interactions, "
+            "p.lucidity_avg, p.last_q, p.updated_at "
+            "FROM identities i LEFT JOIN profiles p ON p.traveler_id = i.traveler_id "
+            "WHERE i.provider=? AND i.external_id=?",
+            (provider, external_id),
+        ).fetchone()
+        if not r:
+            return None
+        return r["traveler_id"], (self._profile_dict(r) if r["has_profile"] else {})
 
     # ----------- profiles (canonical) -----------
     def _get_profile(self, traveler_id: str) -> dict:
         if not traveler_id:
             return {}
-        with self._connect() as con:
-            cur = con.execute(
-                "SELECT tone, language_pref, interactions, lucidity_avg, last_q, updated_at "
-                "FROM profiles WHERE traveler_id=?",
-                (traveler_id,),
-            )
-            r = cur.fetchone()
-            if not r:
-                return {}
-            return {
-                "tone": r["tone"] or "",
-                "language_pref": r["language_pref"] or "",
-                "interactions": int(r["interactions"] or 0),
-                "lucidity_avg": float(r["lucidity_avg"] or 0.0),
-                "last_q": r["last_q"] or "",
-                "updated_at": r["updated_at"],
-            }
+        r = self._connect().execute(
+            "SELECT tone, language_pref, interactions, lucidity_avg, last_q, updated_at "
+            "FROM profiles WHERE traveler_id=?",
+            (traveler_id,),
+        ).fetchone()
+        return self._profile_dict(r) if r else {}
 
     def _set_profile_prefs(self, traveler_id: str, tone: Optional[str], language_pref: Optional[str]) -> None:
         if not traveler_id:
             return
-        with self._connect() as con:
+        with self._db.transaction(immediate=True) as con:
             # ensure rows
             con.execute("INSERT OR IGNORE INTO travelers(id) VALUES (?)", (traveler_id,))
             con.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (traveler_id,))
@@ -209,11 +230,12 @@ class _SQLiteMemory:
                     "UPDATE profiles SET language_pref=?, updated_at=CURRENT_TIMESTAMP WHERE traveler_id=?",
                     (language_pref, traveler_id),
                 )
-            con.commit()
+        prefs = {k: v for k, v in (("tone", tone), ("language_pref", language_pref)) if v is not None}
+        identity_cache.update_profile(traveler_id, updated_at=_utc_now(), **prefs)
 
     def _bump_learning(self, traveler_id: str, last_q: str, lucidity: float) -> None:
         """Update interactions, lucidity_avg, last_q on profiles."""
-        with self._connect() as con:
+        with self._db.transaction(immediate=True) as con:
             # fetch existing for rolling average
             cur = con.execute(
                 "SELECT interactions, lucidity_avg FROM profiles WHERE traveler_id=?",
@@ -224,33 +246,36 @@ class _SQLiteMemory:
             prev_avg = float(r["lucidity_avg"] or 0.0) if r else 0.0
             # simple incremental average
             new_avg = ((prev_avg * (interactions - 1)) + float(lucidity)) / max(interactions, 1)
+            last_q = _ascii_clean(last_q)[:500]  # ASCII-safe last_q
             con.execute(
                 "UPDATE profiles SET interactions=?, lucidity_avg=?, last_q=?, updated_at=CURRENT_TIMESTAMP "
                 "WHERE traveler_id=?",
-                (interactions, new_avg, _ascii_clean(last_q)[:500], traveler_id),  # ASCII-safe last_q
+                (interactions, new_avg, last_q, traveler_id),
             )
-            con.commit()
+        # write-through (Memory drops the entry instead if an outer transaction rolls back)
+        identity_cache.update_profile(
+            traveler_id, interactions=interactions, lucidity_avg=new_avg, last_q=last_q, updated_at=_utc_now(),
+        )
 
     # ----------- legacy user_memory niceties -----------
     def _get_user_mem_row(self, user_id: str) -> Optional[dict]:
-        with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT user_id,tone,language_pref,last_questions,favorite_symbols,last_seen,interactions,lucidity_sum,lucidity_avg "
-                "FROM user_memory WHERE user_id=?", (user_id,))
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "user_id": row["user_id"],
-                "tone": row["tone"] or "",
-                "language_pref": row["language_pref"] or "",
-                "last_questions": json.loads(row["last_questions"] or "[]"),
-                "favorite_symbols": json.loads(row["favorite_symbols"] or "[]"),
-                "last_seen": float(row["last_seen"] or 0.0),
-                "interactions": int(row["interactions"] or 0),
-                "lucidity_sum": float(row["lucidity_sum"] or 0.0),
-                "lucidity_avg": float(row["lucidity_avg"] or 0.0),
-            }
+        cur = self._connect().execute(
+            "SELECT user_id,tone,language_pref,last_questions,favorite_symbols,last_seen,interactions,lucidity_sum,lucidity_avg "
+            "FROM user_memory WHERE user_id=?", (user_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        return {
+            "user_id": row["user_id"],
+            "tone": row["tone"] or "",
+            "language_pref": row["language_pref"] or "",
+            "last_questions": json.loads(row["last_questions"] or "[]"),
+            "favorite_symbols": json.loads(row["favorite_symbols"] or "[]"),
+            "last_seen": float(row["last_seen"] or 0.0),
+            "interactions": int(row["interactions"] or 0),
+            "lucidity_sum": float(row["lucidity_sum"] or 0.0),
+            "lucidity_avg": float(row["lucidity_avg"] or 0.0),
+        }
 
     def _user_mem_get_or_fresh(self, user_id: str) -> dict:
         return self._get_user_mem_row(user_id) or {
@@ -260,7 +285,7 @@ class _SQLiteMemory:
         }
 
     def _user_mem_set_prefs(self, user_id: str, tone: Optional[str], language_pref: Optional[str]) -> None:
-        with self._connect() as conn:
+        with self._db.transaction(immediate=True) as conn:
             row = self._get_user_mem_row(user_id)
             if not row:
                 conn.execute(
@@ -275,14 +300,13 @@ class _SQLiteMemory:
                     "UPDATE user_memory SET tone=?, language_pref=?, last_seen=? WHERE user_id=?",
                     (tone_v, lang_v, time.time(), user_id),
                 )
-            conn.commit()
 
     def _user_mem_update_after_run(self, user_id: str, question: str, answer: str, lucidity: float) -> None:
         question = (question or "").strip()
         answer = (answer or "").strip()
         syms = list(set(_EMOJI.findall(question + " " + answer)))[:16]
 
-        with self._connect() as conn:
+        with self._db.transaction(immediate=True) as conn:
             row = self._get_user_mem_row(user_id)
             if not row:
                 last_qs = [question] if question else []
@@ -306,7 +330,6 @@ class _SQLiteMemory:
                     "WHERE user_id=?",
                     (json.dumps(last_qs), json.dumps(fav), time.time(), interactions, luc_sum, luc_avg, user_id)
                 )
-            conn.commit()
 
 class Memory:
     """
@@ -321,6 +344,11 @@ class Memory:
     def __init__(self, config=None):
         self.backend = _SQLiteMemory(_DB_PATH)
 
+    @property
+    def db(self):
+        """The SharedDB every memory write goes through."""
+        return self.backend._db
+
     # --- identity / profile ---
     def resolve_user(self, raw: str) -> Tuple[str, dict]:
         return self.backend.resolve_user(raw)
@@ -329,15 +357,25 @@ class Memory:
         return self.backend._get_profile(traveler_id)
 
     def set_preferences(self, traveler_id: str, tone: Optional[str]=None, language_pref: Optional[str]=None) -> None:
-        # update both canonical profile and legacy user_memory (same id key)
-        self.backend._set_profile_prefs(traveler_id, tone, language_pref)
-        self.backend._user_mem_set_prefs(traveler_id, tone, language_pref)
+        # update both canonical profile and legacy user_memory (same id key), one transaction
+        try:
+            with self.backend._db.transaction(immediate=True):
+                self.backend._set_profile_prefs(traveler_id, tone, language_pref)
+                self.backend._user_mem_set_prefs(traveler_id, tone, language_pref)
+        except Exception:
+            identity_cache.invalidate_traveler(traveler_id)  # undo the write-through
+            raise
 
     def update_after_run(self, traveler_id: str, question: str, answer: str, lucidity: float=0.0) -> None:
-        # canonical rolling stats
-        self.backend._bump_learning(traveler_id, last_q=question, lucidity=lucidity)
-        # keep legacy convenience store in sync
-        self.backend._user_mem_update_after_run(traveler_id, question, answer, lucidity)
+        try:
+            with self.backend._db.transaction(immediate=True):
+                # canonical rolling stats
+                self.backend._bump_learning(traveler_id, last_q=question, lucidity=lucidity)
+                # keep legacy convenience store in sync
+                self.backend._user_mem_update_after_run(traveler_id, question, answer, lucidity)
+        except Exception:
+            identity_cache.invalidate_traveler(traveler_id)  # undo the write-through
+            raise
 
     # Back-compat: old callsites may still use this name
     def get(self, traveler_id: str) -> dict:
@@ -2,12 +2,14 @@ import os, sqlite3
 from uuid import uuid4
 from typing import Optional, Tuple, Dict
 
+from .dbconn import shared_db
+from .identity_cache import identity_cache
+
 DB_PATH = os.getenv("LEDGER_DB", os.path.join(os.getenv("MIRROR_ROOT", "."), "mirror-v4.db"))
 
-def _db():
-    db = sqlite3.connect(DB_PATH)
-    db.row_factory = sqlite3.Row
-    return db
+def _db() -> sqlite3.Connection:
+    # persistent per-thread connection (dbconn); don't close it
+    return shared_db(DB_PATH).conn()
 
 def parse_user_token(s: str) -> Dict[str, Optional[str]]:
     """
@@ -37,7 +39,8 @@ def parse_user_token(s: str) -> Dict[str, Optional[str]]:
     return {"provider": "anon", "external_id": ident, "handle": None}
 
 def ensure_tables():
-    db = _db(); cur = db.cursor()
+    """Create identity tables; called once at startup."""
+    cur = _db().cursor()
     cur.executescript("""
     CREATE TABLE IF NOT EXISTS travelers (
       id TEXT PRIMARY KEY,
@@ -63,26 +66,27 @@ def ensure_tables():
       updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
     """)
-    db.commit(); db.close()
 
 def resolve_traveler(token: Dict[str, Optional[str]]) -> Tuple[str, Dict]:
     """
     Find or create (traveler, identity). Returns (traveler_id, identity_row_dict).
     """
-    db = _db(); cur = db.cursor()
     prov, ext = token["provider"], token["external_id"]
-    row = cur.execute("SELECT * FROM identities WHERE provider=? AND external_id=?", (prov, ext)).fetchone()
+    q = "SELECT * FROM identities WHERE provider=? AND external_id=?"
+    row = _db().execute(q, (prov, ext)).fetchone()
     if row:
-        db.close()
         return row["traveler_id"], dict(row)
 
     # create new traveler + identity + ensure profile
-    tid = uuid4().hex
-    cur.execute("INSERT INTO travelers(id) VALUES (?)", (tid,))
-    cur.execute("INSERT INTO identities(id, traveler_id, provider, external_id, handle, verified) VALUES (?,?,?,?,?,0)",
-                (uuid4().hex, tid, prov, ext, token.get("handle")))
-    cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (tid,))
-    db.commit(); db.close()
+    with shared_db(DB_PATH).transaction(immediate=True) as cur:
+        row = cur.execute(q, (prov, ext)).fetchone()  # created meanwhile by another writer
+        if row:
+            return row["traveler_id"], dict(row)
+        tid = uuid4().hex
+        cur.execute("INSERT INTO travelers(id) VALUES (?)", (tid,))
+        cur.execute("INSERT INTO identities(id, traveler_id, provider, external_id, handle, verified) VALUES (?,?,?,?,?,0)",
+                    (uuid4().hex, tid, prov, ext, token.get("handle")))
+        cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (tid,))
     return tid, {"traveler_id": tid, "provider": prov, "external_id": ext, "handle": token.get("handle"), "verified": 0}
 
 def merge_travelers(dst_tid: str, src_tid: str) -> None:
@@ -91,35 +95,36 @@ def merge_travelers(dst_tid: str, src_tid: str) -> None:
     """
     if dst_tid == src_tid:  # nothing to do
         return
-    db = _db(); cur = db.cursor()
-    # move identities
-    cur.execute("UPDATE identities SET traveler_id=? WHERE traveler_id=?", (dst_tid, src_tid))
-    # ensure profiles exist
-    cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (dst_tid,))
-    cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (src_tid,))
-    # fetch for merge
-    p_dst = cur.execute("SELECT interactions, lucidity_avg, last_q FROM profiles WHERE traveler_id=?", (dst_tid,)).fetchone()
-    p_src = cur.execute("SELECT interactions, lucidity_avg FROM profiles WHERE traveler_id=?", (src_tid,)).fetchone()
-    n1, a1 = (p_dst["interactions"] or 0), (p_dst["lucidity_avg"] or 0.0)
-    n2, a2 = (p_src["interactions"] or 0), (p_src["lucidity_avg"] or 0.0)
-    n = n1 + n2
-    new_avg = (a1 * n1 + a2 * n2) / n if n > 0 else 0.0
-    new_last_q = p_dst["last_q"]  # keep dst's last_q
-    cur.execute("UPDATE profiles SET interactions=?, lucidity_avg=?, last_q=?, updated_at=CURRENT_TIMESTAMP WHERE traveler_id=?",
-                (n, new_avg, new_last_q, dst_tid))
-    # remove src profile + traveler
-    cur.execute("DELETE FROM profiles WHERE traveler_id=?", (src_tid,))
-    cur.execute("DELETE FROM travelers WHERE id=?", (src_tid,))
-    db.commit(); db.close()
+    with shared_db(DB_PATH).transaction(immediate=True) as cur:
+        # move identities
+        cur.execute("UPDATE identities SET traveler_id=? WHERE traveler_id=?", (dst_tid, src_tid))
+        # ensure profiles exist
+        cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (dst_tid,))
+        cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (src_tid,))
+        # fetch for merge
+        p_dst = cur.execute("SELECT interactions, lucidity_avg, last_q FROM profiles WHERE traveler_id=?", (dst_tid,)).fetchone()
+        p_src = cur.execute("SELECT interactions, lucidity_avg FROM profiles WHERE traveler_id=?", (src_tid,)).fetchone()
+        n1, a1 = (p_dst["interactions"] or 0), (p_dst["lucidity_avg"] or 0.0)
+        n2, a2 = (p_src["interactions"] or 0), (p_src["lucidity_avg"] or 0.0)
+        n = n1 + n2
+        new_avg = (a1 * n1 + a2 * n2) / n if n > 0 else 0.0
+        new_last_q = p_dst["last_q"]  # keep dst's last_q
+        cur.execute("UPDATE profiles SET interactions=?, lucidity_avg=?, last_q=?, updated_at=CURRENT_TIMESTAMP WHERE traveler_id=?",
+                    (n, new_avg, new_last_q, dst_tid))
+        # remove src profile + traveler
+        cur.execute("DELETE FROM profiles WHERE traveler_id=?", (src_tid,))
+        cur.execute("DELETE FROM travelers WHERE id=?", (src_tid,))
+    # src tokens now resolve to dst, and dst's profile changed
+    identity_cache.invalidate_traveler(dst_tid, src_tid)
 
 def forget_traveler(traveler_id: str, hard: bool=False) -> None:
-    db = _db(); cur = db.cursor()
-    if hard:
-        cur.execute("DELETE FROM travelers WHERE id=?", (traveler_id,))
-        # ON DELETE CASCADE will remove identities + profile
-    else:
-        # soft reset: keep traveler + identities, zero profile stats
-        cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (traveler_id,))
-        cur.execute("""UPDATE profiles SET interactions=0, lucidity_avg=0.0, last_q='',
-                       updated_at=CURRENT_TIMESTAMP WHERE traveler_id=?""", (traveler_id,))
-    db.commit(); db.close()
+    with shared_db(DB_PATH).transaction(immediate=True) as cur:
+        if hard:
+            cur.execute("DELETE FROM travelers WHERE id=?", (traveler_id,))
+            # ON DELETE CASCADE will remove identities + profile
+        else:
+            # soft reset: keep traveler + identities, zero profile stats
+            cur.execute("INSERT OR IGNORE INTO profiles(traveler_id) VALUES (?)", (traveler_id,))
+            cur.execute("""UPDATE profiles SET interactions=0, lucidity_avg=0.0, last_q='',
+                           updated_at=CURRENT_TIMESTAMP WHERE traveler_id=?""", (traveler_id,))
+    identity_cache.invalidate_traveler(traveler_id)
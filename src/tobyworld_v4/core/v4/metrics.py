@@ -37,6 +37,14 @@ mv4_request_latency_seconds = Histogram(
     ["route"], registry=REG
 )
 
+# Per-stage /ask latency (guide, retrieval, synthesis, llm, db_*, total, ...)
+mv4_stage_latency_seconds = Histogram(
+    "mv4_stage_latency_seconds",
+    "/ask pipeline stage latency (s)",
+    ["stage"], registry=REG,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
 # In-flight gauge to watch active handlers
 mv4_inflight_requests = Gauge(
     "mv4_inflight_requests",
@@ -64,6 +72,192 @@ mv4_reindex_lock_collisions_total = Counter(
     [], registry=REG
 )
 
+# ---- Retriever reader pool ----
+mv4_retriever_pool_connections = Gauge(
+    "mv4_retriever_pool_connections",
+    "Retriever read-only SQLite connections by state (open/active)",
+    ["state"], registry=REG
+)
+
+mv4_retriever_pool_wait_seconds = Histogram(
+    "mv4_retriever_pool_wait_seconds",
+    "Time (s) a search waited for a retriever reader connection",
+    [], registry=REG,
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+# ---- Retriever query cache ----
+mv4_retriever_cache_total = Counter(
+    "mv4_retriever_cache_total",
+    "Retriever multi_arc cache lookups/evictions by result (hit/miss/evict/expire)",
+    ["result"], registry=REG
+)
+
+mv4_retriever_cache_entries = Gauge(
+    "mv4_retriever_cache_entries",
+    "Entries currently held in the retriever multi_arc cache",
+    [], registry=REG
+)
+
+# ---- /ask full-answer cache ----
+mv4_answer_cache_total = Counter(
+    "mv4_answer_cache_total",
+    "Answer cache lookups/evictions by result (hit/miss/evict/expire)",
+    ["result"], registry=REG
+)
+
+mv4_answer_cache_entries = Gauge(
+    "mv4_answer_cache_entries",
+    "Entries currently held in the /ask answer cache",
+    [], registry=REG
+)
+
+# ---- Identity resolution cache ----
+mv4_identity_cache_total = Counter(
+    "mv4_identity_cache_total",
+    "Identity cache lookups/evictions/invalidations by result",
+    ["result"], registry=REG
+)
+
+mv4_identity_cache_entries = Gauge(
+    "mv4_identity_cache_entries",
+    "Tokens currently held in the identity cache",
+    registry=REG
+)
+
+# ---- /ask single-flight ----
+mv4_ask_coalesced_total = Counter(
+    "mv4_ask_coalesced_total",
+    "Identical concurrent /ask requests served from another request's in-flight answer",
+    [], registry=REG
+)
+
+# ---- LLM admission control ----
+mv4_llm_admission_total = Counter(
+    "mv4_llm_admission_total",
+    "LLM admission decisions (admitted/queued/timeout/rejected)",
+    ["result"], registry=REG
+)
+
+mv4_llm_queue_depth = Gauge(
+    "mv4_llm_queue_depth",
+    "Requests waiting for an LLM slot",
+    [], registry=REG
+)
+
+mv4_llm_inflight = Gauge(
+    "mv4_llm_inflight",
+    "LLM completions currently running",
+    [], registry=REG
+)
+
+mv4_llm_queue_wait_seconds = Histogram(
+    "mv4_llm_queue_wait_seconds",
+    "Time (s) a request queued for an LLM slot",
+    [], registry=REG,
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+# ---- Per-stage thread pools ----
+mv4_executor_queue_depth = Gauge(
+    "mv4_executor_queue_depth",
+    "Jobs submitted to a stage pool but not yet running",
+    ["pool"], registry=REG
+)
+
+mv4_executor_active_threads = Gauge(
+    "mv4_executor_active_threads",
+    "Stage pool threads currently running a job",
+    ["pool"], registry=REG
+)
+
+mv4_executor_wait_seconds = Histogram(
+    "mv4_executor_wait_seconds",
+    "Time (s) a job waited for a stage pool thread",
+    ["pool"], registry=REG,
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+# ---- Async log sink ----
+mv4_log_events_total = Counter(
+    "mv4_log_events_total",
+    "jlog events by outcome (written/filtered/sampled/dropped)",
+    ["result"], registry=REG
+)
+
+mv4_log_queue_depth = Gauge(
+    "mv4_log_queue_depth",
+    "Log events waiting for the writer thread",
+    registry=REG
+)
+
+# ---- Write-behind persistence queue ----
+mv4_write_behind_queue_depth = Gauge(
+    "mv4_write_behind_queue_depth",
+    "Persistence jobs waiting in the write-behind queue",
+    [], registry=REG
+)
+
+mv4_write_behind_jobs_total = Counter(
+    "mv4_write_behind_jobs_total",
+    "Write-behind jobs by job name and result (ok/error/rejected)",
+    ["job", "result"], registry=REG
+)
+
+mv4_write_behind_lag_seconds = Histogram(
+    "mv4_write_behind_lag_seconds",
+    "Time (s) from enqueue to completion of a write-behind job",
+    [], registry=REG,
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+mv4_write_behind_batch_size = Histogram(
+    "mv4_write_behind_batch_size",
+    "Jobs drained per write-behind worker wakeup",
+    [], registry=REG,
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+# ---- Ledger group-commit writer ----
+mv4_ledger_rows_total = Counter(
+    "mv4_ledger_rows_total",
+    "Ledger rows by result (ok/error/inline)",
+    ["result"], registry=REG
+)
+
+mv4_ledger_queue_depth = Gauge(
+    "mv4_ledger_queue_depth",
+    "Ledger rows waiting for the next group commit",
+    [], registry=REG
+)
+
+mv4_ledger_batch_size = Histogram(
+    "mv4_ledger_batch_size",
+    "Ledger rows written per transaction",
+    [], registry=REG,
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+mv4_ledger_commit_seconds = Histogram(
+    "mv4_ledger_commit_seconds",
+    "Time (s) to insert + commit one ledger batch",
+    [], registry=REG,
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+)
+
+# ---- Ledger retention / archiver ----
+mv4_ledger_archived_rows_total = Counter(
+    "mv4_ledger_archived_rows_total",
+    "Rows moved from SQLite into monthly archive files, by table",
+    ["table"], registry=REG
+)
+
+mv4_ledger_archive_runs_total = Counter(
+    "mv4_ledger_archive_runs_total",
+    "Archiver passes by result (ok/error)",
+    ["result"], registry=REG
+)
+
 def metrics_app(environ, start_response):
     """WSGI adapter for exposing metrics via Starlette/FastAPI mount."""
     data = generate_latest(REG)
@@ -98,10 +292,39 @@ __all__ = [
     "CONTENT_TYPE_LATEST",
     "mv4_requests_total",
     "mv4_request_latency_seconds",
+    "mv4_stage_latency_seconds",
     "mv4_inflight_requests",
     "mv4_failures_total",
     "mv4_llm_fallbacks_total",
     "mv4_reindex_lock_collisions_total",
+    "mv4_retriever_pool_connections",
+    "mv4_retriever_pool_wait_seconds",
+    "mv4_retriever_cache_total",
+    "mv4_retriever_cache_entries",
+    "mv4_answer_cache_total",
+    "mv4_answer_cache_entries",
+    "mv4_identity_cache_total",
+    "mv4_identity_cache_entries",
+    "mv4_ask_coalesced_total",
+    "mv4_llm_admission_total",
+    "mv4_llm_queue_depth",
+    "mv4_llm_inflight",
+    "mv4_llm_queue_wait_seconds",
+    "mv4_executor_queue_depth",
+    "mv4_executor_active_threads",
+    "mv4_executor_wait_seconds",
+    "mv4_log_events_total",
+    "mv4_log_queue_depth",
+    "mv4_write_behind_queue_depth",
+    "mv4_write_behind_jobs_total",
+    "mv4_write_behind_lag_seconds",
+    "mv4_write_behind_batch_size",
+    "mv4_ledger_rows_total",
+    "mv4_ledger_queue_depth",
+    "mv4_ledger_batch_size",
+    "mv4_ledger_commit_seconds",
+    "mv4_ledger_archived_rows_total",
+    "mv4_ledger_archive_runs_total",
     "metrics_app",
     "track_request",
 ]
@@ -1,11 +1,12 @@
 # tobyworld_v4/core/v4/prompt_manager.py
 from __future__ import annotations
-import os
+import os, time
 from pathlib import Path
 
 class PromptManager:
     def __init__(self, base_dir: str | None = None):
         self.base_dir = Path(base_dir or os.getenv("PROMPTS_DIR", "prompts")).resolve()
+        self._gen = (float("-inf"), 0)  # (checked_at, generation)
 
     def get(self, name: str, default: str = "") -> str:
         """
@@ -20,4 +21,19 @@ class PromptManager:
             pass
         return default
 
+    def generation(self, max_age: float = 2.0) -> int:
+        """
+        Changes whenever a prompt file is added, removed or edited. Re-stats
+        the directory at most every `max_age` seconds; used to key answer caches.
+        """
+        now = time.monotonic()
+        if now - self._gen[0] < max_age:
+            return self._gen[1]
+        try:
+            sig = tuple(sorted((p.name, p.stat().st_mtime_ns) for p in self.base_dir.iterdir() if p.is_file()))
+        except OSError:
+            sig = ()
+        self._gen = (now, hash(sig))
+        return self._gen[1]
+
 PM = PromptManager()
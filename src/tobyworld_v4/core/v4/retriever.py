@@ -1,34 +1,80 @@
 # src/tobyworld_v4/core/v4/retriever.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Any, Iterable, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
-import os, math, re, time, sqlite3, threading, json
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from array import array
+import os, math, re, time, sqlite3, threading, json, hashlib
 import logging
 
+try:
+    import numpy as _np  # optional: vectorized re-ranking / dense scan
+except ImportError:
+    _np = None
+
 from .config import config
+from .vectors import VectorStore, EMB_DIM, embed as _embed
+from .logsink import sink as log_sink
+
+try:
+    from .metrics import (
+        mv4_retriever_pool_connections, mv4_retriever_pool_wait_seconds,
+        mv4_retriever_cache_total, mv4_retriever_cache_entries,
+    )
+except ImportError:
+    class _DummyMetric:
+        def labels(self, **kwargs): return self
+        def inc(self, amount=1): pass
+        def set(self, value): pass
+        def observe(self, value): pass
+    mv4_retriever_pool_connections = mv4_retriever_pool_wait_seconds = _DummyMetric()
+    mv4_retriever_cache_total = mv4_retriever_cache_entries = _DummyMetric()
 
 # ──────────────────────────────────────────────────────────────────────────────
 # SQLite FTS5 retriever with hint-aware scoring.
 # - Uses on-disk DB so index persists across restarts.
-# - If FTS5 is unavailable, falls back to in-memory lexical retrieval.
+# - If FTS5 is unavailable, falls back to an in-memory inverted index (bm25).
+# - Writes go through one writer connection (guarded by _LOCK); searches use
+#   per-thread read-only connections so concurrent /ask calls don't serialize.
+# - Hybrid: passages also get hashed n-gram vectors (core/v4/vectors.py) in a
+#   float32 file next to the DB; dense scores fuse with bm25 via BM25_W/EMB_W.
+# - multi_arc results are cached (LRU + TTL) per index generation; every
+#   index write bumps the generation, so stale entries are never served.
 # - Public API (exported at bottom):
-#     indexing(), index_stats(), set_index(), load_index_from_folder(), close_db(), class Retriever
+#     indexing(), index_stats(), pool_stats(), cache_stats(), clear_cache(),
+#     index_generation(), set_index(), load_index_from_folder(), index_paths(),
+#     close_db(), class Retriever
 # ──────────────────────────────────────────────────────────────────────────────
 
 log = logging.getLogger("retriever")
 
 _FTS_DB_PATH = os.getenv("RETRIEVER_DB", "mirror-v4-fts.db")
-_LOCK = threading.RLock()
+_LOCK = threading.RLock()  # writer connection lock
 
 # indexer busy flag (for /reindex status & overlap prevention)
 _INDEXING = False
 def indexing() -> bool:
     return _INDEXING
 
+# index generation: bumped by every write so cached query results go stale
+_INDEX_GEN = 0
+def index_generation() -> int:
+    return _INDEX_GEN
+
+def _bump_generation() -> None:
+    global _INDEX_GEN
+    _INDEX_GEN += 1
+    _CACHE.clear()
+
+# per-stage latency of the last uncached multi_arc (exposed via index_stats())
+_LAST_SEARCH_STAGES: Dict[str, float] = {}
+
 # last index stats (exposed via index_stats())
 _LAST_INDEX_STATS: Dict[str, Any] = {
-    "added": 0, "skipped": 0, "failed": 0, "considered": 0, "duration_sec": 0.0,
+    "added": 0, "skipped": 0, "failed": 0, "considered": 0, "deleted": 0, "duration_sec": 0.0,
     "root": None, "pattern": None, "fts": None,
 }
 
@@ -37,8 +83,15 @@ TOPK_RAW      = int(os.getenv("RETRIEVER_TOPK_RAW", "120"))      # wide gather b
 TOPK_FINAL    = int(os.getenv("RETRIEVER_TOPK_FINAL", "48"))      # pass to synthesis
 TOPK_PER_ARC  = int(os.getenv("RETRIEVER_TOPK_PER_ARC", "0"))     # 0 = off (unused here, for future)
 MIN_SCORE     = float(os.getenv("RETRIEVER_MIN_SCORE", "0.20"))   # permissive gate (on our normalized score)
-BM25_W        = float(os.getenv("RETRIEVER_BM25_WEIGHT", "0.55")) # reserved for hybrid
-EMB_W         = float(os.getenv("RETRIEVER_EMB_WEIGHT", "0.45"))  # reserved for hybrid
+BM25_W        = float(os.getenv("RETRIEVER_BM25_WEIGHT", "0.55")) # hybrid: lexical share
+EMB_W         = float(os.getenv("RETRIEVER_EMB_WEIGHT", "0.45"))  # hybrid: dense share (0 = FTS only)
+HYBRID        = os.getenv("RETRIEVER_HYBRID", "1").strip().lower() not in ("0", "off", "false", "no")
+READ_POOL     = int(os.getenv("RETRIEVER_READ_POOL", "8"))        # max concurrent reader connections
+INDEX_WORKERS = int(os.getenv("RETRIEVER_INDEX_WORKERS", "4"))    # file read/parse threads on reindex
+CHUNK_CHARS   = int(os.getenv("RETRIEVER_CHUNK_CHARS", "800"))    # passage size target (chars)
+CHUNK_OVERLAP = int(os.getenv("RETRIEVER_CHUNK_OVERLAP", "120"))  # window overlap for long paragraphs
+CACHE_SIZE    = int(os.getenv("RETRIEVER_CACHE_SIZE", "512"))     # multi_arc result cache entries (0 = off)
+CACHE_TTL     = float(os.getenv("RETRIEVER_CACHE_TTL", "300"))    # seconds; bounds recency-score drift
 
 _WORD_RX = re.compile(r"[a-z0-9][a-z0-9\-']*", re.I)
 _STOP = set("""
@@ -48,6 +101,8 @@ what when where who whom which that this these those often ever never always it
 their his her your my our as i you we they them me us
 """.split())
 
+_INDEX_EXTS = {".md", ".markdown", ".txt"}
+
 def _tokens(s: str) -> List[str]:
     return [t.lower() for t in _WORD_RX.findall(s or "") if t.lower() not in _STOP]
 
@@ -82,6 +137,138 @@ def _chunk_text(text: str, max_chars: int = 800) -> Tuple[str, Tuple[int,int]]:
         return text, (0, len(text))
     return text[:max_chars], (0, max_chars)
 
+_PARA_RX = re.compile(r"\n[ \t]*\n")
+
+def _passages(text: str, max_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int,int]]:
+    """
+    Split text into passage spans (start, end) over the ORIGINAL string:
+      - blank-line paragraphs are packed greedily up to max_chars
+      - a paragraph longer than max_chars becomes overlapping windows,
+        cut on whitespace where possible
+    """
+    text = text or ""
+    bounds, pos = [], 0
+    for m in _PARA_RX.finditer(text):
+        bounds.append((pos, m.start()))
+        pos = m.end()
+    bounds.append((pos, len(text)))
+
+    out: List[Tuple[int,int]] = []
+    cur: Optional[Tuple[int,int]] = None
+    for s, e in bounds:
+        while s < e and text[s].isspace(): s += 1
+        while e > s and text[e-1].isspace(): e -= 1
+        if e <= s:
+            continue
+        if e - s > max_chars:
+            if cur:
+                out.append(cur); cur = None
+            w = s
+            while w < e:
+                we = min(e, w + max_chars)
+                if we < e:
+                    sp = text.rfind(" ", w + max_chars // 2, we)
+                    if sp > w:
+                        we = sp
+                out.append((w, we))
+                if we >= e:
+                    break
+                w = max(w + 1, we - overlap)
+                sp = text.find(" ", w, we)
+                if sp != -1:
+                    w = sp + 1  # start the next window on a word boundary
+            continue
+        if cur and e - cur[0] <= max_chars:
+            cur = (cur[0], e)
+        else:
+            if cur:
+                out.append(cur)
+            cur = (s, e)
+    if cur:
+        out.append(cur)
+    return out
+
+def _best_passage(text: str, terms: List[str]) -> Tuple[str, Tuple[int,int]]:
+    """Pick the passage with the most query-term hits (used where FTS bm25 is unavailable)."""
+    spans = _passages(text)
+    if not spans:
+        return _chunk_text(text)
+    best, best_hits = spans[0], -1
+    wanted = set(terms or [])
+    for s, e in spans:
+        hits = sum(1 for t in _tokens(text[s:e]) if t in wanted) if wanted else 0
+        if hits > best_hits:
+            best, best_hits = (s, e), hits
+    return text[best[0]:best[1]], best
+
+# ── Query cache ───────────────────────────────────────────────────────────────
+
+class _QueryCache:
+    """
+    Bounded LRU + TTL map for multi_arc results. Keys carry the index
+    generation, and _bump_generation() also clears the map outright.
+    Values are stored and returned as shallow row copies so callers can't
+    mutate what's cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def get(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        if not self.maxsize:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl > 0 and time.monotonic() - item[0] > self.ttl:
+                del self._data[key]
+                self.expired += 1
+                mv4_retriever_cache_total.labels(result="expire").inc()
+                item = None
+            if item is None:
+                self.misses += 1
+                mv4_retriever_cache_total.labels(result="miss").inc()
+                mv4_retriever_cache_entries.set(len(self._data))
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        mv4_retriever_cache_total.labels(result="hit").inc()
+        return [dict(r) for r in item[1]]
+
+    def put(self, key: tuple, rows: List[Dict[str, Any]]) -> None:
+        if not self.maxsize or key[0] != _INDEX_GEN:
+            return  # disabled, or the index moved on while we were searching
+        with self._lock:
+            self._data[key] = (time.monotonic(), [dict(r) for r in rows])
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+                mv4_retriever_cache_total.labels(result="evict").inc()
+            mv4_retriever_cache_entries.set(len(self._data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        mv4_retriever_cache_entries.set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "size": size, "maxsize": self.maxsize, "ttl_sec": self.ttl,
+            "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "expired": self.expired,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "generation": _INDEX_GEN,
+        }
+
+_CACHE = _QueryCache(CACHE_SIZE, CACHE_TTL)
+
 # ── FTS layer ─────────────────────────────────────────────────────────────────
 
 _SCHEMA = """
@@ -95,18 +282,47 @@ CREATE TABLE IF NOT EXISTS docs (
   ts REAL,
   epoch TEXT,
   symbols TEXT,   -- JSON array
-  text TEXT
+  text TEXT,
+  hash TEXT       -- BLAKE2b of the source bytes (change/rename detection)
+);
+
+-- file ledger for folder indexing; deleted_at marks a tombstone
+CREATE TABLE IF NOT EXISTS manifest (
+  path TEXT PRIMARY KEY,
+  hash TEXT,
+  size INTEGER,
+  mtime REAL,
+  indexed_at REAL,
+  deleted_at REAL,
+  renamed_to TEXT
+);
+
+-- passage spans (start/end are char offsets into docs.text)
+CREATE TABLE IF NOT EXISTS chunks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  doc_id TEXT NOT NULL,
+  ord INTEGER NOT NULL,
+  span_start INTEGER NOT NULL,
+  span_end INTEGER NOT NULL,
+  vec_slot INTEGER        -- row in the dense vector file (NULL = not embedded yet)
+);
+
+-- small key/value store (vector dim, ...)
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
 );
 
--- contentless FTS so we can recompute text as needed
-CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
-  id, title, series, text,
+-- passage-level FTS; rowid = chunks.id
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+  title, text,
   tokenize = 'porter'
 );
 
 -- small helper to speed up common filters
 CREATE INDEX IF NOT EXISTS idx_docs_series ON docs(series);
 CREATE INDEX IF NOT EXISTS idx_docs_ts ON docs(ts);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);
 """
 
 def _fts_supported() -> bool:
@@ -122,162 +338,733 @@ _SUPPORTS_FTS = _fts_supported()
 _DB: Optional[sqlite3.Connection] = None
 
 def _db() -> Optional[sqlite3.Connection]:
+    """The single writer connection (creates schema on first use). Hold _LOCK while writing."""
     global _DB
     if not _SUPPORTS_FTS:
         return None
     if _DB is None:
-        _DB = sqlite3.connect(_FTS_DB_PATH, check_same_thread=False)
-        _DB.executescript(_SCHEMA)
-        _DB.commit()
+        with _LOCK:
+            if _DB is None:
+                con = sqlite3.connect(_FTS_DB_PATH, check_same_thread=False)
+                con.executescript(_SCHEMA)
+                _fts_migrate(con)
+                con.commit()
+                _DB = con
     return _DB
 
+class _Slot:
+    __slots__ = ("con", "owner", "busy", "used")
+
+    def __init__(self, owner: threading.Thread):
+        self.con: Optional[sqlite3.Connection] = None  # None while the owner is opening it
+        self.owner = owner
+        self.busy = 0       # leases in progress (a thread may nest them)
+        self.used = 0.0
+
+class _ReaderPool:
+    """
+    Read-only connections, one per worker thread (WAL lets them read beside the writer).
+    A semaphore caps how many run at once; lease waits and utilization are tracked.
+    Connections of threads that have exited are closed, and once `size` are open a
+    new thread takes over the least recently used idle one, so at most `size` stay open.
+    """
+    def __init__(self, size: int):
+        self.size = max(1, int(size))
+        self._sem = threading.BoundedSemaphore(self.size)
+        self._mu = threading.Lock()
+        self._conns: Dict[int, _Slot] = {}
+        self.active = 0
+        self.leases = 0
+        self.waits = 0          # leases that had to block on the semaphore
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.reaped = 0         # connections closed because their thread exited
+        self.handoffs = 0       # idle connections taken over by another thread
+
+    def _open(self) -> sqlite3.Connection:
+        uri = Path(_FTS_DB_PATH).resolve().as_uri() + "?mode=ro"
+        con = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        con.execute("PRAGMA query_only=ON;")
+        return con
+
+    def _checkout(self) -> _Slot:
+        """The calling thread's slot (busy-marked); caller holds a semaphore permit."""
+        me = threading.current_thread()
+        tid = threading.get_ident()
+        dead: List[sqlite3.Connection] = []
+        with self._mu:
+            slot = self._conns.get(tid)
+            if slot is None:
+                for k in [k for k, sl in self._conns.items() if not sl.owner.is_alive() and sl.con is not None]:
+                    dead.append(self._conns.pop(k).con)
+                self.reaped += len(dead)
+                if len(self._conns) >= self.size:
+                    # we hold a permit, so at most size-1 slots are busy: take over an idle one
+                    idle = [k for k, sl in self._conns.items() if not sl.busy and sl.con is not None]
+                    slot = self._conns.pop(min(idle, key=lambda k: self._conns[k].used))
+                    self.handoffs += 1
+                else:
+                    slot = _Slot(me)
+                self._conns[tid] = slot
+            slot.owner = me  # also covers a thread ident reused after its first owner exited
+            slot.busy += 1
+            slot.used = time.monotonic()
+            fresh = slot.con is None
+        for con in dead:
+            try:
+                con.close()
+            except Exception:
+                pass
+        if fresh:
+            try:
+                slot.con = self._open()
+            except Exception:
+                with self._mu:
+                    self._conns.pop(tid, None)
+                raise
+        return slot
+
+    @contextmanager
+    def lease(self) -> Iterator[sqlite3.Connection]:
+        t0 = time.perf_counter()
+        blocked = not self._sem.acquire(blocking=False)
+        if blocked:
+            self._sem.acquire()
+        waited = time.perf_counter() - t0
+        try:
+            slot = self._checkout()
+            with self._mu:
+                self.active += 1
+                self.leases += 1
+                self.waits += int(blocked)
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+                opened, active = len(self._conns), self.active
+        except Exception:
+            self._sem.release()
+            raise
+        mv4_retriever_pool_wait_seconds.observe(waited)
+        mv4_retriever_pool_connections.labels(state="open").set(opened)
+        mv4_retriever_pool_connections.labels(state="active").set(active)
+        try:
+            yield slot.con
+        finally:
+            with self._mu:
+                slot.busy -= 1
+                self.active -= 1
+                active = self.active
+            self._sem.release()
+            mv4_retriever_pool_connections.labels(state="active").set(active)
+
+    def close_all(self) -> None:
+        with self._mu:
+            conns, self._conns = [sl.con for sl in self._conns.values() if sl.con is not None], {}
+        for con in conns:
+            try:
+                con.close()
+            except Exception:
+                pass
+        mv4_retriever_pool_connections.labels(state="open").set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._mu:
+            return {
+                "size": self.size,
+                "open": len(self._conns),
+                "active": self.active,
+                "utilization": round(self.active / self.size, 3),
+                "leases": self.leases,
+                "waits": self.waits,
+                "wait_ms_avg": round(1000.0 * self.wait_total / self.leases, 3) if self.leases else 0.0,
+                "wait_ms_max": round(1000.0 * self.wait_max, 3),
+                "reaped": self.reaped,
+                "handoffs": self.handoffs,
+            }
+
+_POOL = _ReaderPool(READ_POOL)
+
+@contextmanager
+def _reader() -> Iterator[Optional[sqlite3.Connection]]:
+    """Read-only connection for the calling thread (None if FTS is unavailable)."""
+    con = _db()  # make sure schema/migrations exist before opening read-only
+    if con is None:
+        yield None
+    elif _FTS_DB_PATH == ":memory:":
+        with _LOCK:  # a private in-memory DB is only visible to the writer
+            yield con
+    else:
+        with _POOL.lease() as rcon:
+            yield rcon
+
+def _fts_migrate(con: sqlite3.Connection) -> None:
+    """
+    One-shot upgrades for older index DBs:
+      - add docs.hash (backfilled lazily by the next folder reindex)
+      - build passage rows for docs indexed before chunks existed
+      - drop the old per-document FTS table (no longer queried)
+      - add chunks.vec_slot (vectors are built by the next _vec_sync)
+    """
+    cols = {r[1] for r in con.execute("PRAGMA table_info(docs)")}
+    if "hash" not in cols:
+        con.execute("ALTER TABLE docs ADD COLUMN hash TEXT")
+    cols = {r[1] for r in con.execute("PRAGMA table_info(chunks)")}
+    if "vec_slot" not in cols:
+        con.execute("ALTER TABLE chunks ADD COLUMN vec_slot INTEGER")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_chunks_slot ON chunks(vec_slot)")
+    missing = con.execute(
+        "SELECT id, title, text FROM docs WHERE id NOT IN (SELECT DISTINCT doc_id FROM chunks)"
+    ).fetchall()
+    if missing:
+        rows = [{"id": rid, "title": title or "", "text": text or ""} for rid, title, text in missing]
+        _fts_write_passages(con.cursor(), rows)
+        log.info("[INDEX][MIGRATE] chunked %d legacy docs", len(missing))
+    con.execute("DROP TABLE IF EXISTS docs_fts")
+
+# ── Dense vectors (hybrid) ────────────────────────────────────────────────────
+
+_VEC: Optional[VectorStore] = None
+
+def _vec_store() -> Optional[VectorStore]:
+    """Vector file for the current DB (`<RETRIEVER_DB>.vec`); None if hybrid is off."""
+    global _VEC
+    if not (HYBRID and EMB_W > 0 and _SUPPORTS_FTS) or _FTS_DB_PATH == ":memory:":
+        return None
+    path = _FTS_DB_PATH + ".vec"
+    if _VEC is None or _VEC.path != path:
+        _VEC = VectorStore(path, EMB_DIM)
+    return _VEC
+
+def _vec_sync(con: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    Embed every passage that has no vector yet (new/changed docs, migrated DBs).
+    Slots freed by deleted passages are reused first and leftovers zeroed, so
+    the file only grows with the live passage count. A dim change or a lost
+    vector file rebuilds everything.
+    """
+    store = _vec_store()
+    if store is None:
+        return {"vectors": 0, "vec_ms": 0.0}
+    t0 = time.perf_counter()
+    with _LOCK:
+        dim = con.execute("SELECT value FROM meta WHERE key='vec_dim'").fetchone()
+        used = {s for (s,) in con.execute("SELECT vec_slot FROM chunks WHERE vec_slot IS NOT NULL")}
+        size = store.slots
+        if dim is None or int(dim[0]) != store.dim or (used and max(used) >= size):
+            store.reset()
+            con.execute("UPDATE chunks SET vec_slot=NULL")
+            con.execute("INSERT OR REPLACE INTO meta (key,value) VALUES ('vec_dim',?)", (str(store.dim),))
+            used, size = set(), 0
+        todo = con.execute(
+            "SELECT c.id, d.title, substr(d.text, c.span_start + 1, c.span_end - c.span_start) "
+            "FROM chunks c JOIN docs d ON d.id = c.doc_id WHERE c.vec_slot IS NULL"
+        ).fetchall()
+        free = [i for i in range(size - 1, -1, -1) if i not in used]  # pop() → lowest first
+        vecs, slots = [], []
+        for cid, title, passage in todo:
+            if free:
+                slot = free.pop()
+            else:
+                slot, size = size, size + 1
+            vecs.append((slot, _embed(_tokens(title or "") + _tokens(passage or ""), store.dim)))
+            slots.append((slot, cid))
+        try:
+            store.write(vecs)
+            store.zero(free)
+            con.executemany("UPDATE chunks SET vec_slot=? WHERE id=?", slots)
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+    return {"vectors": len(vecs), "vec_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+def _fts_write_passages(cur: sqlite3.Cursor, rows: List[Dict[str, Any]]) -> int:
+    """
+    (Re)write passage rows for the given docs with executemany.
+    Chunk ids are allocated up front so chunks and chunks_fts share rowids.
+    Caller owns the transaction. Returns the number of passages written.
+    """
+    ids = [(r["id"],) for r in rows]
+    cur.executemany("DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE doc_id=?)", ids)
+    cur.executemany("DELETE FROM chunks WHERE doc_id=?", ids)
+    next_id = int(cur.execute(
+        "SELECT MAX(COALESCE((SELECT MAX(id) FROM chunks), 0), "
+        "COALESCE((SELECT seq FROM sqlite_sequence WHERE name='chunks'), 0))"
+    ).fetchone()[0])
+    chunk_rows, fts_rows = [], []
+    for r in rows:
+        text = r.get("text") or ""
+        spans = r.get("spans")
+        if spans is None:
+            spans = _passages(text)
+        for i, (s, e) in enumerate(spans):
+            next_id += 1
+            chunk_rows.append((next_id, r["id"], i, s, e))
+            fts_rows.append((next_id, r.get("title") or "", text[s:e]))
+    cur.executemany(
+        "INSERT INTO chunks (id,doc_id,ord,span_start,span_end) VALUES (?,?,?,?,?)", chunk_rows
+    )
+    cur.executemany("INSERT INTO chunks_fts (rowid,title,text) VALUES (?,?,?)", fts_rows)
+    return len(chunk_rows)
+
+def _fts_write_batch(cur: sqlite3.Cursor, rows: List[Dict[str, Any]], deleted: Iterable[str] = ()) -> int:
+    """Upsert docs (+ their passages) and drop deleted doc ids. Caller owns the transaction."""
+    gone = [(d,) for d in deleted]
+    if gone:
+        cur.executemany("DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE doc_id=?)", gone)
+        cur.executemany("DELETE FROM chunks WHERE doc_id=?", gone)
+        cur.executemany("DELETE FROM docs WHERE id=?", gone)
+    if not rows:
+        return 0
+    cur.executemany(
+        "INSERT OR REPLACE INTO docs (id,title,series,ts,epoch,symbols,text,hash) VALUES (?,?,?,?,?,?,?,?)",
+        [(r["id"], r.get("title",""), r.get("series",""), float(r.get("ts") or 0.0), r.get("epoch"),
+          json.dumps(r.get("symbols") or [], ensure_ascii=False), r.get("text",""),
+          r.get("hash") or _content_hash((r.get("text") or "").encode("utf-8")))
+         for r in rows],
+    )
+    return _fts_write_passages(cur, rows)
+
 def _fts_insert_or_replace(row: Dict[str, Any]) -> None:
     con = _db()
     if con is None:
         return
     with _LOCK:
-        cur = con.cursor()
-        symbols = json.dumps(row.get("symbols") or [], ensure_ascii=False)
-        cur.execute(
-            "INSERT OR REPLACE INTO docs (id,title,series,ts,epoch,symbols,text) VALUES (?,?,?,?,?,?,?)",
-            (row["id"], row.get("title",""), row.get("series",""), float(row.get("ts") or 0.0),
-             row.get("epoch"), symbols, row.get("text",""))
-        )
-        # keep FTS contentless table in sync
-        cur.execute(
-            "INSERT OR REPLACE INTO docs_fts (rowid,id,title,series,text) "
-            "VALUES ((SELECT rowid FROM docs WHERE id=?),?,?,?,?)",
-            (row["id"], row["id"], row.get("title",""), row.get("series",""), row.get("text",""))
-        )
+        _fts_write_batch(con.cursor(), [row])
         con.commit()
 
+def _doc_id(p: Path) -> str:
+    rid = str(p.resolve())
+    # squash accidental duplicate segment we saw in logs
+    return rid.replace("/lore-scrolls/lore-scrolls/", "/lore-scrolls/")
+
+def _content_hash(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def _read_scroll(p: Path, rid: str, mtime: float, known_hash: Optional[str] = None,
+                 skip_parse: Iterable[str] = (), assume_same: bool = False) -> Dict[str, Any]:
+    """
+    Read + hash one scroll (runs on the index thread pool). Parsing/chunking is
+    skipped when there is nothing to re-tokenize: same bytes as the indexed row,
+    bytes of a doc that moved to this new path (hash in `skip_parse`), or `assume_same` (legacy
+    row without a hash whose mtime still matches — we only record the hash).
+    """
+    raw = p.read_bytes()
+    h = _content_hash(raw)
+    row: Dict[str, Any] = {
+        "id": rid, "hash": h, "ts": mtime, "series": _series_from_filename(p.name), "bytes": len(raw),
+    }
+    if assume_same or h == known_hash or h in skip_parse:
+        row["parsed"] = False
+        return row
+    text = raw.decode("utf-8", errors="ignore")
+    row.update({
+        "title": _first_heading(text),
+        "epoch": None,
+        "symbols": [],
+        "text": text,
+        "spans": _passages(text),
+        "parsed": True,
+    })
+    return row
+
+def _fts_sync(con: sqlite3.Connection, todo: List[Tuple[Path, str, float]], gone: set,
+              known: Dict[str, Tuple[float, Optional[str]]]) -> Dict[str, Any]:
+    """
+    Shared write path for folder and per-path indexing. `todo` holds files to
+    read/hash, `gone` vanished doc ids, `known` the prefetched id → (ts, hash):
+      - same hash, new mtime (git checkout, rsync)  → "touched": ts only
+      - new path carrying a vanished doc's hash     → "renamed": ids move, no re-tokenize
+      - vanished files                              → "deleted": rows dropped, manifest tombstoned
+      - everything else is (re)parsed as "added" / "updated"
+    Reads/hashes run on a thread pool (RETRIEVER_INDEX_WORKERS); all writes
+    land in a single transaction.
+    """
+    gone = set(gone)
+    gone_by_hash: Dict[str, str] = {}
+    for rid in sorted(gone):
+        h = known[rid][1]
+        if h:
+            gone_by_hash.setdefault(h, rid)
+
+    # read + hash (and parse if needed) in parallel
+    failed = read_bytes = 0
+    results: List[Tuple[Path, Dict[str, Any]]] = []
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, INDEX_WORKERS), thread_name_prefix="mv4-index") as ex:
+            futs = {}
+            for p, rid, mtime in todo:
+                ts, h = known.get(rid, (None, None))
+                legacy = h is None and ts is not None and abs(ts - float(mtime)) < 1e-6
+                # only a new path can be a rename target; a known one whose bytes changed is an update
+                moved_from = () if rid in known else gone_by_hash
+                futs[ex.submit(_read_scroll, p, rid, mtime, h, moved_from, legacy)] = p
+            for fut in as_completed(futs):
+                p = futs[fut]
+                try:
+                    results.append((p, fut.result()))
+                except Exception as e:
+                    failed += 1
+                    log.exception("[INDEX][FAIL] %s -> %s", p, e)
+
+    # classify
+    parsed: List[Dict[str, Any]] = []
+    touched: List[Dict[str, Any]] = []
+    renames: List[Tuple[str, Dict[str, Any]]] = []
+    added = updated = 0
+    for p, row in sorted(results, key=lambda x: x[1]["id"]):
+        read_bytes += row["bytes"]
+        if row["parsed"]:
+            if row["id"] in known:
+                updated += 1
+            else:
+                added += 1
+            parsed.append(row)
+            if len(parsed) <= 10:
+                log.info("[INDEX][ADD] %s", p)
+        elif row["id"] in known:
+            touched.append(row)
+        else:
+            src = gone_by_hash.pop(row["hash"], None)
+            if src is None:
+                # another new path already claimed this rename source; index it normally
+                row = _read_scroll(p, row["id"], row["ts"])
+                added += 1
+                parsed.append(row)
+                continue
+            gone.discard(src)
+            renames.append((src, row))
+            log.info("[INDEX][RENAME] %s -> %s", src, row["id"])
+    deleted = sorted(gone)
+
+    # single transaction for all writes (docs, passages, manifest)
+    now = _now_ts()
+    with _LOCK:
+        cur = con.cursor()
+        try:
+            chunks = _fts_write_batch(cur, parsed, deleted)
+            cur.executemany(
+                "UPDATE docs SET ts=?, hash=? WHERE id=?",
+                [(r["ts"], r["hash"], r["id"]) for r in touched],
+            )
+            for src, r in renames:
+                cur.execute("UPDATE docs SET id=?, series=?, ts=? WHERE id=?", (r["id"], r["series"], r["ts"], src))
+                cur.execute("UPDATE chunks SET doc_id=? WHERE doc_id=?", (r["id"], src))
+            cur.executemany(
+                "INSERT OR REPLACE INTO manifest (path,hash,size,mtime,indexed_at,deleted_at,renamed_to) "
+                "VALUES (?,?,?,?,?,NULL,NULL)",
+                [(r["id"], r["hash"], r["bytes"], r["ts"], now)
+                 for r in parsed + touched + [r for _, r in renames]],
+            )
+            cur.executemany(
+                "INSERT INTO manifest (path,hash,deleted_at,renamed_to) VALUES (?,?,?,?) "
+                "ON CONFLICT(path) DO UPDATE SET deleted_at=excluded.deleted_at, renamed_to=excluded.renamed_to",
+                [(rid, known[rid][1], now, None) for rid in deleted]
+                + [(src, r["hash"], now, r["id"]) for src, r in renames],
+            )
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        docs_total = con.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    vec = _vec_sync(con)
+    if parsed or renames or deleted or touched or vec["vectors"]:
+        _bump_generation()
+
+    return {
+        "added": added, "updated": updated, "renamed": len(renames), "deleted": len(deleted),
+        "touched": len(touched), "failed": failed, "chunks": chunks,
+        "read_bytes": read_bytes, "docs_total": int(docs_total), **vec,
+    }
+
 def _fts_load_folder(root: str, pattern: str = "*.md") -> int:
     """
-    Incremental loader:
-      - inserts/updates records whose mtime changed
-      - skips unchanged files (fast subsequent reindex)
-    Stores stats in _LAST_INDEX_STATS and returns the number of UPDATED/INSERTED docs.
+    Incremental bulk loader keyed on content hashes (BLAKE2b):
+      - prefetches the whole id → (ts, hash) map in one query
+      - files whose mtime matches are skipped without reading
+      - the rest (plus rows whose files under `root` vanished) go through _fts_sync
+    Stores stats (incl. files/s, MB/s) in _LAST_INDEX_STATS and returns the
+    number of UPDATED/INSERTED docs.
     """
     global _LAST_INDEX_STATS
     con = _db()
     if con is None:
         _LAST_INDEX_STATS = {
-            "added": 0, "skipped": 0, "failed": 0, "considered": 0,
+            "added": 0, "updated": 0, "renamed": 0, "deleted": 0, "touched": 0,
+            "skipped": 0, "failed": 0, "considered": 0,
             "duration_sec": 0.0, "root": root, "pattern": pattern, "fts": False,
         }
         return 0
 
     base = Path(root)
-    added = skipped = failed = considered = 0
+    skipped = failed = considered = 0
     t0 = time.perf_counter()
     log.info("[INDEX][START] base=%s pattern=%s", base, pattern)
 
     with _LOCK:
-        cur = con.cursor()
-        for p in base.rglob(pattern):
-            if not p.is_file():
+        known = {rid: (float(ts or 0.0), h) for rid, ts, h in con.execute("SELECT id, ts, hash FROM docs")}
+
+    # walk + stat; mtime match with a known hash → skip without reading
+    seen: set = set()
+    todo: List[Tuple[Path, str, float]] = []
+    for p in base.rglob(pattern):
+        if not p.is_file():
+            continue
+        considered += 1
+        try:
+            if p.suffix.lower() not in _INDEX_EXTS:
+                skipped += 1
                 continue
-            considered += 1
-            try:
-                if p.suffix.lower() not in {".md", ".markdown", ".txt"}:
-                    skipped += 1
-                    continue
+            mtime = p.stat().st_mtime
+            rid = _doc_id(p)
+            seen.add(rid)
+            ts, h = known.get(rid, (None, None))
+            if ts is not None and h and abs(ts - float(mtime)) < 1e-6:
+                skipped += 1
+                continue
+            todo.append((p, rid, mtime))
+        except Exception as e:
+            failed += 1
+            log.exception("[INDEX][FAIL] %s -> %s", p, e)
 
-                mtime = p.stat().st_mtime
-                rid = str(p.resolve())
-                # squash accidental duplicate segment we saw in logs
-                rid = rid.replace("/lore-scrolls/lore-scrolls/", "/lore-scrolls/")
+    # rows under root whose files are gone (rename sources or deletions)
+    prefix = str(base.resolve()).rstrip(os.sep) + os.sep
+    gone = {rid for rid in known if rid.startswith(prefix) and rid not in seen and not os.path.exists(rid)}
 
-                # skip if unchanged
-                cur.execute("SELECT ts FROM docs WHERE id=?", (rid,))
-                row = cur.fetchone()
-                if row and abs(float(row[0]) - float(mtime)) < 1e-6:
-                    skipped += 1
-                    continue
+    res = _fts_sync(con, todo, gone, known)
 
-                text = p.read_text(encoding="utf-8", errors="ignore")
-                row = {
-                    "id": rid,
-                    "title": _first_heading(text),
-                    "series": _series_from_filename(p.name),
-                    "ts": mtime,
-                    "epoch": None,
-                    "symbols": [],
-                    "text": text,
-                }
-                _fts_insert_or_replace(row)
-                added += 1
-                if added <= 10:
-                    log.info("[INDEX][ADD] %s", p)
-            except Exception as e:
-                failed += 1
-                log.exception("[INDEX][FAIL] %s -> %s", p, e)
-                continue
-
-    duration = round(time.perf_counter() - t0, 2)
+    skipped += res["touched"]
+    failed += res["failed"]
+    read_bytes = res["read_bytes"]
+    elapsed = time.perf_counter() - t0
+    duration = round(elapsed, 2)
     _LAST_INDEX_STATS = {
-        "added": added, "skipped": skipped, "failed": failed, "considered": considered,
+        "added": res["added"], "updated": res["updated"], "renamed": res["renamed"],
+        "deleted": res["deleted"], "touched": res["touched"],
+        "skipped": skipped, "failed": failed, "considered": considered,
+        "chunks": res["chunks"], "vectors": res["vectors"], "vec_ms": res["vec_ms"],
         "duration_sec": duration, "root": root, "pattern": pattern, "fts": True,
+        "read_mb": round(read_bytes / 1e6, 3),
+        "files_per_sec": round(considered / elapsed, 1) if elapsed > 0 else 0.0,
+        "mb_per_sec": round(read_bytes / 1e6 / elapsed, 2) if elapsed > 0 else 0.0,
     }
 
     print(
         f"[INDEX][SUMMARY] base={root} pattern={pattern} "
-        f"added={added} skipped={skipped} failed={failed} considered={considered} "
-        f"duration={duration}s"
+        f"added={res['added']} updated={res['updated']} renamed={res['renamed']} deleted={res['deleted']} "
+        f"skipped={skipped} failed={failed} considered={considered} "
+        f"duration={duration}s files/s={_LAST_INDEX_STATS['files_per_sec']} MB/s={_LAST_INDEX_STATS['mb_per_sec']}"
     )
-    try:
-        with sqlite3.connect(_FTS_DB_PATH) as con2:
-            docs_total = con2.execute("select count(*) from docs").fetchone()[0]
-        print(f"📚 Current index docs_total={docs_total}")
-    except Exception as e:
-        print("⚠️ could not count docs:", e)
+    print(f"📚 Current index docs_total={res['docs_total']}")
 
-    return added
+    return res["added"] + res["updated"]
 
-def _fts_search(terms: List[str], k: int) -> List[Dict[str, Any]]:
+def _fts_index_paths(paths: Iterable[str]) -> Dict[str, Any]:
+    """
+    Incremental update for an explicit set of changed paths (no tree walk).
+    Existing files are (re)indexed, missing ones tombstoned; a delete + create
+    pair with identical bytes in the same batch is treated as a rename.
+    """
     con = _db()
-    if con is None or not terms:
+    if con is None:
+        return {"fts": False, "paths": 0}
+    t0 = time.perf_counter()
+    todo: List[Tuple[Path, str, float]] = []
+    missing: List[str] = []
+    failed = 0
+    ids: List[str] = []
+    for raw in _uniq(str(x) for x in paths):
+        p = Path(raw)
+        if p.suffix.lower() not in _INDEX_EXTS:
+            continue
+        rid = _doc_id(p)
+        ids.append(rid)
+        try:
+            if p.is_file():
+                todo.append((p, rid, p.stat().st_mtime))
+            else:
+                missing.append(rid)
+        except OSError:
+            missing.append(rid)  # vanished between the event and the stat
+    if not ids:
+        return {"fts": True, "paths": 0}
+
+    with _LOCK:
+        known: Dict[str, Tuple[float, Optional[str]]] = {}
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            q = "SELECT id, ts, hash FROM docs WHERE id IN (%s)" % ",".join("?" * len(part))
+            known.update({rid: (float(ts or 0.0), h) for rid, ts, h in con.execute(q, part)})
+
+    # unchanged mtime with a known hash → nothing to do
+    todo = [t for t in todo
+            if not (t[1] in known and known[t[1]][1] and abs(known[t[1]][0] - float(t[2])) < 1e-6)]
+    gone = {rid for rid in missing if rid in known}
+
+    res = _fts_sync(con, todo, gone, known)
+    failed += res.pop("failed")
+    res.update({
+        "fts": True, "paths": len(ids), "failed": failed,
+        "duration_sec": round(time.perf_counter() - t0, 3),
+    })
+    log.info("[INDEX][PATHS] %s", res)
+    return res
+
+def _match_expr(terms: List[str]) -> str:
+    # Build MATCH query like: "toby" OR "proof" OR "time"
+    return " OR ".join([f'"{t}"' for t in terms])
+
+def _fts_search(terms: List[str], k: int) -> List[Dict[str, Any]]:
+    """
+    Passage-level search: best-scoring passage per doc, best docs first.
+    Phase 1 of a two-phase fetch: ids, span and scoring metadata only; the
+    passage text is pulled for the survivors by _fts_passages().
+    """
+    if not terms:
         return []
-    # Build MATCH query like: "toby OR proof OR time"
-    q = " OR ".join([f'"{t}"' for t in terms])
+    # `rank` is bm25() by default; MIN() with bare columns takes c.* from the best passage
     sql = """
-    SELECT d.id, d.title, d.series, d.ts, d.epoch, d.symbols, d.text,
-           bm25(docs_fts) AS bm25_score
-    FROM docs_fts
-    JOIN docs d ON d.rowid = docs_fts.rowid
-    WHERE docs_fts MATCH ?
+    SELECT c.doc_id, d.title, d.series, d.ts, d.epoch, d.symbols,
+           c.span_start, c.span_end, c.vec_slot, c.id,
+           MIN(h.bm25_score) AS bm25_score
+    FROM (
+        SELECT rowid AS cid, rank AS bm25_score
+        FROM chunks_fts
+        WHERE chunks_fts MATCH ?
+    ) h
+    JOIN chunks c ON c.id = h.cid
+    JOIN docs d ON d.id = c.doc_id
+    GROUP BY c.doc_id
     ORDER BY bm25_score ASC
     LIMIT ?
     """
-    with _LOCK:
+    with _reader() as con:
+        if con is None:
+            return []
         cur = con.cursor()
-        cur.execute(sql, (q, k * 4))  # fetch a bit extra before re-ranking
+        cur.execute(sql, (_match_expr(terms), k * 4))  # fetch a bit extra before re-ranking
         rows = cur.fetchall()
     out = []
-    for rid, title, series, ts, epoch, symbols, text, bm25_score in rows:
-        try:
-            syms = json.loads(symbols or "[]")
-        except Exception:
-            syms = []
+    for rid, title, series, ts, epoch, symbols, s, e, slot, cid, bm25_score in rows:
         out.append({
             "id": rid, "title": title, "series": (series or "").upper(),
-            "ts": float(ts or 0.0), "epoch": epoch, "symbols": syms,
-            "text": text, "bm25": float(bm25_score or 0.0),
+            "ts": float(ts or 0.0), "epoch": epoch, "symbols": symbols,  # raw JSON; see _symbols()
+            "span": (int(s), int(e)), "chunk": cid,
+            "bm25": float(bm25_score or 0.0), "slot": slot,
         })
     return out
 
-def _fts_get_by_id(doc_id: str) -> Optional[Dict[str, Any]]:
-    con = _db()
-    if con is None or not doc_id:
+def _fts_passages(chunk_ids: List[int]) -> Dict[int, str]:
+    """Phase 2 of the search fetch: passage text (substr of docs.text) for the given chunk ids."""
+    chunk_ids = [c for c in chunk_ids if c is not None]
+    if not chunk_ids:
+        return {}
+    sql = """
+    SELECT c.id, substr(d.text, c.span_start + 1, c.span_end - c.span_start)
+    FROM chunks c JOIN docs d ON d.id = c.doc_id
+    WHERE c.id IN (%s)
+    """ % ",".join("?" * len(chunk_ids))
+    with _reader() as con:
+        if con is None:
+            return {}
+        return {int(cid): passage or "" for cid, passage in con.execute(sql, chunk_ids)}
+
+def _dense_search(terms: List[str], cand: List[Dict[str, Any]], k: int) -> Tuple[Dict[int, float], List[Dict[str, Any]]]:
+    """
+    Dense stage of the hybrid search. Returns ({slot: cosine} for the FTS
+    candidates, extra passage rows found only by the vectors). With NumPy
+    this is a brute-force scan of the whole vector file; without it only the
+    FTS candidates are scored.
+    """
+    store = _vec_store()
+    if store is None or not terms:
+        return {}, []
+    qv = _embed(terms, store.dim)
+    hits = store.search(qv, k)
+    want = [r["slot"] for r in cand if r.get("slot") is not None]
+    scores: Dict[int, float] = dict(hits or [])
+    rest = [s for s in want if s not in scores]
+    if rest:
+        scores.update(store.score(qv, rest))
+    have = set(want)
+    extra_slots = [s for s, _ in (hits or []) if s not in have]
+    if not extra_slots:
+        return scores, []
+    sql = """
+    SELECT c.doc_id, d.title, d.series, d.ts, d.epoch, d.symbols,
+           c.span_start, c.span_end, c.vec_slot, c.id
+    FROM chunks c JOIN docs d ON d.id = c.doc_id
+    WHERE c.vec_slot IN (%s)
+    """ % ",".join("?" * len(extra_slots))
+    with _reader() as con:
+        rows = con.execute(sql, extra_slots).fetchall() if con is not None else []
+    extra = []
+    for rid, title, series, ts, epoch, symbols, s, e, slot, cid in rows:
+        extra.append({
+            "id": rid, "title": title, "series": (series or "").upper(),
+            "ts": float(ts or 0.0), "epoch": epoch, "symbols": symbols,
+            "span": (int(s), int(e)), "chunk": cid, "slot": slot,
+        })
+    return scores, extra
+
+def _hybrid_fuse(cand: List[Dict[str, Any]], dense: Dict[int, float],
+                 extra: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Weighted fusion: bm25 (negative, lower is better) is scaled to 0..1 by the
+    best candidate, cosine is clipped to 0..1, then
+    hybrid = (BM25_W*lex + EMB_W*cos) / (BM25_W + EMB_W).
+    """
+    wsum = (BM25_W + EMB_W) or 1.0
+    best = max((-r.get("bm25", 0.0) for r in cand), default=0.0)
+    out = []
+    for r in cand + extra:  # rows are fresh per search; annotate in place
+        lex = (-r["bm25"] / best) if best > 0 and "bm25" in r else 0.0
+        cos = max(0.0, dense.get(r.get("slot"), 0.0)) if r.get("slot") is not None else 0.0
+        r["hybrid"] = (BM25_W * max(0.0, lex) + EMB_W * cos) / wsum
+        out.append(r)
+    return out
+
+def _symbols(v: Any) -> List[Any]:
+    """Search rows carry docs.symbols as raw JSON; only final results get parsed."""
+    if isinstance(v, list):
+        return v
+    try:
+        return json.loads(v or "[]")
+    except Exception:
+        return []
+
+def _fts_get_by_id(doc_id: str, terms: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Fetch one doc with a single passage: best match for `terms` if any, else its first passage."""
+    if not doc_id:
         return None
-    with _LOCK:
+    with _reader() as con:
+        if con is None:
+            return None
         cur = con.cursor()
         row = cur.execute(
-            "SELECT id,title,series,ts,epoch,symbols,text FROM docs WHERE id=?", (doc_id,)
+            "SELECT id,title,series,ts,epoch,symbols FROM docs WHERE id=?", (doc_id,)
         ).fetchone()
-    if not row:
-        return None
-    rid, title, series, ts, epoch, symbols, text = row
+        if not row:
+            return None
+        span = None
+        if terms:
+            span = cur.execute(
+                """
+                SELECT c.span_start, c.span_end FROM chunks_fts
+                JOIN chunks c ON c.id = chunks_fts.rowid
+                WHERE chunks_fts MATCH ? AND c.doc_id = ?
+                ORDER BY bm25(chunks_fts) ASC LIMIT 1
+                """,
+                (_match_expr(terms), doc_id),
+            ).fetchone()
+        if not span:
+            span = cur.execute(
+                "SELECT span_start, span_end FROM chunks WHERE doc_id=? ORDER BY ord LIMIT 1", (doc_id,)
+            ).fetchone() or (0, 0)
+        s, e = int(span[0]), int(span[1])
+        passage = cur.execute(
+            "SELECT substr(text, ?, ?) FROM docs WHERE id=?", (s + 1, e - s, doc_id)
+        ).fetchone()[0]
+    rid, title, series, ts, epoch, symbols = row
     try:
         syms = json.loads(symbols or "[]")
     except Exception:
@@ -285,15 +1072,115 @@ def _fts_get_by_id(doc_id: str) -> Optional[Dict[str, Any]]:
     return {
         "id": rid, "title": title, "series": (series or "").upper(),
         "ts": float(ts or 0.0), "epoch": epoch, "symbols": syms,
-        "text": text,
+        "text": passage or "", "span": (s, e),
     }
 
 # ── In-memory lexical fallback (if FTS5 unavailable) ──────────────────────────
 
+_BM25_K1, _BM25_B = 1.2, 0.75  # FTS5 bm25() defaults
+
+class _InvertedIndex:
+    """
+    Passage-level inverted index mirroring the FTS5 layout: every passage of
+    every doc is a unit (title tokens count toward each, like chunks_fts rows).
+    Postings are term → (passage ids array('I'), weights array('d')) where the
+    weight is bm25's tf/length part, precomputed at build time, so a query is
+    just idf × weight accumulation (vectorized when NumPy is present).
+    Scoring matches FTS5's bm25 (k1=1.2, b=0.75).
+    """
+
+    def __init__(self):
+        self.docs: List[Dict[str, Any]] = []
+        self.post: Dict[str, Tuple[array, array]] = {}
+        self.p_doc = array("I")
+        self.p_start = array("I")
+        self.p_end = array("I")
+
+    def build(self, docs: List[Dict[str, Any]]) -> None:
+        self.docs = docs
+        raw: Dict[str, Tuple[array, array]] = {}
+        lens = array("I")
+        for di, d in enumerate(docs):
+            text = d["text"]
+            head = _tokens(d.get("title") or "")
+            for s, e in _passages(text):
+                toks = head + _tokens(text[s:e])
+                pid = len(self.p_doc)
+                self.p_doc.append(di); self.p_start.append(s); self.p_end.append(e)
+                lens.append(len(toks))
+                tf: Dict[str, int] = {}
+                for t in toks:
+                    tf[t] = tf.get(t, 0) + 1
+                for t, n in tf.items():
+                    ids = raw.get(t)
+                    if ids is None:
+                        ids = raw[t] = (array("I"), array("I"))
+                    ids[0].append(pid); ids[1].append(n)
+        avgdl = (sum(lens) / len(lens)) if lens else 1.0
+        k1, b = _BM25_K1, _BM25_B
+        for t, (ids, tfs) in raw.items():
+            self.post[t] = (ids, array("d", (
+                tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * lens[pid] / avgdl))
+                for pid, tf in zip(ids, tfs)
+            )))
+
+    @property
+    def passages(self) -> int:
+        return len(self.p_doc)
+
+    def _best_per_doc(self, terms: List[str], limit: int) -> List[Tuple[float, int]]:
+        """(score, passage id) of the `limit` best docs' best passages, best first (ties: doc order)."""
+        N = len(self.p_doc)
+        hits = []
+        for t in _uniq(terms):
+            hit = self.post.get(t)
+            if hit is None:
+                continue
+            idf = math.log((N - len(hit[0]) + 0.5) / (len(hit[0]) + 0.5))
+            hits.append((hit, idf if idf > 0.0 else 1e-6))
+        if not hits:
+            return []
+        if _np is not None:
+            acc = _np.zeros(N)
+            for (ids, w), idf in hits:
+                acc[_np.frombuffer(ids, dtype=_np.uint32)] += idf * _np.frombuffer(w, dtype=_np.float64)
+            pids = _np.flatnonzero(acc)
+            docs = _np.frombuffer(self.p_doc, dtype=_np.uint32)[pids]
+            order = _np.lexsort((-acc[pids], docs))           # by doc, best passage first
+            first = order[_np.r_[True, docs[order][1:] != docs[order][:-1]]]  # doc-ascending
+            first = first[_np.argsort(-acc[pids][first], kind="stable")][:limit]
+            return list(zip(acc[pids][first].tolist(), pids[first].tolist()))
+        acc: Dict[int, float] = {}
+        for (ids, w), idf in hits:
+            for pid, x in zip(ids, w):
+                acc[pid] = acc.get(pid, 0.0) + idf * x
+        best: Dict[int, Tuple[float, int]] = {}
+        for pid, sc in acc.items():
+            di = self.p_doc[pid]
+            if di not in best or sc > best[di][0] or (sc == best[di][0] and pid < best[di][1]):
+                best[di] = (sc, pid)
+        top = sorted(best.items(), key=lambda x: (-x[1][0], x[0]))[:limit]
+        return [v for _, v in top]
+
+    def search(self, terms: List[str], k: int) -> List[Dict[str, Any]]:
+        """Best passage per doc by bm25, best docs first; `bm25` is negated like FTS5's rank."""
+        out = []
+        for sc, pid in self._best_per_doc(terms, k * 4):
+            d = self.docs[self.p_doc[pid]]
+            s, e = self.p_start[pid], self.p_end[pid]
+            out.append({
+                "id": d["id"], "title": d["title"], "series": d["series"],
+                "ts": d["ts"], "epoch": d["epoch"], "symbols": d["symbols"],
+                "text": d["text"][s:e], "span": (s, e), "bm25": -sc,
+            })
+        return out
+
 _FALLBACK_INDEX: List[Dict[str, Any]] = []
+_FALLBACK_INV = _InvertedIndex()
 
 def _fallback_set_index(rows: List[Dict[str, Any]]) -> int:
-    global _FALLBACK_INDEX, _LAST_INDEX_STATS
+    global _FALLBACK_INDEX, _FALLBACK_INV, _LAST_INDEX_STATS
+    t0 = time.perf_counter()
     safe = []
     for r in rows:
         text = str(r.get("text",""))
@@ -309,31 +1196,29 @@ def _fallback_set_index(rows: List[Dict[str, Any]]) -> int:
             "symbols": r.get("symbols") or [],
             "text": text,
         })
-    _FALLBACK_INDEX = safe
+    inv = _InvertedIndex()
+    inv.build(safe)
+    _FALLBACK_INDEX, _FALLBACK_INV = safe, inv  # swap together; searches see old or new
+    _bump_generation()
     _LAST_INDEX_STATS = {
         "added": len(safe), "skipped": 0, "failed": 0, "considered": len(safe),
-        "duration_sec": 0.0, "root": None, "pattern": None, "fts": False,
+        "chunks": inv.passages, "terms": len(inv.post),
+        "duration_sec": round(time.perf_counter() - t0, 2), "root": None, "pattern": None, "fts": False,
     }
-    print(f"[INDEX][SUMMARY][FALLBACK] added={len(safe)}")
+    print(f"[INDEX][SUMMARY][FALLBACK] added={len(safe)} passages={inv.passages} terms={len(inv.post)}")
     return len(_FALLBACK_INDEX)
 
 def _fallback_search(terms: List[str], k: int) -> List[Dict[str, Any]]:
     if not terms:
         return _FALLBACK_INDEX[:k]
-    scored = []
-    for r in _FALLBACK_INDEX:
-        toks = _tokens(r.get("text",""))
-        score = sum(toks.count(t) for t in terms)
-        if score > 0:
-            scored.append((score, r))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [r for _, r in scored[:k*4]]
+    return _FALLBACK_INV.search(terms, k)
 
 # ── Public helpers ────────────────────────────────────────────────────────────
 
 def close_db() -> None:
-    """Close the FTS SQLite connection so reload/shutdown is clean."""
+    """Close the FTS SQLite connections (readers + writer) so reload/shutdown is clean."""
     global _DB
+    _POOL.close_all()
     try:
         if _DB is not None:
             with _LOCK:
@@ -342,6 +1227,19 @@ def close_db() -> None:
         pass
     finally:
         _DB = None
+        _bump_generation()  # a reopened DB may hold a different index
+
+def pool_stats() -> Dict[str, Any]:
+    """Reader pool utilization and lease wait times."""
+    return _POOL.stats()
+
+def cache_stats() -> Dict[str, Any]:
+    """multi_arc result cache size, hit ratio and the current index generation."""
+    return _CACHE.stats()
+
+def clear_cache() -> None:
+    """Drop cached multi_arc results (the index generation is left alone)."""
+    _CACHE.clear()
 
 def index_stats() -> Dict[str, Any]:
     """Return stats about the index (works for FTS and fallback)."""
@@ -349,20 +1247,31 @@ def index_stats() -> Dict[str, Any]:
         "fts": _SUPPORTS_FTS,
         "db": _FTS_DB_PATH,
         "docs": 0,
+        "chunks": 0,
         "indexing": indexing(),
         "last": dict(_LAST_INDEX_STATS) if _LAST_INDEX_STATS else None,
     }
     if _SUPPORTS_FTS:
-        con = _db()
-        if con is not None:
-            try:
-                with _LOCK:
+        try:
+            with _reader() as con:
+                if con is not None:
                     row = con.execute("SELECT COUNT(*) FROM docs").fetchone()
                     stats["docs"] = int(row[0]) if row else 0
-            except Exception:
-                pass
+                    row = con.execute("SELECT COUNT(*) FROM chunks").fetchone()
+                    stats["chunks"] = int(row[0]) if row else 0
+        except Exception:
+            pass
+        stats["pool"] = pool_stats()
     else:
         stats["docs"] = len(_FALLBACK_INDEX)
+        stats["chunks"] = _FALLBACK_INV.passages
+    stats["cache"] = cache_stats()
+    store = _vec_store()
+    stats["hybrid"] = {
+        "enabled": store is not None, "dim": store.dim if store else None,
+        "slots": store.slots if store else 0, "bm25_w": BM25_W, "emb_w": EMB_W,
+        "last_search_ms": dict(_LAST_SEARCH_STAGES),
+    }
     return stats
 
 def set_index(rows: List[Dict[str, Any]]) -> int:
@@ -372,6 +1281,7 @@ def set_index(rows: List[Dict[str, Any]]) -> int:
     """
     if _SUPPORTS_FTS:
         count = 0
+        batch: List[Dict[str, Any]] = []
         for r in rows:
             t = str(r.get("text",""))
             if not t.strip():
@@ -386,22 +1296,46 @@ def set_index(rows: List[Dict[str, Any]]) -> int:
                 "symbols": r.get("symbols") or [],
                 "text": t,
             }
-            _fts_insert_or_replace(row)
+            batch.append(row)
             count += 1
+        con = _db()
+        t0 = time.perf_counter()
+        with _LOCK:
+            try:
+                _fts_write_batch(con.cursor(), batch)
+                con.commit()
+            except Exception:
+                con.rollback()
+                raise
+        _vec_sync(con)
+        _bump_generation()
         global _LAST_INDEX_STATS
         _LAST_INDEX_STATS = {
-            "added": count, "skipped": 0, "failed": 0, "considered": count,
-            "duration_sec": 0.0, "root": None, "pattern": None, "fts": True,
+            "added": count, "skipped": 0, "failed": 0, "considered": count, "deleted": 0,
+            "duration_sec": round(time.perf_counter() - t0, 2), "root": None, "pattern": None, "fts": True,
         }
         return count
     else:
         return _fallback_set_index(rows)
 
+def index_paths(paths: Iterable[str]) -> Dict[str, Any]:
+    """
+    Incrementally (re)index just these file paths (used by the live watcher).
+    Skips (returns busy=True) while a folder reindex is running; FTS only.
+    Returns per-batch stats: added/updated/renamed/deleted/touched.
+    """
+    if _INDEXING:
+        return {"busy": True}
+    if not _SUPPORTS_FTS:
+        return {"fts": False, "paths": 0}
+    return _fts_index_paths(paths)
+
 def load_index_from_folder(root: str, pattern: str = "*.md") -> int:
     """
     (Re)load files from folder into the index.
     - If another indexing job is running, return 0 immediately (busy).
-    - FTS path is incremental (skips unchanged by mtime).
+    - FTS path is incremental (content-hash change detection; renames and
+      deletions are tracked, see _fts_load_folder).
     Returns the number of UPDATED/INSERTED docs (int) for backward-compat.
     Full stats are available via index_stats()['last'].
     """
@@ -423,7 +1357,7 @@ def load_index_from_folder(root: str, pattern: str = "*.md") -> int:
                     continue
                 considered += 1
                 try:
-                    if p.suffix.lower() not in {".md", ".markdown", ".txt"}:
+                    if p.suffix.lower() not in _INDEX_EXTS:
                         continue
                     text = p.read_text(encoding="utf-8", errors="ignore")
                 except Exception as e:
@@ -444,6 +1378,63 @@ def load_index_from_folder(root: str, pattern: str = "*.md") -> int:
     finally:
         _INDEXING = False
 
+# ── Re-ranking ────────────────────────────────────────────────────────────────
+
+def _base_score(r: Dict[str, Any], terms: List[str]) -> float:
+    """Per-row base in 0..1: fused hybrid score, else bm25 → 1/(1+bm25), else term overlap."""
+    if "hybrid" in r:
+        return r["hybrid"]
+    if "bm25" in r:
+        return 1.0 / (1.0 + max(0.0, r.get("bm25") or 0.0))
+    toks = _tokens(r.get("text",""))
+    overlap = sum(toks.count(t) for t in terms)
+    return min(1.0, 0.1 * overlap) if overlap > 0 else 0.0
+
+def _rerank(cand: List[Dict[str, Any]], terms: List[str], prefer_series: List[str],
+            series_boost: float, half: float) -> List[Tuple[int, float]]:
+    """
+    Blend base × (1 + series boost) × (1 + recency bonus) for every candidate
+    at once. Candidates become column arrays (base, series code, ts); with
+    NumPy the blend and the ordering are one vectorized pass, otherwise a
+    plain loop does the same math. Returns (candidate index, score) best-first
+    (stable on ties); rows with base <= 0 are dropped.
+    """
+    if not cand:
+        return []
+    # series code 0 = no preference; code i → boost/rank of its first mention
+    codes: Dict[str, int] = {}
+    table = [0.0]
+    for rank, wanted in enumerate(prefer_series, start=1):
+        if wanted not in codes:
+            codes[wanted] = len(table)
+            table.append(series_boost / rank)
+    base = [_base_score(r, terms) for r in cand]
+    scode = [codes.get((r.get("series") or "").upper(), 0) for r in cand]
+    ts = [float(r.get("ts") or 0.0) for r in cand]
+    now = _now_ts()
+
+    if _np is not None:
+        b = _np.asarray(base, dtype=_np.float64)
+        t = _np.asarray(ts, dtype=_np.float64)
+        score = b * (1.0 + _np.asarray(table)[_np.asarray(scode)])
+        if half > 0:
+            fresh = (t > 0.0) & (t < now)
+            score *= 1.0 + _np.where(fresh, 0.15 * _np.exp(-(now - t) / half), 0.0)  # up to +15%
+        keep = _np.flatnonzero(b > 0.0)
+        order = keep[_np.argsort(-score[keep], kind="stable")]
+        return list(zip(order.tolist(), score[order].tolist()))
+
+    out: List[Tuple[int, float]] = []
+    for i, b in enumerate(base):
+        if b <= 0.0:
+            continue
+        sc = b * (1.0 + table[scode[i]])
+        if half > 0 and 0.0 < ts[i] < now:
+            sc *= 1.0 + 0.15 * math.exp(-(now - ts[i]) / half)
+        out.append((i, sc))
+    out.sort(key=lambda x: x[1], reverse=True)
+    return out
+
 # ── Retriever ─────────────────────────────────────────────────────────────────
 
 @dataclass
@@ -460,8 +1451,9 @@ class Retriever:
 
     def multi_arc(self, query: str, hint: dict | None = None) -> List[Dict[str, Any]]:
         """
-        Returns ranked chunks:
+        Returns ranked chunks, best passage per doc:
         [{doc_id, span, ts, epoch, score, symbols, text}]
+        `span` is the passage's (start, end) char range in the source scroll.
         """
         q = (query or "").strip()
         hint = hint or {}
@@ -472,124 +1464,130 @@ class Retriever:
         prefer_series = [s.upper() for s in hint.get("prefer_series", [])]
         pins = hint.get("pins", [])
 
+        # the key has no raw query: only the (possibly empty) search result is cached,
+        # the echo fallback below is built from `q` on every call
+        key = (_INDEX_GEN, tuple(terms), tuple(prefer_series), depth, tuple(str(p) for p in pins))
+        out = _CACHE.get(key)
+        if out is None:
+            out = self._multi_arc(q, terms, depth, prefer_series, pins)
+            _CACHE.put(key, out)
+
+        # graceful fallback: if nothing found and we have a query, echo it
+        if not out and q:
+            snippet, span = _chunk_text(q)
+            out = [{
+                "doc_id": "SYNTH://echo",
+                "span": list(span),
+                "ts": 0.0,
+                "epoch": "E?",
+                "score": 0.5,
+                "symbols": ["🪞"],
+                "text": snippet,
+            }]
+        return out
+
+    def _multi_arc(self, q: str, terms: List[str], depth: str,
+                   prefer_series: List[str], pins: List[str]) -> List[Dict[str, Any]]:
         # Wider gather pool, then trim
         if depth == "deep":
             k_fetch = TOPK_RAW
         else:
             k_fetch = max(24, TOPK_RAW // 2)
 
-        # Search (FTS or fallback)
+        # Search (FTS or fallback), then the dense stage when hybrid is on
+        stages: Dict[str, float] = {}
+        t0 = time.perf_counter()
         cand = _fts_search(terms, k_fetch) if _SUPPORTS_FTS else _fallback_search(terms, k_fetch)
+        stages["fts_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        if _SUPPORTS_FTS and _vec_store() is not None:
+            t0 = time.perf_counter()
+            dense, extra = _dense_search(terms, cand, k_fetch)
+            stages["dense_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            t0 = time.perf_counter()
+            cand = _hybrid_fuse(cand, dense, extra)
+            stages["fuse_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        t_score = time.perf_counter()
 
         # Inject canon pins (guaranteed top presence if found)
         for pid in pins:
-            got = _fts_get_by_id(pid) if _SUPPORTS_FTS else None
+            got = _fts_get_by_id(pid, terms) if _SUPPORTS_FTS else None
             if got:
                 cand.insert(0, got)
 
-        now = _now_ts()
         half = self.k.recency_half_life_days * 86400.0
 
-        # Score blend (bm25 → 1/(1+bm25)), series boost, recency bonus
-        scored: List[Tuple[float, Dict[str, Any]]] = []
-        for r in cand:
-            # base from bm25 (lower better) → convert to 0..1
-            if "bm25" in r:
-                base = 1.0 / (1.0 + max(0.0, r.get("bm25") or 0.0))
-            else:
-                toks = _tokens(r.get("text",""))
-                overlap = sum(toks.count(t) for t in terms)
-                base = min(1.0, 0.1 * overlap) if overlap > 0 else 0.0
-            if base <= 0.0:
-                continue
-
-            # series boost
-            sboost = 0.0
-            sname = (r.get("series") or "").upper()
-            for rank, wanted in enumerate(prefer_series, start=1):
-                if sname == wanted:
-                    sboost = self.k.series_boost / rank
-                    break
-            base *= (1.0 + sboost)
-
-            # recency
-            ts = float(r.get("ts") or 0.0)
-            if ts > 0.0 and now > ts and half > 0:
-                age = now - ts
-                rec = 0.15 * math.exp(-age / half)  # up to +15%
-                base *= (1.0 + rec)
+        # Score blend (base, series boost, recency) in one pass, best first
+        ranked = _rerank(cand, terms, prefer_series, self.k.series_boost, half)
 
-            scored.append((base, r))
-
-        # Sort by score desc
-        scored.sort(key=lambda x: x[0], reverse=True)
-
-        # Deduplicate by doc id (preserve order)
-        seen, deduped = set(), []
-        for s, r in scored:
-            did = r.get("id")
+        # Deduplicate by doc id (keep best passage), gate on MIN_SCORE, cap;
+        # only (index, score) pairs are carried until the final rows
+        seen: set = set()
+        deduped = filtered = 0
+        final_docs: List[Tuple[Dict[str, Any], float]] = []
+        for i, sc in ranked:
+            did = cand[i].get("id")
             if not did or did in seen:
                 continue
             seen.add(did)
-            r = dict(r)
-            r["_norm_score"] = float(s)  # attach per-doc score for logging/output
-            deduped.append(r)
+            deduped += 1
+            if sc < MIN_SCORE:
+                continue
+            filtered += 1
+            if len(final_docs) < TOPK_FINAL:
+                final_docs.append((cand[i], sc))
 
-        # Filter by MIN_SCORE (on normalized score)
-        filtered = [r for r in deduped if r.get("_norm_score", 0.0) >= MIN_SCORE]
+        stages["score_ms"] = round((time.perf_counter() - t_score) * 1000, 2)
 
-        # Final cap
-        final_docs = filtered[:TOPK_FINAL]
+        # Phase 2: passage text only for the survivors
+        t0 = time.perf_counter()
+        texts = _fts_passages([r["chunk"] for r, _ in final_docs if "text" not in r and "chunk" in r])
+        stages["text_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        global _LAST_SEARCH_STAGES
+        _LAST_SEARCH_STAGES = dict(stages)
 
         # Build output chunks
         out: List[Dict[str, Any]] = []
-        for r in final_docs:
-            snippet, span = _chunk_text(r.get("text",""))
+        for r, sc in final_docs:
+            if "chunk" in r and "text" not in r:
+                snippet, span = texts.get(r["chunk"], ""), r["span"]
+            elif "span" in r:
+                snippet, span = r.get("text",""), r["span"]
+            else:
+                snippet, span = _best_passage(r.get("text",""), terms)
             out.append({
                 "doc_id": r.get("id"),
                 "span": list(span),
                 "ts": r.get("ts"),
                 "epoch": r.get("epoch"),
-                "score": round(float(r.get("_norm_score", 0.0)), 3),
-                "symbols": r.get("symbols") or [],
+                "score": round(float(sc), 3),
+                "symbols": _symbols(r.get("symbols")),
                 "text": snippet,
             })
 
-        # Console debug
+        # Console debug (sampled / levelled by the log sink; skip building it when unwanted)
         try:
-            print(json.dumps({
-                "evt": "retriever.debug",
-                "q": q[:120],
-                "pins": pins,
-                "raw": len(cand),
-                "deduped": len(deduped),
-                "filtered": len(filtered),
-                "final": len(out),
-                "top_preview": [{
-                    "id": (r.get("id") or "")[:72],
-                    "title": (r.get("title") or "")[:60],
-                    "score": round(float(r.get("_norm_score", 0.0)), 3)
-                } for r in final_docs[:10]],
-            }, ensure_ascii=False))
+            if log_sink.wants("retriever.debug"):
+                log_sink.write("retriever.debug", {
+                    "q": q[:120],
+                    "pins": pins,
+                    "raw": len(cand),
+                    "deduped": deduped,
+                    "filtered": filtered,
+                    "final": len(out),
+                    "stages": stages,
+                    "top_preview": [{
+                        "id": (r.get("id") or "")[:72],
+                        "title": (r.get("title") or "")[:60],
+                        "score": round(float(sc), 3)
+                    } for r, sc in final_docs[:10]],
+                })
         except Exception:
             pass
-
-        # graceful fallback: if nothing found and we have a query, echo it
-        if not out and q:
-            snippet, span = _chunk_text(q)
-            out = [{
-                "doc_id": "SYNTH://echo",
-                "span": list(span),
-                "ts": 0.0,
-                "epoch": "E?",
-                "score": 0.5,
-                "symbols": ["🪞"],
-                "text": snippet,
-            }]
         return out
 
 # explicit exports so reloaders / hasattr see them
 __all__ = [
-    "indexing", "index_stats", "set_index", "load_index_from_folder", "close_db",
+    "indexing", "index_stats", "pool_stats", "cache_stats", "clear_cache", "index_generation",
+    "set_index", "load_index_from_folder", "index_paths", "close_db",
     "Retriever"
 ]
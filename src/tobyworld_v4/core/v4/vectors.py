@@ -0,0 +1,169 @@
+from __future__ import annotations
+# Dense side of the hybrid retriever: hashed n-gram embeddings + a flat
+# float32 vector file (one row per passage slot) next to the FTS DB.
+#
+# - embed(): feature hashing over word unigrams/bigrams and char trigrams of
+#   longer words; crc32 keeps vectors stable across processes (no PYTHONHASHSEED).
+# - VectorStore: rows are addressed by slot (chunks.vec_slot). Writes are
+#   positional (pwrite), so an incremental reindex only touches new passages.
+# - NumPy is optional: with it, search() is a brute-force memmap dot product
+#   over all rows; without it, search() returns None and callers only score
+#   their FTS candidates via score().
+#
+# Env:
+#   RETRIEVER_EMB_DIM=512
+
+import os, math, zlib, threading
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # optional
+except ImportError:
+    np = None
+
+EMB_DIM = int(os.getenv("RETRIEVER_EMB_DIM", "512"))
+
+_F32 = 4
+
+
+@lru_cache(maxsize=1 << 17)
+def _feat(f: str, dim: int) -> Tuple[int, float]:
+    h = zlib.crc32(f.encode("utf-8"))
+    return h % dim, (1.0 if (h >> 20) & 1 else -1.0)
+
+
+@lru_cache(maxsize=1 << 15)
+def _word_feats(t: str, dim: int) -> Tuple[Tuple[int, float], ...]:
+    """Unigram (weight 1) + char trigrams of longer words (0.25 each)."""
+    i, s = _feat(t, dim)
+    out = [(i, s)]
+    if len(t) >= 6:
+        w = "<" + t + ">"
+        for j in range(len(w) - 2):
+            i, s = _feat(w[j:j + 3], dim)
+            out.append((i, 0.25 * s))
+    return tuple(out)
+
+
+def embed(tokens: Sequence[str], dim: int = EMB_DIM) -> List[float]:
+    """L2-normalized hashed feature vector for a token list (all zeros if empty)."""
+    vec = [0.0] * dim
+    prev = None
+    for t in tokens:
+        for i, s in _word_feats(t, dim):
+            vec[i] += s
+        if prev is not None:
+            i, s = _feat(prev + " " + t, dim)
+            vec[i] += 0.5 * s
+        prev = t
+    norm = math.hypot(*vec)
+    if norm > 0:
+        vec = [x / norm for x in vec]
+    return vec
+
+
+class VectorStore:
+    """Flat float32 matrix file: row `slot` lives at byte slot*dim*4."""
+
+    def __init__(self, path: str, dim: int = EMB_DIM):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * _F32
+        self._lock = threading.Lock()
+        self._mm = None          # cached np.memmap
+        self._mm_size = -1
+
+    # ---- shape ----
+    @property
+    def slots(self) -> int:
+        try:
+            return os.path.getsize(self.path) // self.row_bytes
+        except OSError:
+            return 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._mm = None
+            self._mm_size = -1
+            with open(self.path, "wb"):
+                pass
+
+    # ---- writes (caller serializes) ----
+    def write(self, rows: Iterable[Tuple[int, Sequence[float]]]) -> int:
+        return self._pwrite((slot, array("f", vec).tobytes()) for slot, vec in rows)
+
+    def zero(self, slots: Iterable[int]) -> int:
+        blank = bytes(self.row_bytes)
+        return self._pwrite((slot, blank) for slot in slots)
+
+    def _pwrite(self, rows: Iterable[Tuple[int, bytes]]) -> int:
+        n = 0
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            for slot, raw in rows:
+                os.pwrite(fd, raw, slot * self.row_bytes)
+                n += 1
+        finally:
+            os.close(fd)
+        return n
+
+    # ---- reads ----
+    def rows(self, slots: Iterable[int]) -> Dict[int, List[float]]:
+        """Read selected rows (pure Python path)."""
+        out: Dict[int, List[float]] = {}
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return out
+        try:
+            for slot in slots:
+                raw = os.pread(fd, self.row_bytes, slot * self.row_bytes)
+                if len(raw) == self.row_bytes:
+                    a = array("f")
+                    a.frombytes(raw)
+                    out[slot] = a.tolist()
+        finally:
+            os.close(fd)
+        return out
+
+    def _matrix(self):
+        size = self.slots
+        with self._lock:
+            if self._mm is None or self._mm_size != size:
+                self._mm = (np.memmap(self.path, dtype=np.float32, mode="r", shape=(size, self.dim))
+                            if size else None)
+                self._mm_size = size
+            return self._mm
+
+    def score(self, qvec: Sequence[float], slots: Sequence[int]) -> Dict[int, float]:
+        """Cosine of `qvec` against the given rows (NumPy gather, else sparse dot)."""
+        slots = [s for s in slots if s is not None]
+        if not slots:
+            return {}
+        if np is not None:
+            m = self._matrix()
+            if m is None:
+                return {}
+            ok = [s for s in slots if s < m.shape[0]]
+            sc = m[ok] @ np.asarray(qvec, dtype=np.float32) if ok else []
+            return {s: float(v) for s, v in zip(ok, sc)}
+        nz = [(i, x) for i, x in enumerate(qvec) if x]
+        return {s: sum(v[i] * x for i, x in nz) for s, v in self.rows(slots).items()}
+
+    def search(self, qvec: Sequence[float], k: int) -> Optional[List[Tuple[int, float]]]:
+        """Brute-force top-k (slot, cosine) over all rows; None when NumPy is missing."""
+        if np is None:
+            return None
+        m = self._matrix()
+        if m is None or k <= 0:
+            return []
+        scores = m @ np.asarray(qvec, dtype=np.float32)
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0.0]
+
+
+__all__ = ["EMB_DIM", "embed", "VectorStore"]
@@ -0,0 +1,263 @@
+from __future__ import annotations
+# Live scroll indexing: watch SCROLLS_DIR and feed changed paths to the retriever.
+#
+# Backends:
+#   - inotify (Linux, optional `inotify_simple`): recursive directory watches
+#   - poll: periodic stat() snapshot diff (portable fallback)
+# Events are coalesced per path and flushed after SCROLLS_WATCH_DEBOUNCE seconds
+# of quiet (or SCROLLS_WATCH_MAX_DELAY since the first pending event), so an
+# editor save or a `git pull` becomes one retr.index_paths() batch.
+#
+# Env:
+#   SCROLLS_WATCH=off|auto|inotify|poll   (default off)
+#   SCROLLS_WATCH_DEBOUNCE=1.0
+#   SCROLLS_WATCH_MAX_DELAY=10
+#   SCROLLS_WATCH_POLL=2.0
+
+import os, time, threading, logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import retriever as retr
+
+try:
+    import inotify_simple as _inotify  # type: ignore
+except Exception:
+    _inotify = None
+
+log = logging.getLogger(__name__)
+
+WATCH_MODE = os.getenv("SCROLLS_WATCH", "off").strip().lower()
+WATCH_DEBOUNCE = float(os.getenv("SCROLLS_WATCH_DEBOUNCE", "1.0"))
+WATCH_MAX_DELAY = float(os.getenv("SCROLLS_WATCH_MAX_DELAY", "10"))
+WATCH_POLL = float(os.getenv("SCROLLS_WATCH_POLL", "2.0"))
+
+
+def _wanted(path: str) -> bool:
+    return Path(path).suffix.lower() in retr._INDEX_EXTS
+
+
+class ScrollWatcher:
+    """
+    Background thread that keeps the FTS index in sync with `root`.
+    `lock` is the server's index lock: while a full reindex holds it,
+    pending paths stay queued and are retried on the next tick.
+    """
+
+    def __init__(self, root: str, mode: str = WATCH_MODE, lock: Optional[threading.Lock] = None,
+                 debounce: float = WATCH_DEBOUNCE, max_delay: float = WATCH_MAX_DELAY,
+                 poll: float = WATCH_POLL):
+        self.root = str(root)
+        self.lock = lock
+        self.debounce = max(0.0, debounce)
+        self.max_delay = max(self.debounce, max_delay)
+        self.poll = max(0.1, poll)
+        if mode in ("auto", "on", "1", "true"):
+            mode = "inotify" if _inotify is not None else "poll"
+        if mode == "inotify" and _inotify is None:
+            log.warning("[WATCH] inotify_simple not installed; falling back to polling")
+            mode = "poll"
+        self.backend = mode
+        self._pending: Dict[str, float] = {}   # path -> first seen
+        self._inflight: Dict[str, float] = {}  # batch being indexed (swapped out of _pending)
+        self._last_event = 0.0
+        self._fails = 0
+        self._retry_at = 0.0
+        self._plock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snap: Dict[str, tuple] = {}
+        self._ino = None
+        self._wd: Dict[int, str] = {}
+        self.events = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_batch: Dict[str, Any] = {}
+
+    # ---- lifecycle ----
+    def start(self) -> bool:
+        if self.backend not in ("inotify", "poll") or self._thread is not None:
+            return False
+        if not os.path.isdir(self.root):
+            log.warning("[WATCH] root %s missing; watcher not started", self.root)
+            return False
+        if self.backend == "inotify":
+            self._ino = _inotify.INotify()
+            self._add_tree(self.root)
+        else:
+            self._snap = self._snapshot()
+        self._thread = threading.Thread(target=self._run, name="mv4-scroll-watch", daemon=True)
+        self._thread.start()
+        log.info("[WATCH] started backend=%s root=%s", self.backend, self.root)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._ino is not None:
+            try:
+                self._ino.close()
+            except Exception:
+                pass
+            self._ino = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        with self._plock:
+            waiting = list(self._pending.values()) + list(self._inflight.values())
+        depth = len(waiting)
+        oldest = min(waiting) if waiting else None
+        return {
+            "backend": self.backend,
+            "running": self.running,
+            "root": self.root,
+            "queue_depth": depth,
+            "lag_sec": round(time.time() - oldest, 3) if oldest else 0.0,
+            "events": self.events,
+            "batches": self.batches,
+            "errors": self.errors,
+            "last_batch": self.last_batch,
+        }
+
+    # ---- event intake ----
+    def notify(self, path: str) -> None:
+        if not _wanted(path):
+            return
+        now = time.time()
+        with self._plock:
+            self._pending.setdefault(os.path.abspath(path), now)
+            self._last_event = now
+            self.events += 1
+
+    # ---- inotify backend ----
+    def _add_tree(self, top: str) -> None:
+        f = _inotify.flags
+        mask = (f.CLOSE_WRITE | f.MOVED_TO | f.MOVED_FROM | f.DELETE | f.CREATE
+                | f.DELETE_SELF | f.MOVE_SELF)
+        for d, dirs, _ in os.walk(top):
+            dirs[:] = [x for x in dirs if not x.startswith(".")]
+            try:
+                self._wd[self._ino.add_watch(d, mask)] = d
+            except OSError as e:
+                self.errors += 1
+                log.warning("[WATCH] add_watch %s failed: %s", d, e)
+
+    def _read_inotify(self, timeout: float) -> None:
+        f = _inotify.flags
+        for ev in self._ino.read(timeout=int(timeout * 1000)):
+            base = self._wd.get(ev.wd)
+            if base is None or not ev.name:
+                continue
+            path = os.path.join(base, ev.name)
+            if ev.mask & f.ISDIR:
+                if ev.mask & (f.CREATE | f.MOVED_TO):
+                    # new/moved-in directory: watch it and pick up whatever it already holds
+                    self._add_tree(path)
+                    for d, _, files in os.walk(path):
+                        for name in files:
+                            self.notify(os.path.join(d, name))
+                continue
+            self.notify(path)
+
+    # ---- poll backend ----
+    def _snapshot(self) -> Dict[str, tuple]:
+        snap: Dict[str, tuple] = {}
+        for d, dirs, files in os.walk(self.root):
+            dirs[:] = [x for x in dirs if not x.startswith(".")]
+            for name in files:
+                p = os.path.join(d, name)
+                if not _wanted(p):
+                    continue
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                snap[p] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def _read_poll(self) -> None:
+        cur = self._snapshot()
+        old = self._snap
+        for p, sig in cur.items():
+            if old.get(p) != sig:
+                self.notify(p)
+        for p in old.keys() - cur.keys():
+            self.notify(p)
+        self._snap = cur
+
+    # ---- flush ----
+    def _due(self) -> Optional[Dict[str, float]]:
+        """Swap the pending batch out once it has settled; events arriving during the flush start a new one."""
+        now = time.time()
+        with self._plock:
+            if not self._pending or now < self._retry_at:
+                return None
+            oldest = min(self._pending.values())
+            if now - self._last_event < self.debounce and now - oldest < self.max_delay:
+                return None
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+            return batch
+
+    def _requeue(self, batch: Dict[str, float], backoff: bool) -> None:
+        with self._plock:
+            for p, first in batch.items():
+                self._pending[p] = min(first, self._pending.get(p, first))
+            self._inflight = {}
+            if backoff:
+                self._fails += 1
+                self._retry_at = time.time() + min(self.max_delay, max(self.debounce, 0.5) * 2 ** (self._fails - 1))
+
+    def _flush(self, batch: Dict[str, float]) -> None:
+        if self.lock is not None and not self.lock.acquire(blocking=False):
+            self._requeue(batch, backoff=False)  # full reindex running; retry next tick
+            return
+        paths = list(batch)
+        try:
+            res = retr.index_paths(paths)
+        except Exception as e:
+            self.errors += 1
+            log.exception("[WATCH] index_paths failed (%d paths requeued): %s", len(paths), e)
+            self._requeue(batch, backoff=True)
+            return
+        finally:
+            if self.lock is not None:
+                self.lock.release()
+        if res.get("busy"):
+            self._requeue(batch, backoff=False)
+            return
+        with self._plock:
+            self._inflight = {}
+            self._fails = 0
+            self._retry_at = 0.0
+        self.batches += 1
+        self.last_batch = {"ts": time.time(), "paths": len(paths), **res}
+
+    def _run(self) -> None:
+        tick = min(self.poll, max(0.1, self.debounce / 2 or 0.1))
+        next_poll = 0.0
+        while not self._stop.is_set():
+            try:
+                if self.backend == "inotify":
+                    self._read_inotify(tick)
+                else:
+                    now = time.time()
+                    if now >= next_poll:
+                        self._read_poll()
+                        next_poll = now + self.poll
+                    self._stop.wait(tick)
+                due = self._due()
+                if due:
+                    self._flush(due)
+            except Exception as e:
+                self.errors += 1
+                log.exception("[WATCH] loop error: %s", e)
+                self._stop.wait(1.0)
+
+
+__all__ = ["ScrollWatcher", "WATCH_MODE"]
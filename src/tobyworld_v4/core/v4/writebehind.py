@@ -0,0 +1,226 @@
+from __future__ import annotations
+# Write-behind queue for post-response persistence (memory stats, ledger,
+# learning, Memori, conversation history).
+#
+# /ask enqueues closures here instead of awaiting each SQLite write; a single
+# daemon thread drains them in batches (up to WRITE_BEHIND_BATCH jobs, waiting
+# at most WRITE_BEHIND_LINGER_MS for a batch to fill) and runs them in FIFO
+# order, so per-traveler writes keep their request order.
+#
+# Jobs named in `tx_jobs` write through `db` (a dbconn.SharedDB): consecutive
+# ones in a batch share one BEGIN IMMEDIATE … COMMIT on the worker's
+# connection (their own transaction() blocks nest into it), each inside a
+# SAVEPOINT so a failing job only rolls back its own writes. Jobs that open
+# other connections to the same file must not be listed: they would wait on
+# the batch's write lock.
+#
+# Backpressure: the queue is bounded. submit() never blocks the event loop;
+# when the queue is full it returns False and the caller runs the job itself
+# (the old synchronous behaviour), which slows that request instead of
+# dropping data. stop() drains everything still queued.
+#
+# Env:
+#   WRITE_BEHIND=1                 (0 = run writes inline, as before)
+#   WRITE_BEHIND_QUEUE=1000
+#   WRITE_BEHIND_BATCH=32
+#   WRITE_BEHIND_LINGER_MS=20
+
+import os, time, queue, threading, logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .dbconn import SharedDB
+
+try:
+    from .metrics import (
+        mv4_write_behind_queue_depth, mv4_write_behind_jobs_total,
+        mv4_write_behind_lag_seconds, mv4_write_behind_batch_size,
+    )
+except Exception:  # pragma: no cover
+    class _DummyMetric:
+        def labels(self, *a, **k): return self
+        def inc(self, *a, **k): pass
+        def set(self, *a, **k): pass
+        def observe(self, *a, **k): pass
+    mv4_write_behind_queue_depth = mv4_write_behind_jobs_total = _DummyMetric()
+    mv4_write_behind_lag_seconds = mv4_write_behind_batch_size = _DummyMetric()
+
+log = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "1").strip().lower() not in ("0", "false", "no", "off")
+WB_QUEUE_MAX = int(os.getenv("WRITE_BEHIND_QUEUE", "1000"))
+WB_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "32"))
+WB_LINGER_MS = float(os.getenv("WRITE_BEHIND_LINGER_MS", "20"))
+
+_Job = Tuple[str, Callable[..., Any], tuple, dict, float]
+_STOP = object()
+
+
+class WriteBehind:
+    """Bounded FIFO of persistence jobs with one background worker."""
+
+    def __init__(self, maxsize: int = WB_QUEUE_MAX, batch: int = WB_BATCH,
+                 linger_ms: float = WB_LINGER_MS, name: str = "mv4-write-behind",
+                 db: Optional[SharedDB] = None, tx_jobs: Iterable[str] = ()):
+        self.batch = max(1, batch)
+        self.linger = max(0.0, linger_ms) / 1000.0
+        self.name = name
+        self.db = db
+        self.tx_jobs = frozenset(tx_jobs) if db is not None else frozenset()
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.done = 0
+        self.errors = 0
+        self.rejected = 0
+        self.batches = 0
+        self.commits = 0  # shared transactions committed for tx_jobs
+        self.last_error: Optional[str] = None
+
+    # ---- lifecycle ----
+    def start(self) -> bool:
+        if self._thread is not None:
+            return False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Drain queued jobs, then stop the worker (blocks up to `timeout`)."""
+        t = self._thread
+        if t is None:
+            return
+        self._closing = True  # jobs submitted while draining (e.g. by other writers) run inline
+        self._q.put(_STOP)  # blocking put: the sentinel queues behind pending jobs
+        t.join(timeout)
+        if t.is_alive():
+            log.warning("[WB] drain timed out with %d jobs pending", self._q.qsize())
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ---- intake ----
+    def submit(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> bool:
+        """Queue fn(*args, **kwargs). False if not running, stopping or full (caller should run it)."""
+        if self._closing or not self.running:
+            return False
+        try:
+            self._q.put_nowait((name, fn, args, kwargs, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            mv4_write_behind_jobs_total.labels(job=name, result="rejected").inc()
+            return False
+        with self._lock:
+            self.enqueued += 1
+        mv4_write_behind_queue_depth.set(self._q.qsize())
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": WRITE_BEHIND,
+                "running": self.running,
+                "queue_depth": self._q.qsize(),
+                "queue_max": self._q.maxsize,
+                "enqueued": self.enqueued,
+                "done": self.done,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "commits": self.commits,
+                "last_error": self.last_error,
+            }
+
+    # ---- worker ----
+    def _take(self) -> Tuple[List[_Job], bool]:
+        first = self._q.get()
+        if first is _STOP:
+            return [], True
+        jobs = [first]
+        deadline = time.perf_counter() + self.linger
+        while len(jobs) < self.batch:
+            wait = deadline - time.perf_counter()
+            try:
+                item = self._q.get(timeout=wait) if wait > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return jobs, True
+            jobs.append(item)
+        return jobs, False
+
+    @staticmethod
+    def _call(job: _Job) -> Optional[Exception]:
+        name, fn, args, kwargs, _ = job
+        try:
+            fn(*args, **kwargs)
+            return None
+        except Exception as e:
+            return e
+
+    def _finish(self, job: _Job, err: Optional[Exception]) -> None:
+        name, _, _, _, t_enq = job
+        if err is not None:
+            with self._lock:
+                self.errors += 1
+                self.last_error = f"{name}: {err}"
+            log.error("[WB] job %s failed: %s", name, err, exc_info=err)
+        mv4_write_behind_jobs_total.labels(job=name, result="error" if err else "ok").inc()
+        mv4_write_behind_lag_seconds.observe(time.perf_counter() - t_enq)
+
+    def _run_tx(self, jobs: List[_Job]) -> None:
+        """Run `jobs` in one transaction on self.db, a savepoint each."""
+        if len(jobs) == 1:
+            self._finish(jobs[0], self._call(jobs[0]))
+            return
+        errs: List[Optional[Exception]] = []
+        try:
+            with self.db.transaction(immediate=True) as con:
+                for job in jobs:
+                    con.execute("SAVEPOINT wb_job")
+                    err = self._call(job)
+                    if err is not None:
+                        con.execute("ROLLBACK TO wb_job")
+                    con.execute("RELEASE wb_job")
+                    errs.append(err)
+        except Exception as e:
+            # BEGIN/COMMIT failed (or a job broke the transaction): nothing was kept,
+            # so give every job its own transaction, as without batching
+            log.warning("[WB] shared transaction for %d jobs failed (%s); running them one by one", len(jobs), e)
+            errs = [self._call(job) for job in jobs]
+        else:
+            with self._lock:
+                self.commits += 1
+        for job, err in zip(jobs, errs):
+            self._finish(job, err)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            jobs, stop = self._take()
+            if not jobs:
+                continue
+            mv4_write_behind_batch_size.observe(len(jobs))
+            tx: List[_Job] = []
+            for job in jobs:
+                if job[0] in self.tx_jobs:
+                    tx.append(job)
+                    continue
+                if tx:
+                    self._run_tx(tx)
+                    tx = []
+                self._finish(job, self._call(job))
+            if tx:
+                self._run_tx(tx)
+            with self._lock:
+                self.done += len(jobs)
+                self.batches += 1
+            mv4_write_behind_queue_depth.set(self._q.qsize())
+
+
+__all__ = ["WriteBehind", "WRITE_BEHIND"]
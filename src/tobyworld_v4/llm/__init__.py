@@ -1,3 +1,3 @@
-from .client import LLMClient
+from .client import LLMClient, AsyncLLMClient
 
-__all__ = ["LLMClient"]
+__all__ = ["LLMClient", "AsyncLLMClient"]
@@ -1,12 +1,25 @@
-import os, time, json
-from typing import List, Dict, Optional
+import os, time, json, importlib.util
+from typing import AsyncIterator, List, Dict, Optional
+
+from tobyworld_v4.core.v4.logsink import jlog
 
 try:
     import httpx
 except Exception:
     httpx = None
 
-class LLMClient:
+# httpx only negotiates HTTP/2 when the `h2` package is installed
+_HAS_H2 = importlib.util.find_spec("h2") is not None
+
+# Connection pool for AsyncLLMClient (one shared httpx.AsyncClient per process)
+LLM_POOL_MAX = int(os.getenv("LLM_POOL_MAX", "32"))
+LLM_POOL_KEEPALIVE = int(os.getenv("LLM_POOL_KEEPALIVE", "16"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto").strip().lower()  # auto | 1 | 0
+
+class _LLMBase:
+    """Endpoint config, payloads and response parsing shared by the sync and async clients."""
+
     def __init__(self):
         self.enabled = os.getenv("MIRROR_LLM_ENABLED", "1") not in ("0","false","False")
         self.base = os.getenv("LLM_BASE_URL", "").rstrip("/")
@@ -39,10 +52,46 @@ class LLMClient:
         except Exception:
             return None
 
+    def _payload(self, kwargs: dict, **fields) -> dict:
+        payload = {"model": self.model, **fields}
+        payload.update(kwargs)
+        return payload
+
+    @staticmethod
+    def _chatml(messages: List[Dict[str,str]]) -> str:
+        # ChatML-style prompt for the /completions fallback
+        chatml = []
+        for m in messages:
+            role = m.get("role","user")
+            content = m.get("content","")
+            if role == "system":
+                chatml.append(f"<|system|>\n{content}\n")
+            elif role == "assistant":
+                chatml.append(f"<|assistant|>\n{content}\n")
+            else:
+                chatml.append(f"<|user|>\n{content}\n")
+        chatml.append("<|assistant|>\n")
+        return "".join(chatml)
+
+    @staticmethod
+    def _stream_delta(line: str) -> Optional[str]:
+        """Content from one OpenAI SSE line; "" to skip, None at [DONE]."""
+        if not line.startswith("data:"):
+            return ""
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return None
+        try:
+            choice = (json.loads(data).get("choices") or [{}])[0]
+        except Exception:
+            return ""
+        return (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+
+
+class LLMClient(_LLMBase):
     def _chat_completions(self, messages: List[Dict[str,str]], **kwargs) -> Optional[str]:
         url = f"{self.base}/chat/completions"
-        payload = {"model": self.model, "messages": messages}
-        payload.update(kwargs)
+        payload = self._payload(kwargs, messages=messages)
         with httpx.Client(timeout=self.timeout) as cli:
             r = cli.post(url, headers=self._headers(), json=payload)
         r.raise_for_status()
@@ -54,8 +103,7 @@ class LLMClient:
 
     def _completions(self, prompt: str, **kwargs) -> Optional[str]:
         url = f"{self.base}/completions"
-        payload = {"model": self.model, "prompt": prompt}
-        payload.update(kwargs)
+        payload = self._payload(kwargs, prompt=prompt)
         with httpx.Client(timeout=self.timeout) as cli:
             r = cli.post(url, headers=self._headers(), json=payload)
         r.raise_for_status()
@@ -76,19 +124,7 @@ class LLMClient:
                 print(f"[LLM] ok(chat) model={self.model} dt={dt:.2f}s len={len(out)}")
                 return out
             # Fallback to /completions using ChatML-style prompt
-            chatml = []
-            for m in messages:
-                role = m.get("role","user")
-                content = m.get("content","")
-                if role == "system":
-                    chatml.append(f"<|system|>\n{content}\n")
-                elif role == "assistant":
-                    chatml.append(f"<|assistant|>\n{content}\n")
-                else:
-                    chatml.append(f"<|user|>\n{content}\n")
-            chatml.append("<|assistant|>\n")
-            prompt = "".join(chatml)
-            out2 = self._completions(prompt, **kwargs)
+            out2 = self._completions(self._chatml(messages), **kwargs)
             dt2 = time.perf_counter() - t0
             if out2:
                 print(f"[LLM] ok(comp) model={self.model} dt={dt2:.2f}s len={len(out2)}")
@@ -98,3 +134,104 @@ class LLMClient:
         except Exception as e:
             print(f"[LLM][ERR] {type(e).__name__}: {e}")
             return None
+
+
+class AsyncLLMClient(_LLMBase):
+    """
+    LLMClient's API as coroutines (plus chat_stream), backed by one shared
+    httpx.AsyncClient (keep-alive pool, HTTP/2 when `h2` is installed), so
+    /ask neither re-handshakes per call nor parks a worker thread on the LLM.
+    Call start() on app startup and aclose() on shutdown; the pool is also
+    created lazily on first use.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._cli: Optional["httpx.AsyncClient"] = None
+        self.http2 = _HAS_H2 if LLM_HTTP2 == "auto" else (LLM_HTTP2 in ("1", "true", "on") and _HAS_H2)
+
+    def start(self) -> None:
+        if not self.enabled or self._cli is not None:
+            return
+        self._cli = httpx.AsyncClient(
+            timeout=self.timeout,
+            headers=self._headers(),
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_MAX,
+                max_keepalive_connections=LLM_POOL_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+        )
+        print(f"[LLM] pool ready base={self.base} http2={self.http2} max={LLM_POOL_MAX} keepalive={LLM_POOL_KEEPALIVE}")
+
+    async def aclose(self) -> None:
+        cli, self._cli = self._cli, None
+        if cli is not None:
+            await cli.aclose()
+
+    def _client(self) -> "httpx.AsyncClient":
+        if self._cli is None:
+            self.start()
+        return self._cli
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        r = await self._client().post(f"{self.base}{path}", json=payload)
+        r.raise_for_status()
+        return r.json()
+
+    async def chat(self, messages: List[Dict[str,str]], **kwargs) -> Optional[str]:
+        if not self.enabled:
+            return None
+        t0 = time.perf_counter()
+        try:
+            data = await self._post("/chat/completions", self._payload(kwargs, messages=messages))
+            out = self._extract_chat(data) or self._extract_text(data)
+            if out:
+                print(f"[LLM] ok(chat) model={self.model} dt={time.perf_counter() - t0:.2f}s len={len(out)}")
+                return out
+            print(f"[LLM][WARN] empty content from /chat/completions; raw={str(data)[:500]}...")
+            data = await self._post("/completions", self._payload(kwargs, prompt=self._chatml(messages)))
+            out2 = self._extract_text(data) or self._extract_chat(data)
+            if out2:
+                print(f"[LLM] ok(comp) model={self.model} dt={time.perf_counter() - t0:.2f}s len={len(out2)}")
+            else:
+                print("[LLM][ERR] both endpoints returned empty content.")
+            return out2
+        except Exception as e:
+            print(f"[LLM][ERR] {type(e).__name__}: {e}")
+            return None
+
+    async def chat_stream(self, messages: List[Dict[str,str]], **kwargs) -> AsyncIterator[str]:
+        """
+        Yield content deltas from /chat/completions with stream=true (OpenAI SSE).
+        If the server can't stream (error or no deltas before the end), falls
+        back to chat() and yields its whole answer as one chunk. An error after
+        deltas went out is re-raised: the caller holds a truncated answer.
+        """
+        if not self.enabled:
+            return
+        t0 = time.perf_counter()
+        n = size = 0
+        try:
+            payload = self._payload(kwargs, messages=messages, stream=True)
+            async with self._client().stream("POST", f"{self.base}/chat/completions", json=payload) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    delta = self._stream_delta(line)
+                    if delta is None:
+                        break
+                    if delta:
+                        n += 1
+                        size += len(delta)
+                        yield delta
+            if n:
+                jlog("llm.client.stream.ok", model=self.model, dt=round(time.perf_counter() - t0, 2), chunks=n, len=size)
+        except Exception as e:
+            jlog("llm.client.stream.err", model=self.model, error=f"{type(e).__name__}: {e}", chunks=n, len=size)
+            if n:
+                raise
+        if n == 0:
+            out = await self.chat(messages, **kwargs)
+            if out:
+                yield out
@@ -0,0 +1,21 @@
+import asyncio
+
+from tobyworld_v4.core.v4.admission import AdmissionGate
+
+
+def test_admission_gate_queues_then_sheds():
+    async def main():
+        gate = AdmissionGate(limit=1, max_queue=1, max_wait=0.05)
+        assert await gate.acquire()                  # runs
+        waiter = asyncio.create_task(gate.acquire())  # queues
+        await asyncio.sleep(0)
+        assert gate.waiting == 1
+        assert not await gate.acquire()              # queue full: rejected
+        gate.release()                               # slot handed to the waiter
+        assert await waiter and gate.active == 1 and gate.waiting == 0
+        assert not await gate.acquire()              # waits 50ms, times out
+        gate.release()
+        return gate.stats()
+
+    stats = asyncio.run(main())
+    assert (stats["inflight"], stats["admitted"], stats["rejected"], stats["timeout"]) == (0, 2, 1, 1)
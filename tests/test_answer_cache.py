@@ -0,0 +1,25 @@
+from tobyworld_v4.core.v4.answer_cache import AnswerCache, answer_key, strip_guiding
+
+
+def test_answer_cache_keys_on_normalized_query_and_generation():
+    cache = AnswerCache(maxsize=2, ttl=0)
+    text = "Traveler,\n\nThe leaf waits.\n\n**Guiding Question:** What waits in you?\n"
+    cache.put(answer_key((1, 7), "What is Taboshi?", "define", ["L001"]), strip_guiding(text), ["L001"], ["L001"], 0.9)
+
+    hit = cache.get(answer_key((1, 7), "  what is taboshi ", "define", ["L001"]))
+    assert hit["text"] == "Traveler,\n\nThe leaf waits." and hit["hits"] == 1
+    assert cache.get(answer_key((2, 7), "what is taboshi", "define", ["L001"])) is None  # reindexed
+    assert cache.get(answer_key((1, 7), "what is taboshi", "story", ["L001"])) is None
+
+    cache.put(answer_key((1, 7), "a", None), "A", [], [], None)
+    cache.put(answer_key((1, 7), "b", None), "B", [], [], None)
+    assert cache.stats()["evictions"] == 1 and cache.clear() == 2
+
+
+def test_answer_cache_entries_respects_limit():
+    cache = AnswerCache(maxsize=8, ttl=0)
+    for q in ("a", "b", "c"):
+        cache.put(answer_key((1,), q, None), q.upper(), [], [], None)
+    assert cache.entries(limit=0) == []
+    assert [e["query"] for e in cache.entries(limit=2)] == ["c", "b"]
+    assert len(cache.entries(limit=10)) == 3
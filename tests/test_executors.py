@@ -0,0 +1,25 @@
+import asyncio
+import threading
+
+from tobyworld_v4.core.v4.executors import StageExecutor
+
+
+def test_stage_executor_bounds_workers_and_tracks_queue():
+    ex = StageExecutor("test", 1)
+    gate = threading.Event()
+
+    async def main():
+        first = asyncio.ensure_future(ex.run(gate.wait, 5))
+        second = asyncio.ensure_future(ex.run(threading.current_thread))
+        while ex.stats()["active"] != 1:
+            await asyncio.sleep(0.001)
+        assert ex.stats()["queue_depth"] == 1  # one worker: second job waits
+        gate.set()
+        return await first, await second
+
+    try:
+        ok, thread = asyncio.run(main())
+    finally:
+        ex.shutdown(wait=True)
+    assert ok and thread.name.startswith("mv4-test")
+    assert ex.stats() == {"workers": 1, "queue_depth": 0, "active": 0, "completed": 2}
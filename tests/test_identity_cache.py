@@ -0,0 +1,34 @@
+from tobyworld_v4.core.v4.identity_cache import IdentityCache
+
+
+def test_hit_and_write_through():
+    c = IdentityCache(maxsize=8, ttl=60)
+    key = ("db", "tg:1")
+    assert c.get(key) is None
+    c.put(key, "t1", {"interactions": 1}, c.mark())
+    c.update_profile("t1", interactions=2)
+    tid, prof = c.get(key)
+    assert tid == "t1" and prof["interactions"] == 2
+    prof["interactions"] = 99  # callers get a copy
+    assert c.get(key)[1]["interactions"] == 2
+    assert c.stats()["hits"] == 2 and c.stats()["misses"] == 1
+
+
+def test_stale_put_is_refused_and_invalidate_drops():
+    c = IdentityCache(maxsize=8, ttl=60)
+    since = c.mark()
+    c.update_profile("t1", interactions=5)  # a write lands while the miss reads SQLite
+    c.put(("db", "tg:1"), "t1", {"interactions": 4}, since)
+    assert c.get(("db", "tg:1")) is None
+
+    c.put(("db", "tg:1"), "t1", {}, c.mark())
+    c.put(("db", "x:1"), "t1", {}, c.mark())
+    assert c.invalidate_traveler("t1") == 2
+    assert c.get(("db", "x:1")) is None
+
+
+def test_lru_bound():
+    c = IdentityCache(maxsize=2, ttl=0)
+    for i in range(3):
+        c.put(("db", f"tg:{i}"), f"t{i}", {})
+    assert c.get(("db", "tg:0")) is None and c.stats()["size"] == 2
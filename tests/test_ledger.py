@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+
+from tobyworld_v4.core.v4.dbconn import shared_db
+from tobyworld_v4.core.v4.ledger import _SQLiteLedger
+
+
+def _ctx(i):
+    chunk = {"doc_id": f"TOBY_L{i}", "span": [0, 40], "score": 0.9, "text": "the pond reflects " * 20}
+    return {
+        "user": {"id": f"tg:{i % 3}"}, "intent": "lore", "refined_query": f"lotus {i}", "harmony": 0.7,
+        "retriever": [chunk], "draft": {"text": "d", "trace": {"used": [chunk]}},
+        "final": {"sage": f"answer {i}", "sources": [f"TOBY_L{i}"]},
+    }
+
+
+def test_group_commit_batches_and_compacts(tmp_path):
+    led = _SQLiteLedger(str(tmp_path / "ledger.db"))
+    led.start()
+    ids = []
+    threads = [threading.Thread(target=lambda i=i: ids.append(led.log(_ctx(i)))) for i in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    done = []
+    led.submit(_ctx(99), then=done.append)
+    led.close()  # commits the queued row and runs its callback
+
+    stats = led.stats()
+    assert sorted(ids) == list(range(1, 41)) and done == [41]
+    assert stats["rows"] == 41 and stats["batches"] < 41
+    run = led.get_run(7)
+    assert run["final"]["sage"].startswith("answer ")  # threads finish in any order
+    assert "text" not in run["retriever"][0] and run["retriever"][0]["chars"] == 360
+    assert "text" not in run["draft"]["trace"]["used"][0]
+    assert led.summary()["count"] == 41
+    shared_db(led.db_path).close_all()
+
+
+def test_migrates_legacy_ledger(tmp_path):
+    path = str(tmp_path / "old.db")
+    con = sqlite3.connect(path)
+    con.executescript("""
+        CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, user_id TEXT,
+            intent TEXT, refined_query TEXT, harmony REAL, answer TEXT, retrieval_count INTEGER,
+            final_json TEXT, ctx_json TEXT);
+        CREATE INDEX idx_runs_text ON runs(answer);
+        INSERT INTO runs (ts, answer, final_json, ctx_json)
+            VALUES (1.0, 'old', '{"sage": "old"}', '{"intent": "lore", "final": {"sage": "old"}}');
+    """)
+    con.commit()
+    con.close()
+
+    led = _SQLiteLedger(path)  # writer not started: inline inserts
+    new_id = led.log(_ctx(1))
+    con = shared_db(path).conn()
+    assert con.execute("SELECT 1 FROM sqlite_master WHERE name='idx_runs_text'").fetchone() is None
+    assert led.get_run(1) == {"intent": "lore", "final": {"sage": "old"}}
+    assert [h["id"] for h in led.query_semantic("old")] == [1]  # backfilled into runs_fts
+    assert led.compact_legacy() == 1
+    assert led.get_run(1)["intent"] == "lore" and led.get_run(new_id)["final"]["sage"] == "answer 1"
+    shared_db(path).close_all()
+
+
+def _run(q, answer):
+    return {"user": {"id": "tg:1"}, "intent": "lore", "refined_query": q, "final": {"sage": answer}}
+
+
+def test_search_ranks_filters_and_pages(tmp_path):
+    from tobyworld_v4.core.v4.ledger import _MemoryLedger
+
+    sql = _SQLiteLedger(str(tmp_path / "search.db"))
+    mem = _MemoryLedger()
+    for led in (sql, mem):
+        led.log(_run("what is the lotus?", "The lotus opens in patience."))
+        led.log(_run("toby", "Toby waits by the pond."))
+        led.log(_run("lotus pond", "The lotus grows in the pond, lotus upon lotus."))
+        led.log(_run("satoby", "Nothing here."))
+
+        hits = led.query_semantic("what is the lotus")
+        assert [h["id"] for h in hits] == [3, 1]  # more 'lotus' ranks first
+        assert hits[0]["score"] >= hits[1]["score"]
+        assert [h["id"] for h in led.query_semantic("lotus pond", limit=1, offset=1)] == [1]
+        assert led.query_semantic("pond", since=hits[0]["ts"] + 60) == []
+        assert led.query_semantic("the") and led.query_semantic("") == []
+    shared_db(sql.db_path).close_all()
+
+
+def test_rows_submitted_while_stopping_are_still_written(tmp_path, monkeypatch):
+    import time
+    import tobyworld_v4.core.v4.ledger as ledger_mod
+
+    led = _SQLiteLedger(str(tmp_path / "ledger.db"))
+    led.start()
+    writer, slow, busy = led._writer, threading.Event(), threading.Event()
+    real_write = writer._write
+
+    def slow_write(rows):
+        busy.set()
+        slow.wait(5)
+        return real_write(rows)
+
+    monkeypatch.setattr(writer, "_write", slow_write)
+    led.submit(_ctx(0))
+    assert busy.wait(5)  # the writer is blocked inside this batch
+    stopper = threading.Thread(target=led.close)
+    stopper.start()
+    deadline = time.time() + 5
+    while ledger_mod._STOP not in list(writer._q.queue) and time.time() < deadline:
+        time.sleep(0.001)
+
+    done = []
+    led.submit(_ctx(1), then=done.append)  # late submit: written inline
+    # a row that raced past the _closing check and landed behind the sentinel
+    late = writer._q.put_nowait
+    fut = ledger_mod.Future()
+    late((ledger_mod._row(_ctx(2)), fut, None, True))
+    slow.set()
+    stopper.join(5)
+    assert not stopper.is_alive() and fut.result(timeout=1) > 0
+    assert len(done) == 1
+    n = sqlite3.connect(str(tmp_path / "ledger.db")).execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    assert n == 3
+
+
+def test_log_falls_back_inline_when_writer_stalls(tmp_path, monkeypatch):
+    import tobyworld_v4.core.v4.ledger as ledger_mod
+
+    monkeypatch.setattr(ledger_mod, "LEDGER_LOG_TIMEOUT_SEC", 0.05)
+    led = _SQLiteLedger(str(tmp_path / "ledger.db"))
+    led.start()
+    gate, busy = threading.Event(), threading.Event()
+    real_write = led._writer._write
+
+    def stalled_write(rows):
+        busy.set()
+        gate.wait(5)
+        return real_write(rows)
+
+    monkeypatch.setattr(led._writer, "_write", stalled_write)
+    led.submit(_ctx(0))
+    assert busy.wait(5)  # writer is stuck committing the first batch
+    run_id = led.log(_ctx(1))  # queued behind it, times out, inserted inline
+    gate.set()
+    led.close()
+    con = sqlite3.connect(str(tmp_path / "ledger.db"))
+    assert con.execute("SELECT refined_query FROM runs WHERE id=?", (run_id,)).fetchone()[0] == "lotus 1"
+    assert con.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 2
@@ -0,0 +1,93 @@
+import calendar
+
+from tobyworld_v4.core.v4.dbconn import shared_db
+from tobyworld_v4.core.v4.learning import _SQLiteLearning
+from tobyworld_v4.core.v4.ledger import _SQLiteLedger
+from tobyworld_v4.core.v4.ledger_archive import (
+    LedgerArchiver, archived_summary, iter_archived, load_manifest, month_bounds,
+)
+
+NOW = float(calendar.timegm((2026, 10, 18, 12, 0, 0)))
+
+
+def _seed(path):
+    led, learn = _SQLiteLedger(path), _SQLiteLearning(path)
+    for i, month in enumerate((6, 6, 7, 9, 10)):
+        ctx = {"user": {"id": "tg:1"}, "intent": "lore", "harmony": 0.5 + i / 10,
+               "refined_query": f"lotus {i}", "final": {"sage": f"answer {i}"}}
+        run_id = led.log(ctx)
+        learn.commit(ctx, run_id=run_id)
+        ts = float(calendar.timegm((2026, month, 15, 0, 0, 0)))
+        con = shared_db(path).conn()
+        con.execute("UPDATE runs SET ts=? WHERE id=?", (ts, run_id))
+        con.execute("UPDATE learnings SET ts=? WHERE run_id=?", (ts, run_id))
+    learn.close()
+    return led
+
+
+def test_archives_closed_months_past_retention(tmp_path):
+    path, out = str(tmp_path / "ledger.db"), str(tmp_path / "archive")
+    led = _seed(path)
+    arc = LedgerArchiver(path, out, retention_months=3, fmt="jsonl")
+
+    assert arc.due_months(NOW) == ["2026-06", "2026-07"]
+    res = arc.run_once(NOW)
+    assert res["archived"] == {"2026-06": {"runs": 2, "learnings": 2}, "2026-07": {"runs": 1, "learnings": 1}}
+    assert arc.due_months(NOW) == []
+
+    assert led.summary()["count"] == 2
+    assert sorted(h["id"] for h in led.query_semantic("lotus")) == [4, 5]  # delete trigger cleaned runs_fts
+    arch = archived_summary(archive_dir=out)
+    assert arch["count"] == 3 and abs(arch["harmony_sum"] - (0.5 + 0.6 + 0.7)) < 1e-9
+    june = calendar.timegm((2026, 6, 1, 0, 0, 0))
+    assert archived_summary(since=june + 20 * 86400, archive_dir=out)["count"] == 1  # edge month scanned
+    rows = list(iter_archived("runs", archive_dir=out))
+    assert [r["refined_query"] for r in rows] == ["lotus 0", "lotus 1", "lotus 2"]
+    assert len(list(iter_archived("learnings", archive_dir=out))) == 3
+
+    # keep only 4 months of archives: June goes, July stays
+    arc.keep_months = 4
+    assert arc.expire(NOW) == ["2026-06"]
+    assert sorted(load_manifest(out)["months"]) == ["2026-07"]
+    shared_db(path).close_all()
+
+
+def test_resumes_deletes_after_manifest_write(tmp_path):
+    path, out = str(tmp_path / "ledger.db"), str(tmp_path / "archive")
+    led = _seed(path)
+    arc = LedgerArchiver(path, out, retention_months=3, fmt="jsonl")
+    arc._delete = lambda *a: 0  # crash after the manifest write, before deleting
+    arc.archive_month("2026-06")
+    assert led.summary()["count"] == 5
+
+    arc = LedgerArchiver(path, out, retention_months=3, fmt="jsonl")
+    assert arc.archive_month("2026-06") == {"runs": 2, "learnings": 2}  # files kept, rows removed
+    assert archived_summary(archive_dir=out)["count"] == 2 and led.summary()["count"] == 3
+    shared_db(path).close_all()
+
+
+def test_resume_only_deletes_archived_rows(tmp_path, monkeypatch):
+    import tobyworld_v4.core.v4.ledger as ledger_mod
+
+    monkeypatch.chdir(tmp_path)  # Ledger.summary reads the default (relative) archive dir
+    path = str(tmp_path / "ledger.db")
+    monkeypatch.setattr(ledger_mod, "_DB_PATH", path)
+    led = _seed(path)
+    arc = LedgerArchiver(path, "ledger-archive", retention_months=3, fmt="jsonl")
+    arc._delete = lambda *a: 0  # crash after the manifest write, before deleting
+    arc.archive_month("2026-06")
+    assert load_manifest("ledger-archive")["months"]["2026-06"]["max_id"] == {"runs": 2, "learnings": 2}
+
+    # between the manifest write and the deletes, June is counted once (from the archive)
+    summary = ledger_mod.Ledger().summary()
+    assert (summary["count"], summary["archived_count"], summary["live_count"]) == (5, 2, 3)
+
+    # a row that lands in June afterwards is not in the files, so the resumed pass keeps it
+    late = led.log({"user": {"id": "tg:1"}, "intent": "lore", "harmony": 0.9, "refined_query": "late"})
+    shared_db(path).conn().execute("UPDATE runs SET ts=? WHERE id=?",
+                                   (float(calendar.timegm((2026, 6, 20, 0, 0, 0))), late))
+    arc = LedgerArchiver(path, "ledger-archive", retention_months=3, fmt="jsonl")
+    assert arc.archive_month("2026-06") == {"runs": 2, "learnings": 2}
+    june = shared_db(path).conn().execute("SELECT id FROM runs WHERE ts >= ? AND ts < ?", month_bounds("2026-06"))
+    assert [r[0] for r in june] == [late]
+    shared_db(path).close_all()
@@ -0,0 +1,66 @@
+import asyncio
+import inspect
+
+from tobyworld_v4.llm.client import AsyncLLMClient, LLMClient
+
+
+def test_sync_and_async_clients_are_not_substitutes(monkeypatch):
+    monkeypatch.setenv("LLM_BASE_URL", "http://llm.local/v1/")
+    monkeypatch.setenv("LLM_MODEL", "m")
+    sync, aio = LLMClient(), AsyncLLMClient()
+    assert not isinstance(aio, LLMClient)  # an LLMClient's chat() always returns text, never a coroutine
+    assert not inspect.iscoroutinefunction(LLMClient.chat)
+    assert inspect.iscoroutinefunction(AsyncLLMClient.chat)
+    assert not hasattr(sync, "chat_stream")
+
+    # request building + parsing is shared
+    assert sync.base == aio.base == "http://llm.local/v1"
+    assert sync._payload({"top_p": 0.9}, stream=True) == aio._payload({"top_p": 0.9}, stream=True)
+    assert aio._stream_delta('data: {"choices":[{"delta":{"content":"hi"}}]}') == "hi"
+    assert aio._stream_delta("data: [DONE]") is None
+
+
+def test_disabled_clients_answer_none(monkeypatch):
+    monkeypatch.setenv("MIRROR_LLM_ENABLED", "0")
+    assert LLMClient().chat([{"role": "user", "content": "hi"}]) is None
+
+    async def run():
+        aio = AsyncLLMClient()
+        return await aio.chat([]), [d async for d in aio.chat_stream([])]
+
+    assert asyncio.run(run()) == (None, [])
+
+
+def test_stream_broken_mid_answer_raises(monkeypatch):
+    import httpx
+    import pytest
+
+    monkeypatch.setenv("MIRROR_LLM_ENABLED", "1")
+    monkeypatch.setenv("LLM_BASE_URL", "http://llm.local/v1")
+    monkeypatch.setenv("LLM_MODEL", "m")
+
+    async def body():
+        yield b'data: {"choices":[{"delta":{"content":"Traveler, the leaf"}}]}\n\n'
+        raise httpx.ReadError("connection reset")
+
+    async def run(handler):
+        aio = AsyncLLMClient()
+        aio._cli = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        out = []
+        try:
+            async for d in aio.chat_stream([{"role": "user", "content": "hi"}]):
+                out.append(d)
+        finally:
+            await aio.aclose()
+        return out
+
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(run(lambda req: httpx.Response(200, content=body())))
+
+    # nothing streamed yet: falls back to one non-streaming completion
+    def no_stream(req):
+        if b'"stream": true' in req.content or b'"stream":true' in req.content:
+            return httpx.Response(500)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "whole answer"}}]})
+
+    assert asyncio.run(run(no_stream)) == ["whole answer"]
@@ -0,0 +1,48 @@
+import json
+
+from tobyworld_v4.core.v4.logsink import LogSink
+
+
+def test_log_sink_levels_sampling_and_flush(capsys):
+    sink = LogSink(levels="*=debug,synth=info,memori=error", sample="retrieval.preview=0", encoder="json")
+    lines = []
+    sink.taps.append(lines.append)
+    sink.start()
+    sink.log("ask.begin", {"q": "who is toby?", "obj": object()})
+    sink.log("retrieval.preview", {"top": []})  # sampled out
+    sink.log("synth.used.preview", {})          # debug < synth=info
+    sink.log("memori.recall", {"items": 3})     # family raised to error
+    sink.log("memori.adapter.err", {"error": "boom"})
+    sink.stop()
+
+    assert [json.loads(l)["evt"] for l in lines] == ["ask.begin", "memori.adapter.err"]
+    assert capsys.readouterr().out.splitlines() == lines
+    stats = sink.stats()
+    assert (stats["written"], stats["sampled"], stats["filtered"], stats["async"]) == (2, 1, 2, False)
+
+
+def test_log_sink_snapshots_fields_at_enqueue(capsys):
+    import threading
+
+    sink = LogSink(encoder="json", sample="")
+    release, lines = threading.Event(), []
+
+    def slow_tap(line):
+        release.wait(5)  # hold the writer so later events sit in the queue
+        lines.append(line)
+
+    sink.taps.append(slow_tap)
+    sink.start()
+    sink.log("ask.begin", {})
+    ctx = {"user": "tg:1", "pins": ["TOBY_L001"]}
+    top = [{"id": "TOBY_L001"}]
+    sink.log("ask.ctx", {"ctx": ctx, "top": top})
+    ctx["user"] = "tg:2"
+    ctx["pins"].append("TOBY_L002")
+    top.append({"id": "TOBY_L002"})
+    release.set()
+    sink.stop()
+
+    logged = json.loads(lines[1])
+    assert logged["ctx"] == {"user": "tg:1", "pins": ["TOBY_L001"]}
+    assert logged["top"] == [{"id": "TOBY_L001"}]
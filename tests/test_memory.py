@@ -0,0 +1,24 @@
+from tobyworld_v4.core.v4.dbconn import shared_db
+from tobyworld_v4.core.v4.memory import Memory, _SQLiteMemory
+
+
+def test_memory_reuses_one_connection_per_thread(tmp_path):
+    path = str(tmp_path / "mem.db")
+    mem = Memory()
+    mem.backend = _SQLiteMemory(path)
+    _SQLiteMemory(path)  # second instance: schema already ensured, same connection
+
+    tid, prof = mem.resolve_user("tg:12345")
+    assert prof["interactions"] == 0
+    assert mem.resolve_user("tg:@12345")[0] == tid
+
+    mem.update_after_run(tid, "who is toby?", "🪞 the pond", 0.8)
+    mem.set_preferences(tid, tone="calm")
+    prof = mem.get_profile(tid)
+    assert (prof["interactions"], prof["tone"], prof["last_q"]) == (1, "calm", "who is toby?")
+    assert mem.backend._get_user_mem_row(tid)["favorite_symbols"] == ["🪞"]
+
+    db = shared_db(path)
+    assert db.stats()["opened"] == 1
+    assert not db.conn().in_transaction
+    db.close_all()
@@ -0,0 +1,295 @@
+import pytest
+
+import tobyworld_v4.core.v4.retriever as retr
+
+
+@pytest.fixture
+def fts_db(tmp_path, monkeypatch):
+    if not retr._SUPPORTS_FTS:
+        pytest.skip("sqlite built without FTS5")
+    retr.close_db()
+    monkeypatch.setattr(retr, "_FTS_DB_PATH", str(tmp_path / "fts.db"))
+    yield tmp_path
+    retr.close_db()
+
+
+def _scroll(tmp_path, name, text):
+    p = tmp_path / "scrolls" / name
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text, encoding="utf-8")
+    return p
+
+
+def test_passages_cover_text_with_real_spans():
+    text = "# Title\n\nfirst para\n\n" + ("word " * 400) + "\n\nlast para"
+    spans = retr._passages(text, max_chars=200, overlap=40)
+    assert spans[0][0] == 0
+    assert text[spans[-1][0]:spans[-1][1]] == "last para"
+    for s, e in spans:
+        assert 0 <= s < e <= len(text)
+        assert e - s <= 200
+
+
+def test_multi_arc_returns_matching_passage(fts_db):
+    filler = "\n\n".join(f"Preamble line {i} about nothing in particular." for i in range(40))
+    _scroll(fts_db, "TOBY_L001_Test.md", f"# Test\n\n{filler}\n\nThe Leaf of Yield grows from patience.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+
+    out = retr.Retriever().multi_arc("leaf yield", {})
+    top = out[0]
+    s, e = top["span"]
+    assert "Leaf of Yield" in top["text"]
+    assert s > 0 and e - s == len(top["text"])
+    assert "Preamble line 0 " not in top["text"]
+
+
+def test_reindex_prunes_deleted_files(fts_db):
+    keep = _scroll(fts_db, "TOBY_L001_Keep.md", "# Keep\n\nThe pond stays still.\n")
+    gone = _scroll(fts_db, "TOBY_L002_Gone.md", "# Gone\n\nThe pond ripples once.\n")
+    assert retr.load_index_from_folder(str(fts_db / "scrolls")) == 2
+
+    gone.unlink()
+    assert retr.load_index_from_folder(str(fts_db / "scrolls")) == 0
+    last = retr.index_stats()["last"]
+    assert last["deleted"] == 1 and last["skipped"] == 1
+    assert "files_per_sec" in last and "mb_per_sec" in last
+
+    ids = {r["id"] for r in retr._fts_search(["pond"], 10)}
+    assert ids == {retr._doc_id(keep)}
+
+
+def test_reindex_uses_content_hash_for_touch_and_rename(fts_db):
+    import os
+
+    a = _scroll(fts_db, "TOBY_L001_Old.md", "# Lotus\n\nThe lotus waits in the pond.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+
+    os.utime(a, (a.stat().st_atime, a.stat().st_mtime + 100))
+    assert retr.load_index_from_folder(str(fts_db / "scrolls")) == 0
+    assert retr.index_stats()["last"]["touched"] == 1
+
+    moved = a.with_name("TOBY_QA001_New.md")
+    a.rename(moved)
+    assert retr.load_index_from_folder(str(fts_db / "scrolls")) == 0
+    last = retr.index_stats()["last"]
+    assert (last["renamed"], last["deleted"], last["added"]) == (1, 0, 0)
+
+    hit = retr._fts_search(["lotus"], 5)
+    assert [h["id"] for h in hit] == [retr._doc_id(moved)]
+    assert hit[0]["series"] == "TOBY_QA"
+
+
+def test_rename_onto_indexed_file_reparses_target(fts_db):
+    a = _scroll(fts_db, "TOBY_L001_A.md", "# A\n\nThe heron guards the marsh.\n")
+    b = _scroll(fts_db, "TOBY_L002_B.md", "# B\n\nThe tadpole hides in reeds.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+
+    a.replace(b)  # mv a.md b.md, b.md already indexed
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    last = retr.index_stats()["last"]
+    assert (last["updated"], last["deleted"], last["renamed"], last["touched"]) == (1, 1, 0, 0)
+    assert [h["id"] for h in retr._fts_search(["heron"], 5)] == [retr._doc_id(b)]
+    assert retr._fts_search(["tadpole"], 5) == []
+
+    # the stored hash matches the file now, and the next pass still finds the new text
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    assert [h["id"] for h in retr._fts_search(["heron"], 5)] == [retr._doc_id(b)]
+
+
+def test_index_paths_applies_single_file_changes(fts_db):
+    a = _scroll(fts_db, "TOBY_L001_A.md", "# A\n\nThe frog rests on a lily.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+
+    b = _scroll(fts_db, "TOBY_L002_B.md", "# B\n\nThe frog leaps into the pond.\n")
+    res = retr.index_paths([str(b)])
+    assert (res["added"], res["updated"]) == (1, 0)
+    assert {h["id"] for h in retr._fts_search(["frog"], 10)} == {retr._doc_id(a), retr._doc_id(b)}
+
+    moved = a.with_name("TOBY_L003_C.md")
+    a.rename(moved)
+    res = retr.index_paths([str(a), str(moved)])
+    assert (res["renamed"], res["deleted"], res["added"]) == (1, 0, 0)
+
+    b.unlink()
+    assert retr.index_paths([str(b)])["deleted"] == 1
+    assert [h["id"] for h in retr._fts_search(["frog"], 10)] == [retr._doc_id(moved)]
+
+
+def test_scroll_watcher_poll_backend(fts_db):
+    import time
+    from tobyworld_v4.core.v4.watcher import ScrollWatcher
+
+    (fts_db / "scrolls").mkdir()
+    w = ScrollWatcher(str(fts_db / "scrolls"), mode="poll", debounce=0.05, poll=0.05)
+    assert w.start()
+    try:
+        p = _scroll(fts_db, "TOBY_L001_W.md", "# W\n\nThe watcher sees the toad.\n")
+        deadline = time.time() + 5
+        while time.time() < deadline and not (retr._fts_search(["toad"], 5) and w.status()["batches"]):
+            time.sleep(0.05)
+        assert [h["id"] for h in retr._fts_search(["toad"], 5)] == [retr._doc_id(p)]
+        assert w.status()["queue_depth"] == 0
+    finally:
+        w.stop()
+
+
+def test_multi_arc_cache_hits_until_reindex(fts_db):
+    _scroll(fts_db, "TOBY_L001_A.md", "# A\n\nThe taboshi leaf is patience.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    r = retr.Retriever()
+
+    before = retr.cache_stats()
+    first = r.multi_arc("taboshi", {})
+    first[0]["text"] = "mutated by caller"
+    again = r.multi_arc("Taboshi?", {})
+    stats = retr.cache_stats()
+    assert (stats["misses"] - before["misses"], stats["hits"] - before["hits"]) == (1, 1)
+    assert "taboshi leaf" in again[0]["text"]
+
+    gen = retr.index_generation()
+    _scroll(fts_db, "TOBY_L002_B.md", "# B\n\nA second taboshi scroll.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    assert retr.index_generation() > gen
+    assert len(r.multi_arc("taboshi", {})) == 2
+
+
+def test_hybrid_vectors_follow_incremental_reindex(fts_db):
+    if retr._vec_store() is None:
+        pytest.skip("hybrid retrieval disabled")
+    a = _scroll(fts_db, "TOBY_L001_A.md", "# A\n\nPatience grows the leaf.\n")
+    _scroll(fts_db, "TOBY_L002_B.md", "# B\n\nThe pond reflects the sky.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    assert retr.index_stats()["last"]["vectors"] == 2
+    store = retr._vec_store()
+    assert store.slots == 2
+
+    a.write_text("# A\n\nPatience grows the leaf, season after season.\n", encoding="utf-8")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    assert retr.index_stats()["last"]["vectors"] == 1
+    assert store.slots == 2  # freed slot was reused
+
+    out = retr.Retriever().multi_arc("patience leaf", {})
+    assert out[0]["doc_id"] == retr._doc_id(a)
+    assert 0.0 < out[0]["score"] <= 1.2
+    assert set(retr.index_stats()["hybrid"]["last_search_ms"]) >= {"fts_ms", "dense_ms", "fuse_ms"}
+
+
+def test_rerank_blends_series_boost_and_drops_zero_base():
+    cand = [
+        {"id": "a", "series": "TOBY_L", "ts": 0.0, "hybrid": 0.5},
+        {"id": "b", "series": "TOBY_QA", "ts": 0.0, "hybrid": 0.5},
+        {"id": "c", "series": "TOBY_QA", "ts": 0.0, "hybrid": 0.0},
+        {"id": "d", "series": "", "ts": 0.0, "hybrid": 0.5},
+    ]
+    ranked = retr._rerank(cand, [], ["TOBY_QA", "TOBY_L"], 0.2, 0.0)
+    assert [cand[i]["id"] for i, _ in ranked] == ["b", "a", "d"]
+    assert [round(s, 3) for _, s in ranked] == [0.6, 0.55, 0.5]
+
+
+def test_fallback_inverted_index_scores_bm25_per_passage():
+    filler = "\n\n".join(f"Filler paragraph {i} about the quiet pond." for i in range(30))
+    retr._fallback_set_index([
+        {"id": "a.md", "title": "Leaf", "text": f"# Leaf\n\n{filler}\n\nThe leaf of yield grows slowly.\n"},
+        {"id": "b.md", "title": "Pond", "text": "# Pond\n\nThe pond is still.\n"},
+    ])
+    try:
+        hits = retr._fallback_search(["yield"], 5)
+        assert [h["id"] for h in hits] == ["a.md"]
+        s, e = hits[0]["span"]
+        assert "leaf of yield" in hits[0]["text"] and s > 0 and hits[0]["bm25"] < 0
+        assert {h["id"] for h in retr._fallback_search(["pond"], 5)} == {"a.md", "b.md"}
+    finally:
+        retr._fallback_set_index([])
+
+
+def test_scroll_watcher_keeps_events_during_and_after_failed_flush(tmp_path, monkeypatch):
+    from tobyworld_v4.core.v4.watcher import ScrollWatcher
+
+    w = ScrollWatcher(str(tmp_path), mode="poll", debounce=0, max_delay=10)
+    a, b = str(tmp_path / "a.md"), str(tmp_path / "b.md")
+    calls = []
+
+    def saved_again_while_indexing(paths):
+        calls.append(sorted(paths))
+        w.notify(a)  # editor saves `a` again mid-flush
+        return {"added": len(paths)}
+
+    monkeypatch.setattr(retr, "index_paths", saved_again_while_indexing)
+    w.notify(a)
+    w.notify(b)
+    w._flush(w._due())
+    assert calls == [[a, b]]
+    assert list(w._pending) == [a] and w.status()["queue_depth"] == 1
+
+    def broken(paths):
+        raise OSError("database is locked")
+
+    monkeypatch.setattr(retr, "index_paths", broken)
+    w._flush(w._due())
+    assert list(w._pending) == [a] and w.errors == 1
+    assert w._due() is None  # backing off before the retry
+
+    monkeypatch.setattr(retr, "index_paths", lambda paths: calls.append(sorted(paths)) or {})
+    w._retry_at = 0.0
+    w._flush(w._due())
+    assert calls[-1] == [a] and not w._pending and w.status()["queue_depth"] == 0
+
+
+def test_multi_arc_cache_never_shares_echo_fallback(fts_db):
+    _scroll(fts_db, "TOBY_L001_A.md", "# A\n\nThe taboshi leaf is patience.\n")
+    retr.load_index_from_folder(str(fts_db / "scrolls"))
+    r = retr.Retriever()
+
+    first = r.multi_arc("zebra quokka?", {})
+    second = r.multi_arc("Quokka, zebra!", {})  # same terms, different wording
+    assert first[0]["doc_id"] == second[0]["doc_id"] == "SYNTH://echo"
+    assert first[0]["text"] == "zebra quokka?" and second[0]["text"] == "Quokka, zebra!"
+
+
+def test_reader_pool_reuses_per_thread_and_stays_within_size(fts_db):
+    import sqlite3
+    import threading
+
+    retr._db()  # create the DB file the read-only connections open
+    pool = retr._ReaderPool(2)
+
+    def lease_once(out=None, hold=None):
+        with pool.lease() as con:
+            if out is not None:
+                out.append(con)
+        if hold is not None:
+            hold.wait(5)  # keep the thread alive after its lease
+
+    with pool.lease() as a:
+        with pool.lease() as nested:
+            assert nested is a
+    with pool.lease() as again:
+        assert again is a  # same thread, same connection
+
+    # short-lived threads: an exited thread's connection is closed (or kept by a thread reusing its ident)
+    left = []
+    for _ in range(4):
+        t = threading.Thread(target=lease_once, args=(left,))
+        t.start()
+        t.join()
+        assert pool.stats()["open"] <= 2
+    pooled = {id(sl.con) for sl in pool._conns.values()}
+    for con in left:
+        if id(con) not in pooled:
+            with pytest.raises(sqlite3.ProgrammingError):
+                con.execute("SELECT 1")
+
+    # live threads beyond `size`: an idle connection changes hands instead of a new one opening
+    release, seen, threads = threading.Event(), [], []
+    for _ in range(3):
+        threads.append(threading.Thread(target=lease_once, args=(seen, release)))
+        threads[-1].start()
+        while len(seen) < len(threads):
+            threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+    stats = pool.stats()
+    assert stats["open"] == 2 and stats["handoffs"] >= 1 and stats["active"] == 0
+    assert len({id(c) for c in seen}) <= 2
+    pool.close_all()
@@ -0,0 +1,246 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import tobyworld_v4.core.v4.retriever as retr
+from tobyworld_v4.api import server
+from tobyworld_v4.core.v4.identity_cache import identity_cache
+
+ANSWER = (
+    "Traveler, the Leaf of Yield grows from patience and quiet conviction. "
+    "It is the reward of those who hold through the long winter of the pond."
+)
+
+
+class StubLLM:
+    """Stands in for AsyncLLMClient: canned answer, or raises when `fail` is set."""
+    enabled = True
+    model = "stub"
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def start(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def chat(self, messages, **kw):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("llm down")
+        return ANSWER
+
+    async def chat_stream(self, messages, **kw):
+        self.calls += 1
+        for word in ANSWER.split(" "):
+            yield word + " "
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    if not retr._SUPPORTS_FTS:
+        pytest.skip("sqlite built without FTS5")
+    monkeypatch.chdir(tmp_path)  # every relative DB path (ledger, memory, archive) lands here
+    retr.close_db()
+    monkeypatch.setattr(retr, "_FTS_DB_PATH", str(tmp_path / "fts.db"))
+    scrolls = tmp_path / "scrolls"
+    scrolls.mkdir()
+    (scrolls / "TOBY_L001_Leaf.md").write_text(
+        "# Leaf\n\nThe Leaf of Yield grows from patience. Those who hold receive the leaf.\n", encoding="utf-8"
+    )
+    retr.load_index_from_folder(str(scrolls))
+
+    stub = StubLLM()
+    monkeypatch.setattr(server, "llm", stub)
+    monkeypatch.setattr(server, "DISABLE_STARTUP_INDEX", True)
+    server.answer_cache.clear()
+    identity_cache.clear()
+    server.TRACE_BUF.clear()
+    with TestClient(server.app) as client:
+        client.stub = stub
+        yield client
+    server.answer_cache.clear()
+    identity_cache.clear()
+    retr.close_db()
+
+
+def _count(db, table):
+    return sqlite3.connect(db).execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_answer_cache_admin_needs_token(app_client, monkeypatch):
+    body = {"questions": ["What is the Leaf of Yield?"]}
+    monkeypatch.setattr(server, "ANSWER_CACHE_ADMIN_TOKEN", "")
+    assert app_client.post("/cache/answers/warm", json=body).status_code == 403
+    assert app_client.post("/cache/answers/flush").status_code == 403
+
+    monkeypatch.setattr(server, "ANSWER_CACHE_ADMIN_TOKEN", "s3cret")
+    assert app_client.post("/cache/answers/warm", json=body, headers={"x-token": "nope"}).status_code == 401
+    assert app_client.stub.calls == 0
+    assert app_client.post("/cache/answers/flush", headers={"x-token": "s3cret"}).json()["ok"]
+
+
+def test_answer_cache_warm_persists_nothing(app_client, monkeypatch):
+    monkeypatch.setattr(server, "ANSWER_CACHE_ADMIN_TOKEN", "s3cret")
+    res = app_client.post("/cache/answers/warm", json={"questions": ["What is the Leaf of Yield?"]},
+                          headers={"x-token": "s3cret"}).json()
+    assert res["results"][0]["stored"] and app_client.stub.calls == 1
+    server.app.state.writer.stop()  # drain anything that was queued
+    server.app.state.ledger.stop()
+    assert _count("mirror-v4.db", "runs") == 0
+    assert _count("mirror-v4.db", "travelers") == _count("mirror-v4.db", "user_memory") == 0
+
+    # same wording (modulo case/punctuation) hits; a different question with the same terms does not
+    assert app_client.post("/ask", json={"question": "what is the leaf of yield"}).json()["meta"].get("cached")
+    assert not app_client.post("/ask", json={"question": "Leaf of Yield: what is it?"}).json()["meta"].get("cached")
+
+
+def _ask_concurrently(client, users, question):
+    import threading
+
+    out = {}
+
+    def go(user):
+        out[user] = client.post("/ask", json={"user": user, "question": question}).json()
+
+    threads = [threading.Thread(target=go, args=(u,)) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return out
+
+
+def _slow(stub, fail):
+    import asyncio
+
+    async def chat(messages, **kw):
+        stub.calls += 1
+        await asyncio.sleep(0.3)  # long enough for the twin request to join the flight
+        if fail:
+            raise RuntimeError("llm down")
+        return ANSWER
+
+    return chat
+
+
+def test_single_flight_shares_llm_answers_but_not_failures(app_client, monkeypatch):
+    stub = app_client.stub
+    monkeypatch.setattr(stub, "chat", _slow(stub, fail=True))
+    out = _ask_concurrently(app_client, ["tg:1", "tg:2"], "What is the Leaf of Yield?")
+    # the leader's renderer fallback is not handed to the follower: it runs (and fails) on its own
+    assert stub.calls == 2
+    assert not any(r["meta"].get("coalesced") for r in out.values())
+    assert server.answer_cache.stats()["size"] == 0
+
+    stub.calls = 0
+    monkeypatch.setattr(stub, "chat", _slow(stub, fail=False))
+    out = _ask_concurrently(app_client, ["tg:3", "tg:4"], "Where does the Leaf of Yield grow?")
+    assert stub.calls == 1
+    assert sorted(bool(r["meta"].get("coalesced")) for r in out.values()) == [False, True]
+
+    # the follower's memory records the leader's lucidity distillate, not the cadenced answer
+    server.app.state.writer.stop()
+    con = sqlite3.connect("mirror-v4.db")
+    syms = dict(con.execute(
+        "SELECT i.external_id, m.favorite_symbols FROM user_memory m "
+        "JOIN identities i ON i.traveler_id = m.user_id WHERE i.external_id IN ('3', '4')"
+    ).fetchall())
+    assert len(syms) == 2 and syms["3"] == syms["4"]
+
+
+def _sse_events(body):
+    """Split an SSE body into (event, data) pairs; comment frames come back as (None, text)."""
+    import json
+
+    assert body.endswith("\n\n")
+    out = []
+    for frame in body[:-2].split("\n\n"):
+        if frame.startswith(":"):
+            out.append((None, frame[1:].strip()))
+            continue
+        ev, data = frame.split("\n")
+        assert ev.startswith("event: ") and data.startswith("data: ")
+        out.append((ev[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+def test_ask_stream_frames_events_in_order(app_client):
+    with app_client.stream("POST", "/ask/stream", json={"user": "tg:9", "question": "What is the Leaf of Yield?"}) as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = _sse_events("".join(r.iter_text()))
+
+    names = [e for e, _ in events]
+    assert events[0] == (None, "stream open")
+    assert names[1:3] == ["retrieval", "provenance"] and names[-1] == "final"
+    deltas = [d["text"] for e, d in events if e == "delta"]
+    assert names[3:-1] == ["delta"] * len(deltas) and "".join(deltas).strip() == ANSWER
+    retrieval, final = events[1][1], events[-1][1]
+    assert retrieval["count"] >= 1 and retrieval["top"]
+    assert "Leaf of Yield" in final["answer"] and final["meta"]["provenance"]
+
+
+def test_ask_stream_broken_mid_answer_is_not_shared(app_client, monkeypatch):
+    async def broken_stream(messages, **kw):
+        app_client.stub.calls += 1
+        yield ANSWER[:100]  # long enough to be served rather than replaced by the renderer
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(app_client.stub, "chat_stream", broken_stream)
+    with app_client.stream("POST", "/ask/stream", json={"user": "tg:9", "question": "What is the Leaf of Yield?"}) as r:
+        events = _sse_events("".join(r.iter_text()))
+    names = [e for e, _ in events]
+    assert "error" not in names and names[-1] == "final"
+    assert "Leaf of Yield" in events[-1][1]["answer"]
+
+    # the truncated answer was not cached: the next /ask runs the LLM itself
+    assert server.answer_cache.stats()["size"] == 0
+    res = app_client.post("/ask", json={"user": "tg:9", "question": "What is the Leaf of Yield?"}).json()
+    assert not res["meta"].get("cached") and app_client.stub.calls == 2
+
+
+def test_ask_trace_records_stage_waterfall(app_client):
+    assert "Leaf of Yield" in app_client.post("/ask", json={"user": "tg:9", "question": "What is the Leaf of Yield?"}).json()["answer"]
+    item = app_client.get("/trace/recent", params={"limit": 1}).json()["items"][0]
+    assert (item["kind"], item["via"], item["user"]) == ("ask", "pipeline", "tg:9")
+    assert item["q"] == "What is the Leaf of Yield?" and "error" not in item
+
+    spans = {s["stage"]: s for s in item["stages"]}
+    assert [s["start_ms"] for s in item["stages"]] == sorted(s["start_ms"] for s in item["stages"])
+    assert {"identity", "guide", "retrieval", "synthesis", "resonance", "lucidity", "llm", "finalize"} <= set(spans)
+
+    def end(name):
+        return spans[name]["start_ms"] + spans[name]["ms"]
+
+    # retrieval waits for guide, identity overlaps retrieval; llm only after the prepare stages
+    assert spans["retrieval"]["start_ms"] >= end("guide") - 0.05
+    assert spans["identity"]["start_ms"] <= end("retrieval")
+    assert spans["synthesis"]["start_ms"] >= end("retrieval") - 0.05
+    assert spans["llm"]["start_ms"] >= end("lucidity") - 0.05
+    assert spans["finalize"]["start_ms"] >= end("llm") - 0.05
+    assert item["total_ms"] >= end("finalize") - 0.05
+
+
+def test_failed_guard_reaps_identity_task(app_client, monkeypatch, caplog):
+    import gc
+    import logging
+
+    def broken_resolve(token):
+        raise RuntimeError("identity db down")
+
+    def broken_guard(query, user):
+        raise ValueError("guide exploded")
+
+    monkeypatch.setattr(server.app.state.memory, "resolve_user", broken_resolve)
+    monkeypatch.setattr(server.app.state.guide, "guard", broken_guard)
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        with pytest.raises(ValueError, match="guide exploded"):
+            app_client.post("/ask", json={"user": "tg:9", "question": "What is the Leaf of Yield?"})
+        gc.collect()
+    assert "never retrieved" not in caplog.text
+    item = app_client.get("/trace/recent", params={"limit": 1}).json()["items"][0]
+    assert item["via"] == "error" and item["error"] == "guide exploded"
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from tobyworld_v4.core.v4.writebehind import WriteBehind
+
+
+def test_write_behind_rejects_when_full_and_drains_on_stop():
+    gate = threading.Event()
+    seen = []
+    wb = WriteBehind(maxsize=2, batch=8, linger_ms=0)
+    assert not wb.submit("x", seen.append, 0)  # not started: caller runs it
+    wb.start()
+
+    assert wb.submit("block", gate.wait, 5)
+    while wb.stats()["queue_depth"]:  # wait for the worker to pick up the blocking job
+        time.sleep(0.001)
+    assert wb.submit("x", seen.append, 1) and wb.submit("x", seen.append, 2)
+    assert not wb.submit("x", seen.append, 3)  # queue full: backpressure to caller
+
+    gate.set()
+    wb.stop()
+    stats = wb.stats()
+    assert seen == [1, 2]
+    assert (stats["done"], stats["rejected"], stats["running"]) == (3, 1, False)
+
+
+def test_write_behind_commits_db_jobs_of_a_batch_together(tmp_path):
+    from tobyworld_v4.core.v4.dbconn import SharedDB
+
+    db = SharedDB(str(tmp_path / "wb.db"))
+    db.conn().execute("CREATE TABLE t (v INTEGER)")
+    order = []
+
+    def insert(v, fail=False):
+        with db.transaction(immediate=True) as con:  # nests into the batch transaction
+            con.execute("INSERT INTO t VALUES (?)", (v,))
+            if fail:
+                raise ValueError("boom")
+        order.append(v)
+
+    gate = threading.Event()
+    wb = WriteBehind(batch=16, linger_ms=0, db=db, tx_jobs=("memory",))
+    wb.start()
+    assert wb.submit("other", gate.wait, 5)
+    while wb.stats()["queue_depth"]:
+        time.sleep(0.001)
+    for v in (1, 2):
+        wb.submit("memory", insert, v)
+    wb.submit("memory", insert, 3, fail=True)
+    wb.submit("memory", insert, 4)
+    wb.submit("other", order.append, "x")  # not a db job: closes the first transaction
+    wb.submit("memory", insert, 5)
+    wb.submit("memory", insert, 6)
+    gate.set()
+    wb.stop()
+
+    rows = [r[0] for r in db.conn().execute("SELECT v FROM t ORDER BY rowid")]
+    stats = wb.stats()
+    assert rows == [1, 2, 4, 5, 6]  # the failed job's insert was rolled back to its savepoint
+    assert order == [1, 2, 4, "x", 5, 6]
+    assert (stats["commits"], stats["errors"], stats["done"]) == (2, 1, 8)
+    db.close_all()